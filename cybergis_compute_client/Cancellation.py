@@ -0,0 +1,128 @@
+"""
+This module exposes JobCanceller class which cancels many jobs with a
+bounded number of concurrent requests and a cap on the request rate
+
+Example:
+        canceller = JobCanceller(cybergis, maxWorkers=8, ratePerSecond=10)
+        results = canceller.run(group)
+"""
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from .Job import Job  # noqa
+from .JobGroup import JobGroup  # noqa
+
+
+class JobCanceller:
+    """
+    JobCanceller class
+
+    Args:
+        compute (CyberGISCompute): Logged in CyberGISCompute instance
+        maxWorkers (int): Cancel requests in flight at the same time
+        ratePerSecond (float): Cancel requests started per second at most,
+            None for no limit
+        onProgress (callable): Called as `onProgress(done, total, result)`
+            after every job
+        verbose (bool): Print a progress line every `progressEvery` jobs
+            and a summary at the end
+        progressEvery (int): Jobs between two progress lines
+
+    Attributes:
+        results (list): One dict per job with keys `jobId`, `cancelled`,
+            `response` and `error`, in input order
+    """
+    def __init__(self, compute, maxWorkers=8, ratePerSecond=10, onProgress=None, verbose=True, progressEvery=50):
+        self.compute = compute
+        self.maxWorkers = maxWorkers
+        self.ratePerSecond = ratePerSecond
+        self.onProgress = onProgress
+        self.verbose = verbose
+        self.progressEvery = progressEvery
+        self.results = []
+        self._lock = threading.Lock()
+        self._nextStart = 0
+
+    def run(self, jobs):
+        """
+        Cancels every job. Failures are captured per job and do not stop
+        the other cancellations.
+
+        Args:
+            jobs (JobGroup or list): Jobs, as a JobGroup or a list of Job
+                objects, job ids or job records
+
+        Returns:
+            list: `results`
+        """
+        ids = self.ids(jobs)
+        total = len(ids)
+        self.results = [None] * total
+        with ThreadPoolExecutor(max_workers=self.maxWorkers) as executor:
+            futures = {executor.submit(self._cancel_one, id): i for i, id in enumerate(ids)}
+            done = 0
+            for future in as_completed(futures):
+                result = future.result()
+                self.results[futures[future]] = result
+                done += 1
+                if self.onProgress is not None:
+                    self.onProgress(done, total, result)
+                if self.verbose and (done % self.progressEvery == 0 or done == total):
+                    self.compute.output.message('⏳ cancelled ' + str(done) + '/' + str(total))
+
+        if self.verbose:
+            failed = len([r for r in self.results if not r['cancelled']])
+            self.compute.output.message('🛑 ' + str(total - failed) + ' job(s) cancelled, ❌ ' + str(failed) + ' failed')
+        return self.results
+
+    @staticmethod
+    def ids(jobs):
+        """
+        Returns the distinct job ids of `jobs`, in order
+
+        Args:
+            jobs (JobGroup or list): Jobs, as a JobGroup or a list of Job
+                objects, job ids or job records
+
+        Returns:
+            list: Job ids
+        """
+        if isinstance(jobs, JobGroup):
+            return jobs.ids()
+        ids = []
+        for job in jobs:
+            if isinstance(job, Job):
+                job = job.id
+            elif isinstance(job, dict):
+                job = job['id']
+            if job not in ids:
+                ids.append(job)
+        return ids
+
+    # helpers
+    def _cancel_one(self, id):
+        """
+        Cancels a single job once the rate limit allows, capturing any error
+        """
+        result = {'jobId': id, 'cancelled': False, 'response': None, 'error': None}
+        self._wait_turn()
+        try:
+            result['response'] = self.compute.client.request('PUT', '/job/' + id + '/cancel', {
+                'jupyterhubApiToken': self.compute.jupyterhubApiToken, 'jobId': id})
+            result['cancelled'] = True
+        except Exception as e:
+            result['error'] = str(e)
+        return result
+
+    def _wait_turn(self):
+        """
+        Spaces request starts by 1 / `ratePerSecond` seconds across threads
+        """
+        if not self.ratePerSecond:
+            return
+        with self._lock:
+            now = time.monotonic()
+            start = max(now, self._nextStart)
+            self._nextStart = start + 1 / self.ratePerSecond
+        if start > now:
+            time.sleep(start - now)
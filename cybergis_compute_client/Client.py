@@ -7,9 +7,23 @@ Example:
 """
 import http.client as client
 import json
+import time
 from os import path
 
 
+class UploadError(Exception):
+    """
+    Raised when an upload stops before all data was accepted
+
+    Attributes:
+        offset (int): Bytes the server accepted, pass it as `offset` to
+            :meth:`Client.upload` to resume
+    """
+    def __init__(self, message, offset):
+        super().__init__(message)
+        self.offset = offset
+
+
 class Client:
     """
     An inteface that handles requests made to different servers
@@ -24,6 +38,8 @@ class Client:
         url (str): url that needs to be accessed
         port (str): port of the Jupyter or Python interface
         suffix (str): specify version. For e.g v2
+        onAuthError (callable): Called without arguments when the server
+            rejects a request with HTTP 401, e.g. to drop a cached login
     """
     def __init__(
         self, url="cgjobsup.cigi.illinois.edu",
@@ -31,6 +47,7 @@ class Client:
         self.url = url + ':' + str(port)
         self.protocol = protocol
         self.suffix = suffix
+        self.onAuthError = None
 
     def request(self, method, uri, body={}):
         """
@@ -45,16 +62,13 @@ class Client:
         Returns:
             JSON: output thats returned by the server
         """
-        if self.protocol == 'HTTP':
-            connection = client.HTTPConnection(self.url)
-        else:
-            connection = client.HTTPSConnection(self.url)
+        connection = self._connect()
         headers = {'Content-type': 'application/json'}
-        connection.request(
-            method, '/' + path.join(self.suffix.strip('/'), uri.strip('/')),
-            json.dumps(body), headers)
+        connection.request(method, self._path(uri), json.dumps(body), headers)
         response = connection.getresponse()
         out = response.read().decode()
+        if response.status == 401 and self.onAuthError is not None:
+            self.onAuthError()
         try:
             data = json.loads(out)
         except:
@@ -67,3 +81,126 @@ class Client:
             raise Exception('server ' + self.url + uri + ' responded with error "' + data['error'] + msg + '"')
 
         return data
+
+    def upload(self, uri, source, total=None, offset=0, chunkSize=1024 * 1024, method='PUT', headers=None,
+               retries=3, onProgress=None):
+        """
+        Uploads binary data in chunks of `chunkSize` bytes, one request per
+        chunk over a kept-alive connection. Each chunk carries a
+        `Content-Range: bytes start-end/total` header (`*` as total when it
+        is unknown), so only one chunk is ever held in memory. A chunk that
+        fails on the network is sent again on a new connection up to
+        `retries` times.
+
+        Args:
+            uri (str): uri of the server
+            source (str or file or iterable): Path of a file, binary file
+                object, or iterable of bytes such as `Zip.iter_chunks()`
+            total (int): Size of the whole payload, taken from the file if None
+            offset (int): Bytes already accepted by the server; that much of
+                `source` is skipped, e.g. `UploadError.offset` to resume
+            chunkSize (int): Bytes per request
+            method (str): HTTP method of every chunk request
+            headers (dict): Extra headers sent with every chunk
+            retries (int): Attempts per chunk after a network failure
+            onProgress (callable): Called as `onProgress(sent, total, bytesPerSecond)`
+                after every chunk
+
+        Returns:
+            dict: `bytes` (sent by this call), `seconds`, `bytesPerSecond`
+            and `response` (the decoded reply to the last chunk)
+
+        Raises:
+            UploadError: A chunk was rejected or kept failing; its `offset`
+                tells where to resume
+        """
+        f = open(source, 'rb') if isinstance(source, str) else None
+        try:
+            if f is not None or hasattr(source, 'read'):
+                stream = f or source
+                chunks = iter(lambda: stream.read(chunkSize), b'')
+                if stream.seekable():
+                    if total is None:
+                        total = stream.seek(0, 2)
+                    stream.seek(offset)
+                else:
+                    chunks = self._rechunk(chunks, chunkSize, offset)
+            else:
+                chunks = self._rechunk(source, chunkSize, offset)
+            return self._send_chunks(uri, chunks, total, offset, method, headers or {}, retries, onProgress)
+        finally:
+            if f is not None:
+                f.close()
+
+    # helpers
+    def _connect(self):
+        """
+        Returns a new connection to the server
+        """
+        if self.protocol == 'HTTP':
+            return client.HTTPConnection(self.url)
+        return client.HTTPSConnection(self.url)
+
+    def _path(self, uri):
+        return '/' + path.join(self.suffix.strip('/'), uri.strip('/'))
+
+    def _send_chunks(self, uri, chunks, total, offset, method, headers, retries, onProgress):
+        """
+        Sends every chunk in order, reconnecting on network failures
+        """
+        connection = self._connect()
+        start = time.perf_counter()
+        sent, data = 0, None
+        try:
+            for chunk in chunks:
+                end = offset + len(chunk) - 1
+                chunkHeaders = dict(headers)
+                chunkHeaders['Content-Type'] = 'application/octet-stream'
+                chunkHeaders['Content-Range'] = 'bytes ' + str(offset) + '-' + str(end) + '/' + (
+                    '*' if total is None else str(total))
+                for attempt in range(retries + 1):
+                    try:
+                        connection.request(method, self._path(uri), chunk, chunkHeaders)
+                        response = connection.getresponse()
+                        out = response.read().decode()
+                        break
+                    except (OSError, client.HTTPException) as e:
+                        connection.close()
+                        connection = self._connect()
+                        if attempt == retries:
+                            raise UploadError('upload to ' + self.url + uri + ' failed at byte ' + str(offset) + ': ' + str(e), offset)
+                if response.status == 401 and self.onAuthError is not None:
+                    self.onAuthError()
+                if response.status >= 400:
+                    message = 'rejected bytes ' + str(offset) + '-' + str(end) + ' with HTTP ' + str(response.status)
+                    raise UploadError('server ' + self.url + uri + ' ' + message + ' ' + out, offset)
+                try:
+                    data = json.loads(out) if out else None
+                except:
+                    data = out
+                offset += len(chunk)
+                sent += len(chunk)
+                seconds = time.perf_counter() - start
+                if onProgress is not None:
+                    onProgress(offset, total, sent / seconds if seconds > 0 else 0)
+        finally:
+            connection.close()
+        seconds = time.perf_counter() - start
+        return {'bytes': sent, 'seconds': seconds, 'bytesPerSecond': sent / seconds if seconds > 0 else 0, 'response': data}
+
+    @staticmethod
+    def _rechunk(iterable, chunkSize, skip=0):
+        """
+        Yields the bytes of `iterable` in chunks of `chunkSize`, after dropping the first `skip` bytes
+        """
+        buffer = bytearray()
+        for piece in iterable:
+            if skip:
+                dropped = min(skip, len(piece))
+                piece, skip = piece[dropped:], skip - dropped
+            buffer += piece
+            while len(buffer) >= chunkSize:
+                yield bytes(buffer[:chunkSize])
+                del buffer[:chunkSize]
+        if buffer:
+            yield bytes(buffer)
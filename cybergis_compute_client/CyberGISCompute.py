@@ -9,19 +9,26 @@ Example:
 
 from .Client import Client  # noqa
 from .Job import Job  # noqa
-from .UI import UI  # noqa
 from .MarkdownTable import MarkdownTable  # noqa
+from .Output import OutputBackend  # noqa
+from .GlobusDownloader import GlobusDownloader  # noqa
+from .TransferLedger import TransferLedger  # noqa
+from .Sweep import ParameterSweep  # noqa
+from .JobGroup import JobGroup  # noqa
+from .ParamSpace import ParamSpace  # noqa
+from .ResultCache import ResultCache  # noqa
+from .JobRegistry import JobRegistry  # noqa
+from .JobAnalytics import JobAnalytics  # noqa
+from .HPCRecommender import HPCRecommender  # noqa
+from .Cancellation import JobCanceller  # noqa
+from .JobWatcher import JobWatcher  # noqa
+from .JupyterGlobus import JupyterGlobus  # noqa
 import json
 import base64
 import os
+import time
 import getpass
-from IPython.display import display, Markdown, Javascript
-
-
-class ParamAccumulator:
-    def __init__(self,
-                 params={}):
-        self.params = params
+from urllib.parse import urlencode
 
 
 class CyberGISCompute:
@@ -43,14 +50,29 @@ class CyberGISCompute:
         ui (UI): Serves as entry point to UI functionality
         job (Job): Serves as entry point to access job interactions
         recentDownloadPath (str): Gets the most recent download path from globus
+        transferLedger (TransferLedger): Local record of Globus downloads used to resume them
+        resultCache (ResultCache): Memoizes identical submissions, None unless enabled
+            with :meth:`enable_memoization`
+        jobRegistry (JobRegistry): Local index of the user's jobs, None unless enabled
+            with :meth:`enable_registry`
         jupyterhubHost (str): static variable that stores the path to jupyterhubHost
+        loginMaxAgeInSeconds (int): static variable, how long a validated token is trusted
+            before :meth:`login` validates it again
+        loginValidatedAt (float): Time the token was last validated by the server
+        recommenderMaxAgeInSeconds (int): static variable, how long the history
+            behind :meth:`get_hpc_recommender` is reused
+        recommenderHistorySize (int): static variable, how many of the most recent
+            jobs :meth:`get_hpc_recommender` learns from
     """
     # static variable
     jupyterhubHost = None
+    loginMaxAgeInSeconds = 3600
+    recommenderMaxAgeInSeconds = 600
+    recommenderHistorySize = 50
 
     job = None
 
-    def __init__(self, url="cgjobsup.cigi.illinois.edu", port=443, protocol='HTTPS', suffix="v2", isJupyter=True):
+    def __init__(self, url="cgjobsup.cigi.illinois.edu", port=443, protocol='HTTPS', suffix="v2", isJupyter=True, output=None):
         """
         Initializes instance CyberGISCompute using inputs from the client
 
@@ -60,6 +82,8 @@ class CyberGISCompute:
             protocol (str): Typically HTTP or HTTPS
             suffix (str): specify version. For e.g v2
             isJupyter(bool): set to True if you are using Jupyter environment
+            output(OutputBackend): where messages and tables go, e.g.
+                JSONOutput() or SilentOutput() for headless pipelines
 
         Returns:
             CyberGISCompute: this CyberGISCompute
@@ -69,14 +93,61 @@ class CyberGISCompute:
         self.url = f"{protocol.lower()}://{url}"
         self.jupyterhubApiToken = None
         self.username = None
+        self.loginValidatedAt = None
+        self.savedToken = None
+        self.client.onAuthError = self.invalidate_login
         self.isJupyter = isJupyter
-        self.ui = UI(self)
+        self._output = output
+        self._ui = None
         if isJupyter:
             self.enable_jupyter()
         # job
         self.job = None
         self.recentDownloadPath = None
         self.simple = False
+        self.transferLedger = TransferLedger()
+        self.resultCache = None
+        self.jobRegistry = None
+        self.registrySyncedAt = None
+        self.registryMaxAgeInSeconds = None
+        self._hpcRecommender = None
+        self._watcher = None
+        self._hpcRecommenderAt = None
+
+    @property
+    def ui(self):
+        """
+        UI: Job submission UI, created (and ipywidgets imported) on first use
+        """
+        if self._ui is None:
+            from .UI import UI
+            self._ui = UI(self)
+        return self._ui
+
+    @property
+    def output(self):
+        """
+        OutputBackend: Backend passed to the constructor, otherwise the
+        Jupyter or terminal backend depending on `isJupyter`
+        """
+        if self._output is None:
+            return OutputBackend.default(self.isJupyter)
+        return self._output
+
+    @output.setter
+    def output(self, output):
+        self._output = output
+
+    @property
+    def watcher(self):
+        """
+        JobWatcher: Background watcher shared by every :meth:`watch_job` call,
+        created on first use
+        """
+        if self._watcher is None:
+            self.login(verbose=False)
+            self._watcher = JobWatcher(self.client, self.jupyterhubApiToken, self.isJupyter, output=self.output)
+        return self._watcher
 
     def encrypt_token(self, token):
         """
@@ -100,7 +171,76 @@ class CyberGISCompute:
     def cancel_job(self):
         if self.job is not None:
             res = self.client.request('PUT', '/job/' + self.job.id + '/cancel', {"jupyterhubApiToken": self.jupyterhubApiToken, "jobId": self.job.id})
-            display(Markdown(str(res)))
+            self.output.markdown(str(res))
+
+    def watch_job(self, job=None, on_status_change=None, on_end=None, on_fail=None, widget=None, on_tick=None,
+                  tickIntervalInSeconds=None):
+        """
+        Watches a job from a background thread without blocking, see
+        :class:`cybergis_compute_client.JobWatcher.JobWatcher`
+
+        Args:
+            job (Job or str): Job object or job id, the latest job if None
+            on_status_change (callable): Called as `on_status_change(id, previous, state, record)`
+            on_end (callable): Called as `on_end(id, state, record)` once the job ended
+            on_fail (callable): Called as `on_fail(id, state, record)` once the job failed
+            widget (ipywidgets.Widget): Widget whose `value` shows the job's state
+            on_tick (callable): Called as `on_tick(id, state, record)` after every
+                tick while the job runs
+            tickIntervalInSeconds (float): Longest time between two ticks while the job runs
+
+        Returns:
+            JobWatcher: The shared watcher
+        """
+        if job is None:
+            job = self.job
+        return self.watcher.watch(job, on_status_change, on_end, on_fail, widget, on_tick, tickIntervalInSeconds)
+
+    def cancel_jobs(self, jobs=None, maintainer=None, hpc=None, gitId=None, since=None,
+                    status=('CREATED', 'QUEUED', 'RUNNING'), all=False, includeUnknown=False, maxWorkers=8,
+                    ratePerSecond=10, onProgress=None, verbose=True):
+        """
+        Cancels many jobs concurrently with a cap on the request rate. Either
+        pass the jobs, or at least one filter selecting among the user's
+        jobs, or `all=True` to cancel every unfinished job.
+
+        Args:
+            jobs (JobGroup or list): Jobs to cancel, as a JobGroup or a list of
+                Job objects or job ids; the filters below are used when None
+            maintainer (str): Only jobs of this maintainer
+            hpc (str): Only jobs on this HPC
+            gitId (str): Only jobs running this executable
+            since (str): Only jobs created at or after this time
+            status (tuple): Only jobs in these states, see
+                :class:`cybergis_compute_client.JobGroup.JobGroup`
+            all (bool): Allow cancelling without jobs or filters, i.e. every
+                job in `status`
+            includeUnknown (bool): Also cancel jobs whose state cannot be
+                told from the listing
+            maxWorkers (int): Cancel requests in flight at the same time
+            ratePerSecond (float): Cancel requests started per second at most
+            onProgress (callable): Called as `onProgress(done, total, result)` after every job
+            verbose (bool): Print progress and a summary
+
+        Returns:
+            list: One dict per job with keys `jobId`, `cancelled`, `response` and `error`
+
+        Raises:
+            Exception: If neither jobs, a filter nor `all=True` is given
+        """
+        if jobs is None and not all and maintainer is None and hpc is None and gitId is None and since is None:
+            raise Exception('cancel_jobs needs jobs, a filter (maintainer, hpc, gitId, since) or all=True')
+        self.login(verbose=False)
+        if jobs is None:
+            jobs = self._fetch_jobs(since=since, maintainer=maintainer, hpc=hpc, newestFirst=True)[0]
+            if gitId is not None:
+                jobs = [j for j in jobs if (j.get('localExecutableFolder') or {}).get('gitId') == gitId]
+            if status is not None:
+                states = tuple(status) + ((None, ) if includeUnknown else ())
+                jobs = [j for j in jobs if JobGroup.job_state(j) in states]
+        canceller = JobCanceller(self, maxWorkers=maxWorkers, ratePerSecond=ratePerSecond,
+                                 onProgress=onProgress, verbose=verbose)
+        return canceller.run(jobs)
 
     def set_username(self):
         """
@@ -109,13 +249,37 @@ class CyberGISCompute:
         res = self.client.request(
             'GET', '/user', {"jupyterhubApiToken": self.jupyterhubApiToken})
         self.username = res['username']
+        self.loginValidatedAt = time.time()
+
+    def is_login_valid(self):
+        """
+        Checks whether the token was validated recently enough to be trusted
+        without asking the server again
+
+        Returns:
+            bool: True if no validation request is needed
+        """
+        if self.jupyterhubApiToken is None or self.username is None or self.loginValidatedAt is None:
+            return False
+        maxAge = self.loginMaxAgeInSeconds
+        return maxAge is None or time.time() - self.loginValidatedAt < maxAge
+
+    def invalidate_login(self):
+        """
+        Forgets that the token was validated, so the next :meth:`login`
+        validates it again. Called when the server answers with an auth error.
+        """
+        self.loginValidatedAt = None
 
     def save_token(self):
         """
-        Writes token(str) to json file.
+        Writes token(str) to json file, unless the file already holds it.
         """
+        if self.savedToken == self.jupyterhubApiToken:
+            return
         with open('./cybergis_compute_user.json', 'w') as json_file:
             json.dump({"token": self.jupyterhubApiToken}, json_file)
+        self.savedToken = self.jupyterhubApiToken
 
     def login_token(self):
         """
@@ -126,7 +290,7 @@ class CyberGISCompute:
             self.save_token()
             return self.login()
         except:
-            print('❌ Failed to login via system token')
+            self.output.message('❌ Failed to login via system token')
 
     def host_token_login(self, token):
         """
@@ -144,14 +308,14 @@ class CyberGISCompute:
         Asks for token and host from user and calls login_token function.
         """
         if self.isJupyter:
-            print('📢 Please go to Control Panel -> Token, request a new API token')
+            self.output.message('📢 Please go to Control Panel -> Token, request a new API token')
             token = getpass.getpass('Enter your API token here')
             try:
                 return self.host_token_login(token)
             except:
-                print('❌ Failed to login via user input')
+                self.output.message('❌ Failed to login via user input')
         else:
-            print('❌ Enable Jupyter using .enable_jupyter() before you login')
+            self.output.message('❌ Enable Jupyter using .enable_jupyter() before you login')
 
     def login_json(self):
         """
@@ -161,8 +325,9 @@ class CyberGISCompute:
             with open(os.path.abspath('cybergis_compute_user.json')) as f:
                 user = json.load(f)
                 token = user['token']
-            print('📃 Found "cybergis_compute_user.json! NOTE: if you want to login as another user, please remove this file')
+            self.output.message('📃 Found "cybergis_compute_user.json! NOTE: if you want to login as another user, please remove this file')
             self.jupyterhubApiToken = token
+            self.savedToken = token
             self.set_username()
             self.save_token()
             return self.login()
@@ -175,7 +340,9 @@ class CyberGISCompute:
     def login(self, manualLogin=False, manualHost=None, verbose=True):
         """
         Authenticates the client's jupyterhubApiToken and gives them access
-        to CyberGISCompute features
+        to CyberGISCompute features. A token validated within
+        `loginMaxAgeInSeconds` is not validated again unless the server
+        reported an auth error in the meantime.
 
         Args:
             manualLogin (bool): set to True if env variable and  file login modes are not available
@@ -187,10 +354,10 @@ class CyberGISCompute:
             self.jupyterhubHost = manualHost
         # login via env variable
         if self.jupyterhubApiToken is not None:
-            if self.username is None:
+            if not self.is_login_valid():
                 self.set_username()
             if verbose:
-                print('🎯 Logged in as ' + self.username)
+                self.output.message('🎯 Logged in as ' + self.username)
             return
         # manual login
         if manualLogin:
@@ -202,7 +369,7 @@ class CyberGISCompute:
             envToken = os.getenv('JUPYTERHUB_API_TOKEN')
             if envToken is not None:
                 return self.host_token_login(envToken)
-            print('❌ Not logged in. To enable more features, use .login()')
+            self.output.message('❌ Not logged in. To enable more features, use .login()')
 
     def create_job(self, maintainer='community_contribution', hpc=None, hpcUsername=None, hpcPassword=None, verbose=True):
         """
@@ -212,7 +379,9 @@ class CyberGISCompute:
         Args:
             maintainer (str): Pre-packaged programs which can be configured and controlled remotely
             and behave as a bridge between user and HPC backends
-            hpc(str): HPC backend that is being accessed. For e.g 'keeling_community'
+            hpc(str): HPC backend that is being accessed. For e.g 'keeling_community',
+                'auto' picks the one with the lowest expected time-to-result
+                (see :meth:`get_hpc_recommender`)
             hpcUsername (str): username for HPC backend
             hpcPassword (str): password for HPC backend
             printJob (str): prints the Job infortmation if set to True
@@ -221,7 +390,11 @@ class CyberGISCompute:
             Job: The new job instance that was initialized
         """
         self.login()
-        return Job(maintainer=maintainer, hpc=hpc, id=None, hpcUsername=hpcUsername, hpcPassword=hpcPassword, client=self.client, isJupyter=self.isJupyter, jupyterhubApiToken=self.jupyterhubApiToken, printJob=verbose)
+        if hpc == 'auto':
+            hpc = self.get_hpc_recommender().recommend(maintainer, communityOnly=hpcUsername is None)
+            if verbose:
+                self.output.message('💡 picked HPC ' + str(hpc))
+        return Job(maintainer=maintainer, hpc=hpc, id=None, hpcUsername=hpcUsername, hpcPassword=hpcPassword, client=self.client, isJupyter=self.isJupyter, jupyterhubApiToken=self.jupyterhubApiToken, printJob=verbose, transferLedger=self.transferLedger, resultCache=self.resultCache, output=self.output)
 
     def run_job_using_params(self,
                              input_params=[],
@@ -235,12 +408,91 @@ class CyberGISCompute:
                              localResultFolder=None,
                              env=None,
                              slurm=None,
-                             verbose=True):
-        for params in input_params:
-            param_acc = ParamAccumulator(params)
-            job = self.create_job(maintainer, hpc, hpcUsername, hpcPassword)
-            job.set(localExecutableFolder, localDataFolder, localResultFolder, param_acc.params, env, slurm)
-            job.submit()
+                             verbose=True,
+                             maxWorkers=8):
+        """
+        Submits one job per item of `input_params`, see :meth:`submit_sweep`
+
+        Returns:
+            JobGroup: Handle on the submitted jobs
+        """
+        return self.submit_sweep(input_params, maintainer, hpc, hpcUsername, hpcPassword, localExecutableFolder,
+                                 localDataFolder, localResultFolder, env, slurm, maxWorkers=maxWorkers, verbose=verbose)
+
+    def submit_sweep(self,
+                     input_params,
+                     maintainer='community_contribution',
+                     hpc=None,
+                     hpcUsername=None,
+                     hpcPassword=None,
+                     localExecutableFolder={"type": "git",
+                                            "gitId": "hello_world"},
+                     localDataFolder=None,
+                     localResultFolder=None,
+                     env=None,
+                     slurm=None,
+                     maxWorkers=8,
+                     onProgress=None,
+                     skipSubmitted=False,
+                     verbose=True):
+        """
+        Creates, sets and submits one job per parameter set with at most
+        `maxWorkers` submissions in flight. Nothing is rendered per job and
+        errors are captured per parameter set.
+
+        Args:
+            input_params (list): Param dicts, one per job
+            maintainer (str): Maintainer of the jobs
+            hpc (str): HPC the jobs are submitted to, None for the maintainer's default,
+                'auto' for the one with the lowest expected time-to-result
+            hpcUsername (str): username for HPC backend
+            hpcPassword (str): password for HPC backend
+            localExecutableFolder (dict): Executable folder of the jobs
+            localDataFolder (dict): Data folder of the jobs
+            localResultFolder (dict): Result folder of the jobs
+            env (dict): Environment variables of the jobs
+            slurm (dict): Slurm configuration of the jobs
+            maxWorkers (int): Jobs being submitted at the same time
+            onProgress (callable): Called as `onProgress(done, total, result)` after every item
+            skipSubmitted (bool): Drop parameter sets already submitted by the user with the same
+                executable, HPC and slurm configuration, see :meth:`cybergis_compute_client.ParamSpace.ParamSpace.dedupe`
+            verbose (bool): Print progress and a summary
+
+        Returns:
+            JobGroup: Handle on the submitted jobs
+        """
+        if hpc == 'auto':
+            self.login(verbose=False)
+            gitId = (localExecutableFolder or {}).get('gitId')
+            hpc = self.get_hpc_recommender().recommend(maintainer, gitId, communityOnly=hpcUsername is None)
+            if verbose:
+                self.output.message('💡 picked HPC ' + str(hpc))
+        if skipSubmitted and localExecutableFolder is not None and 'gitId' in localExecutableFolder:
+            self.login(verbose=False)
+            jobs = self.client.request('GET', '/user/job', {"jupyterhubApiToken": self.jupyterhubApiToken})['job']
+            input_params = list(input_params)
+            total = len(input_params)
+            input_params = ParamSpace.dedupe(input_params, jobs, localExecutableFolder['gitId'], hpc, slurm)
+            if verbose and total != len(input_params):
+                self.output.message('♻️ skipping ' + str(total - len(input_params)) + ' parameter set(s) submitted before')
+        sweep = ParameterSweep(self, maxWorkers=maxWorkers, onProgress=onProgress, verbose=verbose)
+        return sweep.run(input_params, maintainer=maintainer, hpc=hpc, hpcUsername=hpcUsername, hpcPassword=hpcPassword,
+                         localExecutableFolder=localExecutableFolder, localDataFolder=localDataFolder,
+                         localResultFolder=localResultFolder, env=env, slurm=slurm)
+
+    def get_param_space(self, gitId, values=None, seed=None):
+        """
+        Returns a ParamSpace over the `param_rules` of a job template
+
+        Args:
+            gitId (str): Job template, e.g. "hello_world"
+            values (dict): Candidate values per parameter overriding the rules
+            seed (int): Seed of the random generators
+
+        Returns:
+            ParamSpace: Generator of parameter sets for :meth:`submit_sweep`
+        """
+        return ParamSpace(self.list_git(raw=True)[gitId]['param_rules'], values, seed)
 
     def get_job_by_id(self, id=None, verbose=True):
         """
@@ -253,7 +505,200 @@ class CyberGISCompute:
             Job: Job object with the specified id otherwise None
         """
         self.login(verbose=False)
-        return Job(client=self.client, id=id, isJupyter=self.isJupyter, jupyterhubApiToken=self.jupyterhubApiToken, printJob=verbose)
+        return Job(client=self.client, id=id, isJupyter=self.isJupyter, jupyterhubApiToken=self.jupyterhubApiToken, printJob=verbose, transferLedger=self.transferLedger, resultCache=self.resultCache, output=self.output)
+
+    def download_results_by_globus(self, jobs, remotePaths=None, pattern=None, localPath=None, localEndpoint=None,
+                                   maxConcurrentPerEndpoint=4, refreshRateInSeconds=5, verbose=True, force=False):
+        """
+        Downloads result folder paths of many jobs at once using Globus.
+        Transfers are started concurrently, limited per local endpoint, and
+        polled on one shared schedule.
+
+        Args:
+            jobs (list): Job objects or job ids
+            remotePaths (list): Paths inside each remote result folder
+            pattern (str or callable): Glob pattern or predicate used to select
+                paths from each job's result folder content instead of `remotePaths`
+            localPath (str): Local root folder, defaults to the Jupyter Globus root path.
+                Each job is saved under `globus_download_<job id>` in it
+            localEndpoint (str): Globus endpoint id, defaults to the Jupyter Globus endpoint
+            maxConcurrentPerEndpoint (int): Transfers running at the same time per endpoint
+            refreshRateInSeconds (int): Seconds between two polling rounds
+            verbose (bool): Print progress while waiting
+            force (bool): Download again paths the ledger says succeeded
+
+        Returns:
+            list: Per-transfer results, see :class:`cybergis_compute_client.GlobusDownloader.GlobusDownloader`
+        """
+        self.login(verbose=False)
+        jupyterGlobus = JupyterGlobus(self.client, self.jupyterhubApiToken)
+        if localPath is None or localEndpoint is None:
+            jupyter_globus = jupyterGlobus.settings()
+            localPath = jupyter_globus['root_path'] if localPath is None else localPath
+            localEndpoint = jupyter_globus['endpoint'] if localEndpoint is None else localEndpoint
+
+        downloader = GlobusDownloader(maxConcurrentPerEndpoint, refreshRateInSeconds, verbose, self.transferLedger, self.output,
+                                      force, jupyterGlobus)
+        for job in jobs:
+            if not isinstance(job, Job):
+                job = self.get_job_by_id(job, verbose=False)
+            jobPath = os.path.join(localPath, 'globus_download_' + job.id)
+            for remotePath in job._select_result_paths(remotePaths, pattern):
+                downloader.add(job, remotePath, os.path.join(jobPath, remotePath.strip('/')), localEndpoint)
+        return downloader.run()
+
+    def resume_downloads(self, refreshRateInSeconds=5, verbose=True, maxConcurrentPerEndpoint=4):
+        """
+        Re-attaches to every Globus download recorded in the transfer ledger
+        that had not finished, e.g. because the kernel restarted, and waits
+        for them to finish
+
+        Args:
+            refreshRateInSeconds (int): Seconds between two polling rounds
+            verbose (bool): Print progress while waiting
+            maxConcurrentPerEndpoint (int): Transfers polled at the same time per endpoint
+
+        Returns:
+            list: Per-transfer results, see :class:`cybergis_compute_client.GlobusDownloader.GlobusDownloader`
+        """
+        pending = self.transferLedger.pending()
+        if len(pending) == 0:
+            return []
+        self.login(verbose=False)
+        jobs = {}
+        downloader = GlobusDownloader(maxConcurrentPerEndpoint, refreshRateInSeconds, verbose, self.transferLedger, self.output,
+                                      jupyterGlobus=JupyterGlobus(self.client, self.jupyterhubApiToken))
+        for rec in pending:
+            if rec['jobId'] not in jobs:
+                jobs[rec['jobId']] = self.get_job_by_id(rec['jobId'], verbose=False)
+            downloader.add(jobs[rec['jobId']], rec['remotePath'], rec['localPath'], rec['localEndpoint'])
+        return downloader.run()
+
+    def get_job_group(self, ids):
+        """
+        Returns a JobGroup tracking the jobs with the given ids
+
+        Args:
+            ids (list): Job ids
+
+        Returns:
+            JobGroup: Group monitoring the jobs with one listing request per refresh
+        """
+        self.login(verbose=False)
+        return JobGroup(self.client, self.jupyterhubApiToken, self.isJupyter, ids, self.output)
+
+    def job_analytics(self, ids=None, maxWorkers=8, limit=None):
+        """
+        Collects lifecycle durations (queue, init, run, transfer and total
+        time) of the user's jobs from their event timestamps
+
+        Args:
+            ids (list): Only these job ids, all of the user's jobs if None
+            maxWorkers (int): Job detail requests running at the same time
+            limit (int): Only the most recently created jobs, all if None
+
+        Returns:
+            JobAnalytics: Columns per job and per HPC/maintainer aggregates
+        """
+        self.login(verbose=False)
+        return JobAnalytics.fetch(self.client, self.jupyterhubApiToken, ids, maxWorkers, limit)
+
+    def get_hpc_recommender(self, refresh=False, maxWorkers=8):
+        """
+        Returns an HPCRecommender built from the maintainers, the HPCs and
+        the user's `recommenderHistorySize` most recent jobs. It is reused
+        for `recommenderMaxAgeInSeconds` unless `refresh` is set.
+
+        Args:
+            refresh (bool): Rebuild it even if it is recent
+            maxWorkers (int): Job detail requests running at the same time
+
+        Returns:
+            HPCRecommender: Ranks HPCs by expected time-to-result
+        """
+        age = None if self._hpcRecommenderAt is None else time.time() - self._hpcRecommenderAt
+        if refresh or age is None or age > self.recommenderMaxAgeInSeconds:
+            maintainers = self.list_maintainer(raw=True)
+            hpcs = self.list_hpc(raw=True)
+            self._hpcRecommender = HPCRecommender(maintainers, hpcs, self.job_analytics(
+                maxWorkers=maxWorkers, limit=self.recommenderHistorySize))
+            self._hpcRecommenderAt = time.time()
+        return self._hpcRecommender
+
+    def enable_memoization(self, path='./cybergis_compute_cache.json', maxAgeInSeconds=None, maxEntries=1000):
+        """
+        Enables result memoization: submitting a job whose executable
+        (git id and commit), param, slurm, HPC and data folder match a job
+        that already succeeded reuses that job instead of running it again
+
+        Args:
+            path (str): Location of the cache file
+            maxAgeInSeconds (int): Entries older than this are not reused, None keeps them
+            maxEntries (int): Least recently used entries beyond this are evicted
+
+        Returns:
+            ResultCache: The cache, which also offers invalidate() and clear()
+        """
+        self.login(verbose=False)
+        self.resultCache = ResultCache(self.client, self.jupyterhubApiToken, path, maxAgeInSeconds, maxEntries)
+        return self.resultCache
+
+    def disable_memoization(self):
+        """
+        Disables result memoization, the cache file is kept
+        """
+        self.resultCache = None
+
+    def enable_registry(self, path='./cybergis_compute_jobs.db', maxAgeInSeconds=60):
+        """
+        Enables a local SQLite registry of the user's jobs that answers
+        :meth:`list_job` and :meth:`query_jobs` locally and is synchronized
+        incrementally from the server
+
+        Args:
+            path (str): Location of the database
+            maxAgeInSeconds (int): Reuse the local index without syncing for this long
+
+        Returns:
+            JobRegistry: The registry
+        """
+        self.jobRegistry = JobRegistry(path)
+        self.registrySyncedAt = None
+        self.registryMaxAgeInSeconds = maxAgeInSeconds
+        return self.jobRegistry
+
+    def sync_registry(self, force=False):
+        """
+        Synchronizes the job registry unless it was synchronized recently
+
+        Args:
+            force (bool): Synchronize regardless of the last sync time
+
+        Returns:
+            int: Number of jobs inserted or updated
+        """
+        if self.jobRegistry is None:
+            raise Exception('job registry is not enabled, use .enable_registry() first')
+        maxAge = self.registryMaxAgeInSeconds
+        if not force and self.registrySyncedAt is not None and (maxAge is None or time.time() - self.registrySyncedAt < maxAge):
+            return 0
+        self.login(verbose=False)
+        changed = self.jobRegistry.sync(self.client, self.jupyterhubApiToken)
+        self.registrySyncedAt = time.time()
+        return changed
+
+    def query_jobs(self, maintainer=None, hpc=None, gitId=None, status=None, since=None, until=None, limit=None, offset=0):
+        """
+        Returns the user's jobs matching the filters from the job registry,
+        see :meth:`cybergis_compute_client.JobRegistry.JobRegistry.query`
+
+        Returns:
+            list: Job records, newest first
+        """
+        if self.jobRegistry is None:
+            self.enable_registry()
+        self.sync_registry()
+        return self.jobRegistry.query(maintainer, hpc, gitId, status, since, until, limit, offset)
 
     def get_slurm_usage(self, raw=False):
         """
@@ -271,16 +716,24 @@ class CyberGISCompute:
             not raw), {"jupyterhubApiToken": self.jupyterhubApiToken})
         if raw:
             return usage
-        display(
-            Markdown(
-                "Nodes: {}<br>Allocated CPUs: {}<br>Total CPU Time: {}<br>Memory Utilized: {}<br>Total Allocated Memory: {}<br>Total Walltime: {}".format(usage['nodes'], usage['cpus'], usage['cpuTime'], usage['memory'], usage['memoryUsage'], usage['walltime'])))
+        self.output.markdown(
+            "Nodes: {}<br>Allocated CPUs: {}<br>Total CPU Time: {}<br>Memory Utilized: {}<br>Total Allocated Memory: {}<br>Total Walltime: {}".format(usage['nodes'], usage['cpus'], usage['cpuTime'], usage['memory'], usage['memoryUsage'], usage['walltime']))
 
-    def list_job(self, raw=False):
+    def list_job(self, raw=False, limit=None, offset=0, since=None, maintainer=None, hpc=None, newestFirst=False):
         """
-        Prints a list of jobs that were submitted
+        Prints a list of jobs that were submitted. Filters and pagination are
+        sent to the server and applied client-side when the server does not
+        support them. With a job registry enabled the list is answered from
+        the local index.
 
         Args:
             raw (bool): set to True if you want the raw output
+            limit (int): Maximum number of jobs
+            offset (int): Number of matching jobs to skip
+            since (str): Only jobs created at or after this time
+            maintainer (str): Only jobs of this maintainer
+            hpc (str): Only jobs on this HPC
+            newestFirst (bool): Order by creation time, newest first
 
         Returns:
             JSON: Raw output if raw=True otherwise its printed
@@ -288,11 +741,9 @@ class CyberGISCompute:
         """
         self.login()
         if self.jupyterhubApiToken is None:
-            print('❌ please login')
+            self.output.message('❌ please login')
 
-        jobs = self.client.request(
-            'GET', '/user/job', {
-                "jupyterhubApiToken": self.jupyterhubApiToken})
+        jobs = {'job': self._fetch_jobs(limit, offset, since, maintainer, hpc, newestFirst)[0]}
         if raw:
             return jobs
 
@@ -317,13 +768,37 @@ class CyberGISCompute:
             ]
             data.append(to_append)
 
-        if self.isJupyter:
-            if len(data) == 0:
-                print('empty')
+        self.output.table(data, headers)
+
+    def iter_jobs(self, pageSize=100, since=None, maintainer=None, hpc=None, newestFirst=True):
+        """
+        Iterates over the user's jobs page by page. When the server does not
+        paginate, the listing is fetched once and paged client-side.
+
+        Args:
+            pageSize (int): Jobs per page
+            since (str): Only jobs created at or after this time
+            maintainer (str): Only jobs of this maintainer
+            hpc (str): Only jobs on this HPC
+            newestFirst (bool): Order by creation time, newest first
+
+        Yields:
+            list: Job records of one page
+        """
+        self.login(verbose=False)
+        offset = 0
+        while True:
+            page, serverPaged = self._fetch_jobs(pageSize, offset, since, maintainer, hpc, newestFirst, paginate=False)
+            if not serverPaged:
+                # the whole filtered listing came back, page it locally
+                for i in range(offset, len(page), pageSize):
+                    yield page[i:i + pageSize]
                 return
-            display(Markdown(MarkdownTable.render(data, headers)))
-        else:
-            print(MarkdownTable.render(data, headers))
+            if len(page) > 0:
+                yield page
+            if len(page) < pageSize:
+                return
+            offset += pageSize
 
     def list_hpc(self, raw=False):
         """
@@ -351,13 +826,7 @@ class CyberGISCompute:
                 hpc[i]['is_community_account']
             ])
 
-        if self.isJupyter:
-            if len(data) == 0:
-                print('empty')
-                return
-            display(Markdown(MarkdownTable.render(data, headers)))
-        else:
-            print(MarkdownTable.render(data, headers))
+        self.output.table(data, headers)
 
     def list_container(self, raw=False):
         """
@@ -384,13 +853,7 @@ class CyberGISCompute:
                 container[i]['dockerhub']
             ])
 
-        if self.isJupyter:
-            if len(data) == 0:
-                print('empty')
-                return
-            display(Markdown(MarkdownTable.render(data, headers)))
-        else:
-            print(MarkdownTable.render(data, headers))
+        self.output.table(data, headers)
 
     def list_jupyter_host(self, raw=False):
         """
@@ -417,15 +880,9 @@ class CyberGISCompute:
                     hosts[i],
                 ])
 
-            if self.isJupyter:
-                if len(data) == 0:
-                    print('empty')
-                    return
-                display(Markdown(MarkdownTable.render(data, headers)))
-            else:
-                print(MarkdownTable.render(data, headers))
+            self.output.table(data, headers)
         except:
-            print("The server " + self.client.url + " doesn't have this route")
+            self.output.message("The server " + self.client.url + " doesn't have this route")
 
     def list_git(self, raw=False):
         """
@@ -454,13 +911,7 @@ class CyberGISCompute:
                 git[i]['commit'] if 'commit' in git[i] else 'NONE',
             ])
 
-        if self.isJupyter:
-            if len(data) == 0:
-                print('empty')
-                return
-            display(Markdown(MarkdownTable.render(data, headers)))
-        else:
-            print(MarkdownTable.render(data, headers))
+        self.output.table(data, headers)
 
     def list_maintainer(self, raw=False):
         """
@@ -510,13 +961,7 @@ class CyberGISCompute:
                 must_have
             ])
 
-        if self.isJupyter:
-            if len(data) == 0:
-                print('empty')
-                return
-            display(Markdown(MarkdownTable.render(data, headers)))
-        else:
-            print(MarkdownTable.render(data, headers))
+        self.output.table(data, headers)
 
     # Integrated functions
     def list_info(self, list_maintainer=False, list_container=False):
@@ -530,20 +975,20 @@ class CyberGISCompute:
             list_container (bool): set to True of you want to
                 call list
         """
-        print('📦 Git repositories:')
+        self.output.message('📦 Git repositories:')
         self.list_git()
-        print('🖥 HPC endpoints:')
+        self.output.message('🖥 HPC endpoints:')
         self.list_hpc()
         if self.is_login():
-            print('📮 Submitted jobs:')
+            self.output.message('📮 Submitted jobs:')
             self.list_job()
 
         if list_container:
-            print('🗳 Containers:')
+            self.output.message('🗳 Containers:')
             self.list_container()
 
         if list_maintainer:
-            print('🤖 Maintainers:')
+            self.output.message('🤖 Maintainers:')
             self.list_maintainer()
 
     def create_job_by_ui(
@@ -595,10 +1040,53 @@ class CyberGISCompute:
         return self.job
 
     # helper functions
+    def _fetch_jobs(self, limit=None, offset=0, since=None, maintainer=None, hpc=None, newestFirst=False, paginate=True):
+        """
+        Fetches the user's jobs, pushing filters and pagination to the server.
+        The server is trusted to have paginated only if its response echoes
+        the pagination, otherwise filters, order and pagination are applied
+        to the returned listing.
+
+        Args:
+            paginate (bool): Apply limit/offset client-side when the server did not
+
+        Returns:
+            tuple: (list of job records, whether the server paginated)
+        """
+        if self.jobRegistry is not None:
+            self.sync_registry()
+            return self.jobRegistry.query(maintainer=maintainer, hpc=hpc, since=since, limit=limit,
+                                          offset=offset, newestFirst=newestFirst), True
+
+        query = {}
+        for key, value in [('limit', limit), ('offset', offset or None), ('since', since), ('maintainer', maintainer), ('hpc', hpc)]:
+            if value is not None:
+                query[key] = value
+        if query:
+            query['order'] = 'desc' if newestFirst else 'asc'
+        uri = '/user/job' + ('?' + urlencode(query) if query else '')
+        out = self.client.request('GET', uri, {"jupyterhubApiToken": self.jupyterhubApiToken})
+        jobs = out['job']
+        serverPaged = limit is not None and ('total' in out or 'limit' in out) and len(jobs) <= limit
+
+        # filters are idempotent, so they are applied whether or not the server did
+        if since is not None:
+            jobs = [j for j in jobs if str(j.get('createdAt')) >= str(since)]
+        if maintainer is not None:
+            jobs = [j for j in jobs if j.get('maintainer') == maintainer]
+        if hpc is not None:
+            jobs = [j for j in jobs if j.get('hpc') == hpc]
+        if not serverPaged:
+            jobs = sorted(jobs, key=lambda j: str(j.get('createdAt')), reverse=newestFirst)
+            if paginate:
+                jobs = jobs[offset:] if limit is None else jobs[offset:offset + limit]
+        return jobs, serverPaged
+
     def enable_jupyter(self):
         """
         Sets up jupyter environment in jupyterhubHost
         """
+        from IPython.display import display, Javascript
         self.isJupyter = True
         # get jupyter variable
         url = os.getenv('JUPYTER_INSTANCE_URL')
@@ -0,0 +1,194 @@
+"""
+This module exposes GlobusDownloader class which runs many Globus result
+folder downloads, possibly across many jobs, concurrently and polls them
+on one shared schedule
+
+Example:
+        downloader = GlobusDownloader(maxConcurrentPerEndpoint=4)
+        downloader.add(job, '/output', '/home/jovyan/output', endpoint)
+        results = downloader.run()
+"""
+import os
+import time
+from .Output import TerminalOutput  # noqa
+
+
+class GlobusDownloader:
+    """
+    GlobusDownloader class
+
+    Queues transfers and starts them as soon as a slot on their local
+    endpoint is free. The server reports Globus status per result folder,
+    so transfers out of the same folder are started one after another
+    while transfers out of different folders run side by side.
+
+    Args:
+        maxConcurrentPerEndpoint (int): Transfers allowed to run at the
+            same time for each local endpoint
+        refreshRateInSeconds (int): Seconds between two polling rounds
+        verbose (bool): Print a progress line after every polling round
+        ledger (TransferLedger): Records transfers so completed ones whose
+            local path exists are skipped and running ones are
+            re-attached, None to disable. Re-attached transfers count
+            towards `maxConcurrentPerEndpoint` like new ones.
+        output (OutputBackend): Where progress lines go, stdout by default
+        force (bool): Download again even if the ledger says a transfer
+            succeeded
+        jupyterGlobus (JupyterGlobus): Maps local paths on the Jupyter
+            Globus endpoint to the kernel's filesystem for the existence
+            check, None to check them as they are
+
+    Attributes:
+        transfers (list): Every transfer added, as a dict with keys `job`,
+            `jobId`, `folderId`, `remotePath`, `localPath`,
+            `localEndpoint`, `status`, `skipped` and `error`
+    """
+    def __init__(self, maxConcurrentPerEndpoint=4, refreshRateInSeconds=5, verbose=True, ledger=None, output=None,
+                 force=False, jupyterGlobus=None):
+        self.maxConcurrentPerEndpoint = maxConcurrentPerEndpoint
+        self.refreshRateInSeconds = refreshRateInSeconds
+        self.verbose = verbose
+        self.ledger = ledger
+        self.force = force
+        self.jupyterGlobus = jupyterGlobus
+        self.output = output if output is not None else TerminalOutput()
+        self.transfers = []
+        self._folderIds = {}
+
+    def add(self, job, remotePath, localPath, localEndpoint):
+        """
+        Queues a download of `remotePath` in the result folder of `job`
+
+        Args:
+            job (Job): Job whose result folder is downloaded
+            remotePath (str): Path inside the remote result folder
+            localPath (str): Destination path on the local endpoint
+            localEndpoint (str): Globus endpoint id of the destination
+
+        Returns:
+            GlobusDownloader: this GlobusDownloader
+        """
+        self.transfers.append({
+            'job': job,
+            'jobId': job.id,
+            'folderId': None,
+            'remotePath': remotePath,
+            'localPath': localPath,
+            'localEndpoint': localEndpoint,
+            'status': 'QUEUED',
+            'skipped': False,
+            'error': None
+        })
+        return self
+
+    def run(self):
+        """
+        Starts and polls the queued transfers until all of them finished
+
+        Returns:
+            list: One dict per transfer (without the `job` object) with
+            its final `status` of SUCCEEDED or FAILED
+        """
+        pending = [t for t in self.transfers if t['status'] == 'QUEUED']
+        active = []
+        while pending or active:
+            self._start(pending, active)
+            if not active:
+                continue
+            time.sleep(self.refreshRateInSeconds)
+            for t in list(active):
+                self._poll(t)
+                if t['status'] in ['SUCCEEDED', 'FAILED']:
+                    active.remove(t)
+            if self.verbose:
+                self._print_progress()
+        return self.results()
+
+    def results(self):
+        """
+        Returns:
+            list: Current state of every transfer
+        """
+        return [{k: v for k, v in t.items() if k != 'job'} for t in self.transfers]
+
+    # helpers
+    def _start(self, pending, active):
+        """
+        Starts pending transfers while their endpoint and folder are free
+        """
+        for t in list(pending):
+            if self.ledger is not None and self._skip(t):
+                pending.remove(t)
+                continue
+            endpointLoad = len([a for a in active if a['localEndpoint'] == t['localEndpoint']])
+            if endpointLoad >= self.maxConcurrentPerEndpoint:
+                continue
+            if self.ledger is not None and self._resume(t, active):
+                pending.remove(t)
+                continue
+            try:
+                if t['folderId'] is None:
+                    if t['jobId'] not in self._folderIds:
+                        self._folderIds[t['jobId']] = t['job']._result_folder_id()
+                    t['folderId'] = self._folderIds[t['jobId']]
+                if t['folderId'] in [a['folderId'] for a in active]:
+                    continue
+                t['job']._globus_init(t['folderId'], t['remotePath'], t['localPath'], t['localEndpoint'])
+                t['status'] = 'ACTIVE'
+                active.append(t)
+                if self.ledger is not None:
+                    self.ledger.record(t['jobId'], t['folderId'], t['remotePath'], t['localPath'], t['localEndpoint'])
+            except Exception as e:
+                t['status'] = 'FAILED'
+                t['error'] = str(e)
+            pending.remove(t)
+
+    def _skip(self, t):
+        """
+        Uses the ledger to skip a transfer that succeeded and whose local
+        path still exists as seen from the kernel, unless `force` is set
+
+        Returns:
+            bool: True if the transfer is skipped
+        """
+        if self.force or not self.ledger.is_completed(t['jobId'], t['remotePath'], t['localPath']):
+            return False
+        localPath = t['localPath'] if self.jupyterGlobus is None else self.jupyterGlobus.kernel_path(t['localPath'])
+        if not os.path.exists(localPath):
+            return False
+        t['folderId'] = self.ledger.get(t['jobId'], t['remotePath'], t['localPath'])['folderId']
+        t['status'] = 'SUCCEEDED'
+        t['skipped'] = True
+        return True
+
+    def _resume(self, t, active):
+        """
+        Uses the ledger to re-attach to a running transfer
+
+        Returns:
+            bool: True if the transfer does not need to be started
+        """
+        if not self.ledger.is_running(t['jobId'], t['remotePath'], t['localPath']):
+            return False
+        t['folderId'] = self.ledger.get(t['jobId'], t['remotePath'], t['localPath'])['folderId']
+        t['status'] = 'ACTIVE'
+        active.append(t)
+        return True
+
+    def _poll(self, t):
+        """
+        Refreshes the status of one active transfer
+        """
+        try:
+            t['status'] = t['job']._globus_status(t['folderId'])['status']
+        except Exception as e:
+            t['status'] = 'FAILED'
+            t['error'] = str(e)
+        if self.ledger is not None:
+            self.ledger.set_status(t['jobId'], t['remotePath'], t['localPath'], t['status'])
+
+    def _print_progress(self):
+        counts = {}
+        for t in self.transfers:
+            counts[t['status']] = counts.get(t['status'], 0) + 1
+        self.output.message('⏳ Globus transfers: ' + ', '.join(k + ': ' + str(counts[k]) for k in sorted(counts)))
@@ -0,0 +1,138 @@
+"""
+This module exposes HPCRecommender class which ranks the HPCs a maintainer
+can submit to by expected time-to-result, estimated from the user's past
+jobs
+
+Example:
+        recommender = cybergis.get_hpc_recommender()
+        recommender.recommend('community_contribution', gitId='hello_world')
+        job = cybergis.create_job(hpc='auto')
+"""
+import math
+from .JobGroup import JobGroup  # noqa
+
+
+class HPCRecommender:
+    """
+    HPCRecommender class
+
+    The expected time-to-result on an HPC is the median wait time (queued
+    to started) plus the median run time of past jobs there, plus one run
+    time for every full `job_pool_capacity` of the user's jobs still
+    queued or running there, divided by the chance of success. Run times of
+    the same executable are preferred once there are `minSamples` of them.
+    HPCs without history get the median estimate over all HPCs, and the
+    maintainer's `default_hpc` wins ties.
+
+    Args:
+        maintainers (dict): Output of `list_maintainer(raw=True)`
+        hpcs (dict): Output of `list_hpc(raw=True)`
+        analytics (JobAnalytics): Lifecycle durations of the user's jobs
+        minSamples (int): Samples needed before a per-executable run time
+            replaces the per-HPC one
+    """
+    def __init__(self, maintainers, hpcs, analytics, minSamples=3):
+        self.maintainers = maintainers
+        self.hpcs = hpcs
+        self.analytics = analytics
+        self.minSamples = minSamples
+        self._waitTimes = analytics.summary(by='hpc', metric='waitTime', percentiles=(50, ))
+        self._runTimes = analytics.summary(by='hpc', metric='runTime', percentiles=(50, ))
+
+    def candidates(self, maintainer, communityOnly=True):
+        """
+        Returns the HPCs a maintainer can submit to
+
+        Args:
+            maintainer (str): Maintainer
+            communityOnly (bool): Only HPCs with a community account, i.e.
+                usable without HPC credentials
+
+        Returns:
+            list: HPC names
+        """
+        supported = self.maintainers[maintainer].get('hpc') or [self.maintainers[maintainer]['default_hpc']]
+        if isinstance(supported, str):
+            supported = [supported]
+        return [hpc for hpc in supported if hpc in self.hpcs and (
+            not communityOnly or self.hpcs[hpc].get('is_community_account'))]
+
+    def rank(self, maintainer, gitId=None, candidates=None, communityOnly=True):
+        """
+        Ranks HPCs by expected time-to-result, fastest first
+
+        Args:
+            maintainer (str): Maintainer of the job
+            gitId (str): Executable git id of the job
+            candidates (list): HPCs to consider, e.g. a job template's
+                `supported_hpc`; narrowed to the maintainer's HPCs
+            communityOnly (bool): Only HPCs with a community account
+
+        Returns:
+            list: One dict per HPC with keys `hpc`, `expectedTime`,
+            `waitTime`, `runTime`, `pending`, `failureRate` and `samples`
+        """
+        hpcs = self.candidates(maintainer, communityOnly)
+        if candidates is not None:
+            hpcs = [hpc for hpc in hpcs if hpc in candidates]
+        capacity = self.maintainers[maintainer].get('job_pool_capacity') or 1
+        ranking = []
+        for hpc in hpcs:
+            wait = self._waitTimes.get(hpc, {})
+            run = self._runTimes.get(hpc, {})
+            runTime = run.get('p50', math.nan)
+            if gitId is not None:
+                own = self.analytics.subset(hpc=hpc, gitId=gitId).summary(by='hpc', metric='runTime', percentiles=(50, ))
+                if hpc in own and own[hpc]['finished'] >= self.minSamples:
+                    runTime = own[hpc]['p50']
+            states = self.analytics.subset(hpc=hpc, maintainer=maintainer).columns['state']
+            pending = len([s for s in states if s not in JobGroup.finalStates])
+            ranking.append({
+                'hpc': hpc,
+                'waitTime': wait.get('p50', math.nan),
+                'runTime': runTime,
+                'pending': pending,
+                'failureRate': run.get('failureRate', math.nan),
+                'samples': run.get('finished', 0)})
+
+        fallbackWait = self._median([r['waitTime'] for r in ranking])
+        fallbackRun = self._median([r['runTime'] for r in ranking])
+        for r in ranking:
+            wait = fallbackWait if math.isnan(r['waitTime']) else r['waitTime']
+            run = fallbackRun if math.isnan(r['runTime']) else r['runTime']
+            failureRate = 0 if math.isnan(r['failureRate']) else min(r['failureRate'], 0.9)
+            r['expectedTime'] = (wait + run * (1 + r['pending'] // capacity)) / (1 - failureRate)
+        default = self.maintainers[maintainer].get('default_hpc')
+
+        def order(r):
+            unknown = math.isnan(r['expectedTime'])
+            return (unknown, 0 if unknown else r['expectedTime'], r['hpc'] != default)
+        return sorted(ranking, key=order)
+
+    def recommend(self, maintainer, gitId=None, candidates=None, communityOnly=True):
+        """
+        Returns the HPC with the lowest expected time-to-result
+
+        Args:
+            maintainer (str): Maintainer of the job
+            gitId (str): Executable git id of the job
+            candidates (list): HPCs to consider
+            communityOnly (bool): Only HPCs with a community account
+
+        Returns:
+            str: HPC name, the maintainer's `default_hpc` when there is no
+            history or no candidate
+        """
+        ranking = self.rank(maintainer, gitId, candidates, communityOnly)
+        if len(ranking) == 0:
+            return self.maintainers[maintainer].get('default_hpc')
+        return ranking[0]['hpc']
+
+    # helpers
+    @staticmethod
+    def _median(values):
+        values = sorted(v for v in values if not math.isnan(v))
+        if len(values) == 0:
+            return math.nan
+        middle = len(values) // 2
+        return values[middle] if len(values) % 2 else (values[middle - 1] + values[middle]) / 2
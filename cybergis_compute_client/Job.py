@@ -1,9 +1,11 @@
-from .MarkdownTable import MarkdownTable  # noqa
+from .Output import OutputBackend  # noqa
+from .ResultFolderIndex import ResultFolderIndex  # noqa
+from .GlobusDownloader import GlobusDownloader  # noqa
+from .JupyterGlobus import JupyterGlobus  # noqa
 import time
 import json
-from os import system, name
-from IPython.display import display, clear_output, Markdown
-import ipywidgets as widgets
+import os
+import posixpath
 
 
 class Job:
@@ -13,7 +15,13 @@ class Job:
     Attributes:
         client (obj): Client that this job requests information from
         maintainer (obj): Maintainer pool that this job is in
+        transferLedger (TransferLedger): Records Globus downloads so they can
+            be resumed, None to disable
+        resultCache (ResultCache): Reuses succeeded identical jobs on submit,
+            None to disable
         isJupyter (bool): Whether or not this is running in Jupyter
+        output (OutputBackend): Where messages and tables go, defaults to
+            the Jupyter or terminal backend depending on `isJupyter`
         jupyterhubApiToken (str): API token needed to send requests
             using the JupyterHub API
         id (str): Id assigned to this job by the client
@@ -25,14 +33,19 @@ class Job:
         'GLOBUS_TRANSFER_INIT_SUCCESS', 'JOB_ENDED', 'JOB_FAILED']
 
     def __init__(self, maintainer=None, hpc=None, id=None, hpcUsername=None, hpcPassword=None,
-                 client=None, isJupyter=None, jupyterhubApiToken=None, printJob=True):
+                 client=None, isJupyter=None, jupyterhubApiToken=None, printJob=True, transferLedger=None, resultCache=None, output=None):
         # TODO: we can make this better
         if (jupyterhubApiToken is None):
             raise Exception('please login to jupyter first')
         self.client = client
         self.maintainer = maintainer
         self.isJupyter = isJupyter
+        self.output = output if output is not None else OutputBackend.default(isJupyter)
         self.jupyterhubApiToken = jupyterhubApiToken
+        self.transferLedger = transferLedger
+        self.resultCache = resultCache
+        self.submission = {}
+        self.jupyterGlobus = JupyterGlobus(client, jupyterhubApiToken)
 
         job = None
         if (id is None):
@@ -59,25 +72,52 @@ class Job:
             hpc = job['hpc']
 
         if (hpcPassword is not None):
-            print('⚠️ HPC password input detected, change your code to use .get_job_by_id() instead')
-            print('🙅‍♂️ it\'s not safe to distribute code with login credentials')
+            self.output.message('⚠️ HPC password input detected, change your code to use .get_job_by_id() instead')
+            self.output.message('🙅‍♂️ it\'s not safe to distribute code with login credentials')
 
         self.id = id
         self.hpc = hpc
+        self.resultFolderIndex = None
         if printJob:
-            self._print_job_formatted(job)
+            self._print_job_formatted(job, self.output)
 
-    def submit(self):
+    def submit(self, printJob=True):
         """
-        Submits this job to the client, and prints the output
+        Submits this job to the client, and prints the output. With a
+        result cache, a job identical to one that already succeeded is not
+        submitted: the job created on the server for this object is
+        cancelled and this object switches to the succeeded job instead.
+
+        Args:
+            printJob (bool): If the submitted job should be printed
 
         Returns:
             Job: This job
         """
+        memoKey = self._memo_key()
+        if memoKey is not None:
+            entry = self.resultCache.lookup(memoKey)
+            if entry is not None:
+                if printJob:
+                    self.output.message('♻️ identical job ' + entry['jobId'] + ' already succeeded, reusing its result instead of ' + self.id)
+                try:
+                    # the job created for this object would otherwise stay CREATED on the server
+                    self.client.request('PUT', '/job/' + self.id + '/cancel', {
+                        'jupyterhubApiToken': self.jupyterhubApiToken, 'jobId': self.id})
+                except Exception as e:
+                    self.output.message('⚠️ failed to cancel unused job ' + self.id + ': ' + str(e))
+                self.id = entry['jobId']
+                self.hpc = entry['hpc']
+                self.resultFolderIndex = None
+                return self
+
         body = {'jupyterhubApiToken': self.jupyterhubApiToken}
         job = self.client.request('POST', '/job/' + self.id + '/submit', body)
-        print('✅ job submitted')
-        self._print_job_formatted(job)
+        if memoKey is not None:
+            self.resultCache.add(memoKey, self.id, self.submission['gitId'], self.hpc)
+        if printJob:
+            self.output.message('✅ job submitted')
+            self._print_job_formatted(job, self.output)
         return self
 
     def set(self, localExecutableFolder=None, localDataFolder=None, localResultFolder=None, param=None, env=None,
@@ -112,7 +152,13 @@ class Job:
             body['slurm'] = slurm
 
         if (len(list(body)) == 1):
-            print('❌ please set at least one parmeter')
+            self.output.message('❌ please set at least one parmeter')
+
+        if localExecutableFolder:
+            self.submission['gitId'] = localExecutableFolder.get('gitId') if localExecutableFolder.get('type') == 'git' else None
+        for key, value in [('param', param), ('slurm', slurm), ('localDataFolder', localDataFolder)]:
+            if value:
+                self.submission[key] = value
 
         job = self.client.request('PUT', '/job/' + self.id, body)
         if printJob:
@@ -121,29 +167,30 @@ class Job:
     def events(
         self, raw=False,
             basic=True,
-            refreshRateInSeconds=10):
+            refreshRateInSeconds=10,
+            liveOutput=True,
+            output=None):
         """
         While the job is running, display the events generated by the client
 
         Args:
             raw (bool): If true, return a list of the events
             generated by status
-            liveOutput (bool):
+            liveOutput (bool): Keep refreshing until the job ends,
+            False to display the events once without blocking
             basic (bool): If true, exclude non-basicEventType events
             RefreshRateInSeconds (int): Number of seconds to wait before
             refreshing status
-
-        Todo:
-            Modify function to include liveOutput or remove it
-            from the arguments
+            output (OutputBackend): Where to display them instead of this job's output
         """
         if raw:
             return self.status(raw=True)['events']
 
+        output = output or self.output
         isEnd = False
         jobFailure = False
-        while (not isEnd):
-            self._clear()
+        while True:
+            output.clear()
             status = self.status(raw=True)
             out = status['events']
             headers = ['types', 'message', 'time']
@@ -161,55 +208,42 @@ class Job:
                 if isEnd and o['type'] == 'JOB_FAILED':
                     jobFailure = True
 
-            print('📮 Job ID: ' + self.id)
+            output.message('📮 Job ID: ' + self.id)
             if 'slurmId' in status:
-                print('🤖 Slurm ID: ' + str(status['slurmId']))
-
-            def markdown_widget(text):
-                out = widgets.Output()
-                with out:
-                    display(Markdown(text))
-                return out
-            markdown = MarkdownTable.render(events, headers)
-            markdown_table = markdown_widget(markdown)
-            table_exp = widgets.Accordion(children=[markdown_table], selected_index=None)
-            table_exp.set_title(0, "See events")
+                output.message('🤖 Slurm ID: ' + str(status['slurmId']))
             if len(events) > 0:
-                if self.isJupyter:
-                    display(table_exp)
-                else:
-                    print(markdown)
+                output.table(events, headers, title="See events")
 
-            if not isEnd:
-                time.sleep(refreshRateInSeconds)
+            if isEnd or not liveOutput:
+                break
+            time.sleep(refreshRateInSeconds)
         return jobFailure
 
-    def logs(self, raw=False, liveOutput=True, refreshRateInSeconds=15):
+    def logs(self, raw=False, liveOutput=True, refreshRateInSeconds=15, output=None):
         """
         While the job is running, display the logs generated by the client.
 
         Args:
             raw (bool): If true, return a list of the events
             generated by status
-            liveOutput (bool):
+            liveOutput (bool): Keep refreshing until the job ends,
+            False to display the logs once without blocking
             RefreshRateInSeconds (int): Number of seconds to wait
             before refreshing status
+            output (OutputBackend): Where to display them instead of this job's output
 
         Returns:
             list: List of logs generated by the client.
             Only returned if raw is true.
-
-        Todo:
-            Modify function to include liveOutput
-            or remove it from the arguments
         """
         if raw:
             return self.status(raw=True)['logs']
 
+        output = output or self.output
         logs = []
         isEnd = False
-        while (not isEnd):
-            self._clear()
+        while True:
+            output.clear()
             status = self.status(raw=True)
             headers = ['message', 'time']
             logs = []
@@ -225,26 +259,14 @@ class Job:
                 ]
                 logs.append(i)
 
-            print('📮 Job ID: ' + self.id)
+            output.message('📮 Job ID: ' + self.id)
             if 'slurmId' in status:
-                print('🤖 Slurm ID: ' + str(status['slurmId']))
-
-            def markdown_widget(text):
-                out = widgets.Output()
-                with out:
-                    display(Markdown(text))
-                return out
-            markdown = MarkdownTable.render(logs, headers)
-            markdown_table = markdown_widget(markdown)
-            table_exp = widgets.Accordion(children=[markdown_table], selected_index=None)
-            table_exp.set_title(0, "See logs")
+                output.message('🤖 Slurm ID: ' + str(status['slurmId']))
             if len(logs) > 0:
-                if self.isJupyter:
-                    display(table_exp)
-                else:
-                    print(markdown)
-            if not isEnd:
-                time.sleep(refreshRateInSeconds)
+                output.table(logs, headers, title="See logs")
+            if isEnd or not liveOutput:
+                break
+            time.sleep(refreshRateInSeconds)
 
     def status(self, raw=False):
         """
@@ -271,7 +293,7 @@ class Job:
 
         if raw:
             return job
-        self._print_job_formatted(job)
+        self._print_job_formatted(job, self.output)
 
     def result_folder_content(self):
         """
@@ -286,16 +308,45 @@ class Job:
         if self.id is None:
             raise Exception('missing job ID, submit/register job first')
         out = self.client.request('GET', '/job/' + self.id + '/result-folder-content', {'jupyterhubApiToken': self.jupyterhubApiToken})
+        if self.resultFolderIndex is None:
+            self.resultFolderIndex = ResultFolderIndex()
+        self.resultFolderIndex.update(out)
         return out
 
-    def download_result_folder_by_globus(self, localPath=None, localEndpoint=None, remotePath=None, raw=False):
+    def result_folder_index(self, refresh=False, maxAgeInSeconds=None):
         """
-        Downloads the folder with results from the job using Globus
+        Returns a cached index over the result folder content that supports
+        prefix, glob and extension queries. The listing is only fetched
+        again when `refresh` is set or the index is older than
+        `maxAgeInSeconds`, and is then applied incrementally.
+
+        Args:
+            refresh (bool): Force refetching the result folder content
+            maxAgeInSeconds (int): Refetch if the index is older than this
+
+        Returns:
+            ResultFolderIndex: Index over the result folder content
+
+        Raises:
+            Exception: If the id is None
+        """
+        if refresh or self.resultFolderIndex is None or self.resultFolderIndex.is_stale(maxAgeInSeconds):
+            self.result_folder_content()
+        return self.resultFolderIndex
+
+    def download_result_folder_by_globus(self, localPath=None, localEndpoint=None, remotePath=None, raw=False, force=False):
+        """
+        Downloads the folder with results from the job using Globus.
+        If the job has a transfer ledger, completed downloads whose local
+        path still exists, as seen from the kernel, are skipped and a
+        download still running from a previous session is re-attached
+        instead of started again.
 
         Args:
             remotePath (string): Path to the remote result folder
             raw (bool): If the function should return the
             output from the client
+            force (bool): Download again even if the ledger says it succeeded
 
         Returns:
             dict: Output from the client when downloading the
@@ -309,50 +360,131 @@ class Job:
         if self.id is None:
             raise Exception('missing job ID, submit/register job first')
 
-        jobStatus = self.status(raw=True)
-        if 'remoteResultFolder' not in jobStatus:
-            raise Exception('executable folder is not ready')
-        folderId = jobStatus['remoteResultFolder']['id']
-
-        # init globus transfer
-        self.client.request('POST', '/folder/' + folderId + '/download/globus-init', {
-            "jobId": self.id,
-            "jupyterhubApiToken": self.jupyterhubApiToken,
-            "fromPath": remotePath,
-            "toPath": localPath,
-            "toEndpoint": localEndpoint
-        })
+        ledger = self.transferLedger
+        if not force and ledger is not None and ledger.is_completed(self.id, remotePath, localPath) and (
+                localPath is not None and os.path.exists(self.jupyterGlobus.kernel_path(localPath))):
+            self.output.message('✅ already downloaded to ' + str(localPath) + ', skipping')
+            return
+        if ledger is not None and ledger.is_running(self.id, remotePath, localPath):
+            # re-attach to the transfer started before the kernel restarted
+            folderId = ledger.get(self.id, remotePath, localPath)['folderId']
+        else:
+            folderId = self._result_folder_id()
+            self._globus_init(folderId, remotePath, localPath, localEndpoint)
+            if ledger is not None:
+                ledger.record(self.id, folderId, remotePath, localPath, localEndpoint)
 
         status = None
         while status not in ['SUCCEEDED', 'FAILED']:
             self._clear()
-            print('⏳ waiting for file to download using Globus')
-            out = self.client.request('GET', '/folder/' + folderId + '/download/globus-status', {
-                "jupyterhubApiToken": self.jupyterhubApiToken
-            })
+            self.output.message('⏳ waiting for file to download using Globus')
+            out = self._globus_status(folderId)
             status = out['status']
+            if ledger is not None:
+                ledger.set_status(self.id, remotePath, localPath, status)
             if raw:
                 return out
         # exit loop
         self._clear()
         if status == 'SUCCEEDED':
-            print('✅ download success!')
+            self.output.message('✅ download success!')
         else:
-            print('❌ download fail!')
+            self.output.message('❌ download fail!')
+
+    def download_result_folders_by_globus(self, remotePaths=None, pattern=None, localPath=None, localEndpoint=None,
+                                          maxConcurrentPerEndpoint=4, refreshRateInSeconds=5, verbose=True, force=False):
+        """
+        Downloads several paths of the result folder using Globus. Each
+        path is saved under `localPath` keeping its relative location.
+
+        Args:
+            remotePaths (list): Paths inside the remote result folder
+            pattern (str or callable): Glob pattern or predicate used to select
+                paths from the result folder content instead of `remotePaths`
+            localPath (str): Local root folder the paths are saved into,
+                defaults to the Jupyter Globus root path
+            localEndpoint (str): Globus endpoint id of the destination,
+                defaults to the Jupyter Globus endpoint
+            maxConcurrentPerEndpoint (int): Transfers running at the same time
+            refreshRateInSeconds (int): Seconds between two polling rounds
+            verbose (bool): Print progress while waiting
+            force (bool): Download again paths the ledger says succeeded
+
+        Returns:
+            list: Per-transfer results, see :class:`GlobusDownloader`
+        """
+        if localPath is None or localEndpoint is None:
+            jupyter_globus = self.jupyterGlobus.settings()
+            localPath = jupyter_globus['root_path'] if localPath is None else localPath
+            localEndpoint = jupyter_globus['endpoint'] if localEndpoint is None else localEndpoint
+
+        downloader = GlobusDownloader(maxConcurrentPerEndpoint, refreshRateInSeconds, verbose, self.transferLedger, self.output,
+                                      force, self.jupyterGlobus)
+        for remotePath in self._select_result_paths(remotePaths, pattern):
+            downloader.add(self, remotePath, posixpath.join(localPath, remotePath.strip('/')), localEndpoint)
+        return downloader.run()
 
     # Helpers
+    def _memo_key(self):
+        """
+        Returns the result cache key of this job's configuration, None if
+        there is no cache or the executable is not a git template
+        """
+        if self.resultCache is None or self.submission.get('gitId') is None:
+            return None
+        return self.resultCache.key(self.submission['gitId'], self.hpc, self.submission.get('param'),
+                                    self.submission.get('slurm'), self.submission.get('localDataFolder'))
+
+    def _select_result_paths(self, remotePaths=None, pattern=None):
+        """
+        Returns `remotePaths`, or the result folder paths matching `pattern`
+        """
+        if remotePaths is not None:
+            return list(remotePaths)
+        if pattern is None:
+            return ['/']
+        index = self.result_folder_index()
+        if callable(pattern):
+            return [p for p in index if pattern(p)]
+        return index.glob(pattern)
+
+    def _result_folder_id(self):
+        """
+        Returns the id of the remote result folder of this job
+
+        Raises:
+            Exception: If the result folder is not ready
+        """
+        jobStatus = self.status(raw=True)
+        if 'remoteResultFolder' not in jobStatus or jobStatus['remoteResultFolder'] is None:
+            raise Exception('executable folder is not ready')
+        return jobStatus['remoteResultFolder']['id']
+
+    def _globus_init(self, folderId, remotePath, localPath, localEndpoint):
+        """
+        Starts a Globus transfer out of the result folder
+        """
+        return self.client.request('POST', '/folder/' + folderId + '/download/globus-init', {
+            "jobId": self.id,
+            "jupyterhubApiToken": self.jupyterhubApiToken,
+            "fromPath": remotePath,
+            "toPath": localPath,
+            "toEndpoint": localEndpoint
+        })
+
+    def _globus_status(self, folderId):
+        """
+        Returns the status of the Globus transfer out of the result folder
+        """
+        return self.client.request('GET', '/folder/' + folderId + '/download/globus-status', {
+            "jupyterhubApiToken": self.jupyterhubApiToken
+        })
+
     def _clear(self):
         """
         Clears output
         """
-        if self.isJupyter:
-            clear_output(wait=True)
-        # for windows
-        if name == 'nt':
-            _ = system('cls')
-        # for mac and linux(here, os.name is 'posix')
-        else:
-            _ = system('clear')
+        self.output.clear()
 
     def _print_job(self, job):
         """
@@ -381,16 +513,18 @@ class Job:
             job['createdAt'],
         ]]
 
-        if self.isJupyter:
-            display(Markdown(MarkdownTable.render(data, headers)))
-        else:
-            print(MarkdownTable.render(data, headers))
+        self.output.table(data, headers)
 
-    def _print_job_formatted(self, job):
-        """
-        Displays information about the job formatted in a way that can be read with no horizonal scroll bar
+    @staticmethod
+    def _print_job_formatted(job, output):
         """
+        Displays information about the job formatted in a way that can be read with no horizonal scroll bar.
+        Only needs the job record, so listings can show jobs without a Job object per row.
 
+        Args:
+            job (dict): Job record
+            output (OutputBackend): Where to show the job
+        """
         if job is None:
             return
         if job['localExecutableFolder'] is None:
@@ -421,9 +555,5 @@ class Job:
             modelName
         ]]
 
-        if self.isJupyter:
-            display(Markdown(MarkdownTable.render(dataCol1, headersCol1)))
-            display(Markdown(MarkdownTable.render(dataCol2, headersCol2)))
-        else:
-            print(MarkdownTable.render(dataCol1, headersCol1))
-            print(MarkdownTable.render(dataCol2, headersCol2))
+        output.table(dataCol1, headersCol1)
+        output.table(dataCol2, headersCol2)
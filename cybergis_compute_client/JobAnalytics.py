@@ -0,0 +1,268 @@
+"""
+This module exposes JobAnalytics class which turns the event timestamps of
+many jobs into columns of lifecycle durations and aggregates them per HPC
+or maintainer
+
+Example:
+        analytics = cybergis.job_analytics()
+        analytics.summary(by='hpc', metric='queueTime')
+        df = analytics.to_dataframe()  # needs pandas
+"""
+import math
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+from .JobGroup import JobGroup  # noqa
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+class JobAnalytics:
+    """
+    JobAnalytics class
+
+    Each job becomes one row. Durations are in seconds, taken between the
+    first occurrence of the events below, and are NaN when either event is
+    missing:
+
+    - `queueTime`: JOB_QUEUED to JOB_REGISTERED
+    - `initTime`: JOB_REGISTERED to JOB_INIT
+    - `waitTime`: JOB_QUEUED to JOB_INIT, i.e. time until the job started
+    - `runTime`: JOB_INIT to JOB_ENDED or JOB_FAILED
+    - `transferTime`: first to last GLOBUS_TRANSFER_* event
+    - `totalTime`: JOB_QUEUED to JOB_ENDED or JOB_FAILED
+
+    Columns are NumPy arrays when NumPy is installed and lists otherwise.
+
+    Args:
+        jobs (list): Job records carrying `events`, e.g. from `/job/{id}`
+
+    Attributes:
+        columns (dict): Column name to array (or list) of one value per job
+    """
+    metrics = ['queueTime', 'initTime', 'waitTime', 'runTime', 'transferTime', 'totalTime']
+    labels = ['id', 'hpc', 'maintainer', 'gitId', 'state']
+
+    def __init__(self, jobs):
+        rows = [self._row(job) for job in jobs]
+        self.columns = {}
+        for name in self.labels + ['startedAt', 'finishedAt'] + self.metrics:
+            values = [row[name] for row in rows]
+            if np is not None:
+                values = np.array(values, dtype=object if name in self.labels else float)
+            self.columns[name] = values
+
+    def __len__(self):
+        return len(self.columns['id'])
+
+    @classmethod
+    def fetch(cls, client, jupyterhubApiToken, ids=None, maxWorkers=8, limit=None):
+        """
+        Pulls the events of many jobs. The user's job listing is fetched
+        once, and job details are only fetched, concurrently, for listed
+        jobs whose records carry no events.
+
+        Args:
+            client (Client): Client used to talk to the server
+            jupyterhubApiToken (str): API token of the logged in user
+            ids (list): Only these job ids, all of the user's jobs if None
+            maxWorkers (int): Detail requests running at the same time
+            limit (int): Only the most recently created jobs, all if None
+
+        Returns:
+            JobAnalytics: Analytics over the fetched jobs
+        """
+        token = {'jupyterhubApiToken': jupyterhubApiToken}
+        jobs = client.request('GET', '/user/job', token)['job']
+        if ids is not None:
+            wanted = set(ids)
+            jobs = [job for job in jobs if job['id'] in wanted]
+        if limit is not None:
+            jobs = sorted(jobs, key=lambda job: str(job.get('createdAt')), reverse=True)[:limit]
+        missing = [i for i, job in enumerate(jobs) if not job.get('events')]
+        if missing:
+            with ThreadPoolExecutor(max_workers=maxWorkers) as executor:
+                details = executor.map(lambda i: client.request('GET', '/job/' + jobs[i]['id'], token), missing)
+                for i, job in zip(missing, details):
+                    jobs[i] = job
+        return cls(jobs)
+
+    def subset(self, **labels):
+        """
+        Returns the analytics of the jobs matching every given label
+
+        Args:
+            labels: Label column to value, e.g. `hpc='keeling_community'`
+
+        Returns:
+            JobAnalytics: Analytics over the matching jobs
+        """
+        mask = [True] * len(self)
+        for name, value in labels.items():
+            mask = [m and v == value for m, v in zip(mask, self.columns[name])]
+        if np is not None:
+            mask = np.array(mask, dtype=bool)
+        subset = JobAnalytics([])
+        subset.columns = {name: self._select(values, mask) for name, values in self.columns.items()}
+        return subset
+
+    def to_dataframe(self):
+        """
+        Returns:
+            pandas.DataFrame: One row per job, one column per entry of `columns`
+
+        Raises:
+            ImportError: If pandas is not installed
+        """
+        import pandas as pd
+        return pd.DataFrame({name: list(values) for name, values in self.columns.items()})
+
+    def summary(self, by='hpc', metric='totalTime', percentiles=(50, 90, 99)):
+        """
+        Aggregates one duration per group
+
+        Args:
+            by (str): Grouping column, e.g. "hpc" or "maintainer"
+            metric (str): One of `metrics`
+            percentiles (tuple): Percentiles of `metric` to compute
+
+        Returns:
+            dict: Per group value, a dict with keys `jobs`, `finished`,
+            `failed`, `failureRate`, `throughput` (finished jobs per hour
+            between the group's first start and last finish), `mean` and
+            `p<N>` for each percentile; durations of jobs without the
+            metric are left out
+        """
+        keys = self.columns[by]
+        states = self.columns['state']
+        values = self.columns[metric]
+        if np is not None:
+            groups, inverse = np.unique(keys.astype(str), return_inverse=True)
+            masks = [inverse == g for g in range(len(groups))]
+        else:
+            groups = sorted(set(str(k) for k in keys))
+            masks = [[str(k) == g for k in keys] for g in groups]
+
+        summary = {}
+        for group, mask in zip(groups, masks):
+            groupStates = self._select(states, mask)
+            finished = [s for s in groupStates if s in JobGroup.finalStates]
+            failed = [s for s in finished if s == 'FAILED']
+            samples = self._finite(self._select(values, mask))
+            start = self._finite(self._select(self.columns['startedAt'], mask))
+            end = self._finite(self._select(self.columns['finishedAt'], mask))
+            window = (max(end) - min(start)) if len(start) and len(end) else 0
+            stats = {
+                'jobs': len(groupStates),
+                'finished': len(finished),
+                'failed': len(failed),
+                'failureRate': len(failed) / len(finished) if finished else math.nan,
+                'throughput': len(finished) * 3600 / window if window > 0 else math.nan,
+                'mean': float(sum(samples) / len(samples)) if len(samples) else math.nan}
+            for p in percentiles:
+                stats['p' + str(p)] = self._percentile(samples, p)
+            summary[str(group)] = stats
+        return summary
+
+    def report(self, output, by='hpc', metric='totalTime', percentiles=(50, 90, 99)):
+        """
+        Displays :meth:`summary` as a table
+
+        Args:
+            output (OutputBackend): Where the table goes
+            by (str): Grouping column, e.g. "hpc" or "maintainer"
+            metric (str): One of `metrics`
+            percentiles (tuple): Percentiles of `metric` to compute
+        """
+        summary = self.summary(by, metric, percentiles)
+        headers = [by, 'jobs', 'failureRate', 'throughput/h', 'mean'] + ['p' + str(p) for p in percentiles]
+        data = []
+        for group, stats in summary.items():
+            data.append([group, stats['jobs'], self._round(stats['failureRate']), self._round(stats['throughput']),
+                         self._round(stats['mean'])] + [self._round(stats['p' + str(p)]) for p in percentiles])
+        output.table(data, headers, title=metric + ' by ' + by)
+
+    @staticmethod
+    def timestamp(value):
+        """
+        Converts an event time to seconds since the epoch
+
+        Args:
+            value (str or number): ISO 8601 string, or epoch seconds or
+                milliseconds
+
+        Returns:
+            float: Seconds, NaN if `value` cannot be read
+        """
+        if isinstance(value, (int, float)):
+            return float(value) / 1000 if value > 1e11 else float(value)
+        try:
+            return datetime.fromisoformat(str(value).replace('Z', '+00:00')).timestamp()
+        except ValueError:
+            return math.nan
+
+    # helpers
+    def _row(self, job):
+        """
+        Extracts the labels, timestamps and durations of one job record
+        """
+        first = {}
+        transfers = []
+        for event in job.get('events') or []:
+            t = self.timestamp(event.get('createdAt'))
+            first.setdefault(event['type'], t)
+            if event['type'].startswith('GLOBUS_TRANSFER'):
+                transfers.append(t)
+        ends = [first[t] for t in ['JOB_ENDED', 'JOB_FAILED'] if t in first]
+        end = min(ends) if ends else math.nan
+        executable = job.get('localExecutableFolder')
+        queued = first.get('JOB_QUEUED', math.nan)
+        registered = first.get('JOB_REGISTERED', math.nan)
+        init = first.get('JOB_INIT', math.nan)
+        return {
+            'id': job.get('id'),
+            'hpc': job.get('hpc'),
+            'maintainer': job.get('maintainer'),
+            'gitId': executable.get('gitId') if isinstance(executable, dict) else None,
+            'state': JobGroup.job_state(job) or 'CREATED',
+            'startedAt': queued,
+            'finishedAt': end,
+            'queueTime': registered - queued,
+            'initTime': init - registered,
+            'waitTime': init - queued,
+            'runTime': end - init,
+            'transferTime': max(transfers) - min(transfers) if len(transfers) > 1 else math.nan,
+            'totalTime': end - queued}
+
+    @staticmethod
+    def _select(values, mask):
+        if np is not None:
+            return values[mask]
+        return [v for v, m in zip(values, mask) if m]
+
+    @staticmethod
+    def _finite(values):
+        if np is not None:
+            return values[np.isfinite(values)]
+        return [v for v in values if not math.isnan(v)]
+
+    @staticmethod
+    def _percentile(samples, p):
+        """
+        Linearly interpolated percentile, like numpy's default
+        """
+        if len(samples) == 0:
+            return math.nan
+        if np is not None:
+            return float(np.percentile(samples, p))
+        samples = sorted(samples)
+        rank = (len(samples) - 1) * p / 100
+        low = int(math.floor(rank))
+        high = min(low + 1, len(samples) - 1)
+        return samples[low] + (samples[high] - samples[low]) * (rank - low)
+
+    @staticmethod
+    def _round(value):
+        return None if math.isnan(value) else round(value, 2)
@@ -0,0 +1,258 @@
+"""
+This module exposes JobGroup class which is a handle on a set of jobs,
+e.g. the jobs submitted by a parameter sweep, and monitors all of them
+with a single job listing request per refresh
+
+Example:
+        group = cybergis.submit_sweep(params)
+        group.on_complete(lambda id, state, job: print(id, state))
+        group.wait()
+"""
+from .Job import Job  # noqa
+from .Output import OutputBackend  # noqa
+import json
+import time
+
+
+class JobGroup:
+    """
+    JobGroup class
+
+    Args:
+        client (Client): Client used to talk to the server
+        jupyterhubApiToken (str): API token of the logged in user
+        isJupyter (bool): Whether or not this is running in Jupyter
+        jobs (list): Job objects or job ids to track
+        output (OutputBackend): Where summaries go, defaults to the Jupyter
+            or terminal backend depending on `isJupyter`
+
+    Attributes:
+        jobs (dict): Tracked jobs keyed by id. Values are Job objects, or
+            None for ids that have not been loaded
+        errors (list): Items that failed to be created, set or submitted,
+            as dicts with keys `index`, `param`, `jobId` (None if the job
+            was never created) and `error`
+        records (dict): Latest known job record per id
+        states (dict): Latest known state per id, one of `lifecycleStates`
+    """
+    # static variables
+    lifecycleStates = ['CREATED', 'QUEUED', 'RUNNING', 'ENDED', 'FAILED']
+    finalStates = ['ENDED', 'FAILED']
+
+    def __init__(self, client, jupyterhubApiToken, isJupyter=False, jobs=None, output=None):
+        self.client = client
+        self.jupyterhubApiToken = jupyterhubApiToken
+        self.isJupyter = isJupyter
+        self.output = output if output is not None else OutputBackend.default(isJupyter)
+        self.jobs = {}
+        self.errors = []
+        self.records = {}
+        self.states = {}
+        self._signatures = {}
+        self._callbacks = []
+        self._changeCallbacks = []
+        for job in jobs or []:
+            self.add(job)
+
+    def __len__(self):
+        return len(self.jobs)
+
+    def __iter__(self):
+        return iter(self.ids())
+
+    def __contains__(self, id):
+        return id in self.jobs
+
+    def add(self, job):
+        """
+        Starts tracking a job
+
+        Args:
+            job (Job or str): Job object or job id
+
+        Returns:
+            JobGroup: this JobGroup
+        """
+        if isinstance(job, Job):
+            self.jobs[job.id] = job
+        elif job not in self.jobs:
+            self.jobs[job] = None
+        id = job.id if isinstance(job, Job) else job
+        self.states.setdefault(id, 'CREATED')
+        return self
+
+    def ids(self):
+        """
+        Returns:
+            list: Ids of the tracked jobs in the order they were added
+        """
+        return list(self.jobs)
+
+    def get(self, id):
+        """
+        Returns the Job object of a tracked job, loading it on first use
+
+        Args:
+            id (str): Job id
+
+        Returns:
+            Job: The job
+        """
+        if self.jobs.get(id) is None:
+            self.jobs[id] = Job(client=self.client, id=id, isJupyter=self.isJupyter,
+                                jupyterhubApiToken=self.jupyterhubApiToken, printJob=False, output=self.output)
+        return self.jobs[id]
+
+    def on_complete(self, callback):
+        """
+        Registers a callback fired once for every job that ends or fails
+
+        Args:
+            callback (callable): Called as `callback(id, state, record)`
+
+        Returns:
+            JobGroup: this JobGroup
+        """
+        self._callbacks.append(callback)
+        return self
+
+    def on_status_change(self, callback):
+        """
+        Registers a callback fired every time a job's state changes
+
+        Args:
+            callback (callable): Called as `callback(id, previous, state, record)`
+
+        Returns:
+            JobGroup: this JobGroup
+        """
+        self._changeCallbacks.append(callback)
+        return self
+
+    def refresh(self):
+        """
+        Refreshes the state of every tracked job. The user's job listing is
+        fetched once, and a job's details are only fetched when its listing
+        entry changed and does not carry enough information to tell its state.
+
+        Returns:
+            dict: Number of jobs per state
+        """
+        listing = self.client.request('GET', '/user/job', {'jupyterhubApiToken': self.jupyterhubApiToken})
+        for record in listing['job']:
+            id = record['id']
+            if id not in self.jobs or self.states.get(id) in self.finalStates:
+                continue
+            signature = json.dumps(record, sort_keys=True, default=str)
+            if self._signatures.get(id) == signature:
+                continue
+            self._signatures[id] = signature
+            state = self.job_state(record)
+            if state is None:
+                record = self.client.request('GET', '/job/' + id, {'jupyterhubApiToken': self.jupyterhubApiToken})
+                state = self.job_state(record)
+            self._update(id, record, state or 'CREATED')
+        return self.counts()
+
+    def counts(self):
+        """
+        Returns:
+            dict: Number of tracked jobs per state
+        """
+        counts = {state: 0 for state in self.lifecycleStates}
+        for id in self.jobs:
+            counts[self.states.get(id, 'CREATED')] += 1
+        return counts
+
+    def is_done(self):
+        """
+        Returns:
+            bool: True if every tracked job ended or failed
+        """
+        return all(self.states.get(id) in self.finalStates for id in self.jobs)
+
+    def wait(self, refreshRateInSeconds=30, verbose=True):
+        """
+        Refreshes the group until every tracked job ended or failed
+
+        Args:
+            refreshRateInSeconds (int): Seconds between two refreshes
+            verbose (bool): Print the summary after every refresh
+
+        Returns:
+            dict: Number of jobs per state
+        """
+        while True:
+            self.refresh()
+            if verbose:
+                self.summary()
+            if self.is_done():
+                return self.counts()
+            time.sleep(refreshRateInSeconds)
+
+    def summary(self, raw=False):
+        """
+        Displays a compact table with the number of jobs per state
+
+        Args:
+            raw (bool): Return the counts instead of displaying them
+
+        Returns:
+            dict: Number of jobs per state, only if raw is True
+        """
+        counts = self.counts()
+        if raw:
+            return counts
+        headers = ['jobs'] + self.lifecycleStates + ['errors']
+        data = [[len(self.jobs)] + [counts[state] for state in self.lifecycleStates] + [len(self.errors)]]
+        self.output.table(data, headers)
+
+    @staticmethod
+    def job_state(job):
+        """
+        Tells the state of a job from its record
+
+        Args:
+            job (dict): Job record from `/user/job` or `/job/{id}`
+
+        Returns:
+            str: One of `JobGroup.lifecycleStates`, None if the record has neither
+            events nor lifecycle timestamps
+        """
+        if job.get('events'):
+            types = set(e['type'] for e in job['events'])
+            if 'JOB_FAILED' in types:
+                return 'FAILED'
+            if 'JOB_ENDED' in types:
+                return 'ENDED'
+            if 'JOB_INIT' in types:
+                return 'RUNNING'
+            if 'JOB_QUEUED' in types or 'JOB_REGISTERED' in types:
+                return 'QUEUED'
+            return 'CREATED'
+        if 'finishedAt' not in job and 'isFailed' not in job:
+            return None
+        if job.get('isFailed'):
+            return 'FAILED'
+        if job.get('finishedAt'):
+            return 'ENDED'
+        if job.get('initializedAt'):
+            return 'RUNNING'
+        if job.get('queuedAt'):
+            return 'QUEUED'
+        return 'CREATED'
+
+    # helpers
+    def _update(self, id, record, state):
+        """
+        Stores the new state of a job and fires status change and completion callbacks
+        """
+        previous = self.states.get(id)
+        self.records[id] = record
+        self.states[id] = state
+        if state != previous:
+            for callback in self._changeCallbacks:
+                callback(id, previous, state, record)
+        if state in self.finalStates and previous not in self.finalStates:
+            for callback in self._callbacks:
+                callback(id, state, record)
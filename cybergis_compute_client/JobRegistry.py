@@ -0,0 +1,190 @@
+"""
+This module exposes JobRegistry class which keeps a local SQLite index
+of the user's jobs, folders and final statuses that is synchronized
+incrementally from the server
+
+Example:
+        registry = JobRegistry('./cybergis_compute_jobs.db')
+        registry.sync(client, jupyterhubApiToken)
+        registry.query(hpc='keeling_community', status='ENDED')
+"""
+import json
+import sqlite3
+import threading
+from .JobGroup import JobGroup  # noqa
+
+
+class JobRegistry:
+    """
+    JobRegistry class
+
+    Jobs are stored with their maintainer, hpc, git id, creation time and
+    state, each of which is indexed. A sync only writes jobs created after
+    the newest job already stored (the `createdAt` watermark) and jobs
+    whose state was not final yet; finished jobs are never rewritten.
+
+    Args:
+        path (str): Location of the database, ":memory:" for a throwaway one
+
+    Attributes:
+        path (str): Location of the database
+    """
+    folderKinds = ['remoteExecutableFolder', 'remoteDataFolder', 'remoteResultFolder']
+
+    def __init__(self, path='./cybergis_compute_jobs.db'):
+        self.path = path
+        self._lock = threading.Lock()
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.connection.executescript("""
+            CREATE TABLE IF NOT EXISTS job (
+                id TEXT PRIMARY KEY, maintainer TEXT, hpc TEXT, gitId TEXT,
+                userId TEXT, createdAt TEXT, status TEXT, record TEXT);
+            CREATE INDEX IF NOT EXISTS job_maintainer ON job (maintainer, createdAt);
+            CREATE INDEX IF NOT EXISTS job_hpc ON job (hpc, createdAt);
+            CREATE INDEX IF NOT EXISTS job_gitId ON job (gitId, createdAt);
+            CREATE INDEX IF NOT EXISTS job_status ON job (status, createdAt);
+            CREATE INDEX IF NOT EXISTS job_createdAt ON job (createdAt);
+            CREATE TABLE IF NOT EXISTS folder (
+                id TEXT PRIMARY KEY, jobId TEXT, kind TEXT, name TEXT, hpc TEXT, record TEXT);
+            CREATE INDEX IF NOT EXISTS folder_jobId ON folder (jobId);
+            CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+        """)
+        self.connection.commit()
+
+    def __len__(self):
+        return self.connection.execute('SELECT COUNT(*) FROM job').fetchone()[0]
+
+    def close(self):
+        """
+        Closes the database
+        """
+        self.connection.close()
+
+    def watermark(self):
+        """
+        Returns:
+            str: `createdAt` of the newest stored job, None if empty
+        """
+        row = self.connection.execute("SELECT value FROM meta WHERE key = 'watermark'").fetchone()
+        return row[0] if row else None
+
+    def sync(self, client, jupyterhubApiToken, jobs=None):
+        """
+        Pulls the user's jobs and stores what changed since the last sync
+
+        Args:
+            client (Client): Client used to talk to the server
+            jupyterhubApiToken (str): API token of the logged in user
+            jobs (list): Job records to apply instead of fetching `/user/job`
+
+        Returns:
+            int: Number of jobs inserted or updated
+        """
+        if jobs is None:
+            jobs = client.request('GET', '/user/job', {'jupyterhubApiToken': jupyterhubApiToken})['job']
+        return self.apply(jobs)
+
+    def apply(self, jobs):
+        """
+        Stores job records that are newer than the watermark or not final
+
+        Args:
+            jobs (list): Job records from `/user/job`
+
+        Returns:
+            int: Number of jobs inserted or updated
+        """
+        with self._lock:
+            watermark = self.watermark()
+            open_ids = set(r[0] for r in self.connection.execute(
+                'SELECT id FROM job WHERE status NOT IN (?, ?)', JobGroup.finalStates))
+            changed = 0
+            for job in jobs:
+                createdAt = str(job.get('createdAt'))
+                if watermark is not None and createdAt <= watermark and job['id'] not in open_ids:
+                    continue
+                self._store(job)
+                changed += 1
+                if watermark is None or createdAt > watermark:
+                    watermark = createdAt
+            if watermark is not None:
+                self.connection.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('watermark', ?)", (watermark, ))
+            self.connection.commit()
+        return changed
+
+    def query(self, maintainer=None, hpc=None, gitId=None, status=None, since=None, until=None,
+              limit=None, offset=0, newestFirst=True):
+        """
+        Returns stored job records matching every given filter
+
+        Args:
+            maintainer (str): Maintainer
+            hpc (str): HPC
+            gitId (str): Executable git id
+            status (str or list): State(s), see :class:`cybergis_compute_client.JobGroup.JobGroup`
+            since (str): Only jobs created at or after this time
+            until (str): Only jobs created before this time
+            limit (int): Maximum number of jobs
+            offset (int): Number of matching jobs to skip
+            newestFirst (bool): Order by creation time, newest first
+
+        Returns:
+            list: Job records
+        """
+        where, args = [], []
+        for column, value in [('maintainer', maintainer), ('hpc', hpc), ('gitId', gitId)]:
+            if value is not None:
+                where.append(column + ' = ?')
+                args.append(value)
+        if status is not None:
+            status = [status] if isinstance(status, str) else list(status)
+            where.append('status IN (' + ', '.join('?' * len(status)) + ')')
+            args += status
+        if since is not None:
+            where.append('createdAt >= ?')
+            args.append(str(since))
+        if until is not None:
+            where.append('createdAt < ?')
+            args.append(str(until))
+        sql = 'SELECT record FROM job'
+        if where:
+            sql += ' WHERE ' + ' AND '.join(where)
+        sql += ' ORDER BY createdAt ' + ('DESC' if newestFirst else 'ASC')
+        if limit is not None or offset:
+            sql += ' LIMIT ? OFFSET ?'
+            args += [-1 if limit is None else limit, offset]
+        with self._lock:
+            return [json.loads(r[0]) for r in self.connection.execute(sql, args)]
+
+    def folders(self, jobId):
+        """
+        Returns the folders of a stored job
+
+        Args:
+            jobId (str): Job id
+
+        Returns:
+            dict: Folder records keyed by kind, e.g. "remoteResultFolder"
+        """
+        with self._lock:
+            rows = self.connection.execute('SELECT kind, record FROM folder WHERE jobId = ?', (jobId, )).fetchall()
+        return {kind: json.loads(record) for kind, record in rows}
+
+    # helpers
+    def _store(self, job):
+        """
+        Inserts or replaces one job and its folders
+        """
+        executable = job.get('localExecutableFolder')
+        gitId = executable.get('gitId') if isinstance(executable, dict) else None
+        status = JobGroup.job_state(job) or 'UNKNOWN'
+        self.connection.execute(
+            'INSERT OR REPLACE INTO job (id, maintainer, hpc, gitId, userId, createdAt, status, record) VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+            (job['id'], job.get('maintainer'), job.get('hpc'), gitId, job.get('userId'),
+             str(job.get('createdAt')), status, json.dumps(job, default=str)))
+        for kind in self.folderKinds:
+            folder = job.get(kind)
+            if isinstance(folder, dict) and 'id' in folder:
+                self.connection.execute(
+                    'INSERT OR REPLACE INTO folder (id, jobId, kind, name, hpc, record) VALUES (?, ?, ?, ?, ?, ?)',
+                    (folder['id'], job['id'], kind, folder.get('name'), folder.get('hpc'), json.dumps(folder, default=str)))
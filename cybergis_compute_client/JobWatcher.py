@@ -0,0 +1,215 @@
+"""
+This module exposes JobWatcher class which polls registered jobs from a
+background thread and fires callbacks when their state changes, so the
+caller (e.g. the Jupyter kernel) is never blocked while jobs run
+
+Example:
+        watcher = cybergis.watch_job(job, on_end=lambda id, state, record: print(id, 'done'))
+        watcher.stop()
+"""
+import threading
+from .JobGroup import JobGroup  # noqa
+
+
+class JobWatcher:
+    """
+    JobWatcher class
+
+    All watched jobs share one schedule and one job listing request per
+    tick, see :meth:`cybergis_compute_client.JobGroup.JobGroup.refresh`.
+    The interval between ticks starts at `minIntervalInSeconds`, grows by
+    `backoff` after every tick without a state change up to
+    `maxIntervalInSeconds`, and drops back to the minimum on any change or
+    newly watched job. A job watched with `tickIntervalInSeconds` caps the
+    interval while it runs, e.g. to keep showing its latest logs. The
+    thread exits once every watched job ended or failed and is started
+    again by :meth:`watch`.
+
+    Callbacks run on the watcher thread. An exception raised by a callback
+    or by a refresh is stored in `errors` and does not stop the watcher.
+
+    Args:
+        client (Client): Client used to talk to the server
+        jupyterhubApiToken (str): API token of the logged in user
+        isJupyter (bool): Whether or not this is running in Jupyter
+        minIntervalInSeconds (float): Shortest time between two ticks
+        maxIntervalInSeconds (float): Longest time between two ticks
+        backoff (float): Interval growth factor of a tick without changes
+        output (OutputBackend): Output backend of the underlying JobGroup
+
+    Attributes:
+        group (JobGroup): The watched jobs and their latest states
+        interval (float): Seconds until the next tick
+        errors (list): Exceptions raised by refreshes or callbacks
+    """
+    def __init__(self, client, jupyterhubApiToken, isJupyter=False, minIntervalInSeconds=5, maxIntervalInSeconds=60,
+                 backoff=1.5, output=None):
+        self.group = JobGroup(client, jupyterhubApiToken, isJupyter, output=output)
+        self.minIntervalInSeconds = minIntervalInSeconds
+        self.maxIntervalInSeconds = maxIntervalInSeconds
+        self.backoff = backoff
+        self.interval = minIntervalInSeconds
+        self.errors = []
+        self._callbacks = {}
+        self._changed = False
+        self._changedIds = set()
+        self._lock = threading.RLock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+        self.group.on_status_change(self._dispatch)
+
+    def watch(self, job, on_status_change=None, on_end=None, on_fail=None, widget=None, on_tick=None,
+              tickIntervalInSeconds=None):
+        """
+        Starts watching a job, and the watcher thread if it is not running
+
+        Args:
+            job (Job or str): Job object or job id
+            on_status_change (callable): Called as `on_status_change(id, previous, state, record)`
+                on every state change
+            on_end (callable): Called as `on_end(id, state, record)` once the job ended
+            on_fail (callable): Called as `on_fail(id, state, record)` once the job failed
+            widget (ipywidgets.Widget): Widget whose `value` is set to the
+                job's state on every change, e.g. a Label
+            on_tick (callable): Called as `on_tick(id, state, record)` after
+                every tick in which the job did not change state, while it
+                has not ended or failed
+            tickIntervalInSeconds (float): Longest time between two ticks
+                while the job has not ended or failed, None for no limit
+
+        Returns:
+            JobWatcher: this JobWatcher
+        """
+        with self._lock:
+            self.group.add(job)
+            id = job if isinstance(job, str) else job.id
+            callbacks = self._callbacks.setdefault(id, [])
+            callbacks.append((on_status_change, on_end, on_fail, widget, on_tick, tickIntervalInSeconds))
+            self.interval = self.minIntervalInSeconds
+        self.start()
+        self._wake.set()
+        return self
+
+    def unwatch(self, id):
+        """
+        Stops watching a job and drops its callbacks
+
+        Args:
+            id (str): Job id
+        """
+        with self._lock:
+            self.group.jobs.pop(id, None)
+            self.group.states.pop(id, None)
+            self._callbacks.pop(id, None)
+
+    def start(self):
+        """
+        Starts the watcher thread unless it is already running
+        """
+        with self._lock:
+            if self.is_running():
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name='cybergis-job-watcher', daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout=None):
+        """
+        Stops the watcher thread after its current tick
+
+        Args:
+            timeout (float): Seconds to wait for the thread, None to wait until it exits
+        """
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def is_running(self):
+        """
+        Returns:
+            bool: Whether the watcher thread is alive
+        """
+        return self._thread is not None and self._thread.is_alive()
+
+    def poll(self):
+        """
+        Runs one tick: refreshes every watched job, fires callbacks and
+        adapts the interval
+
+        Returns:
+            bool: Whether any job changed state
+        """
+        with self._lock:
+            self._changed = False
+            self._changedIds = set()
+            try:
+                self.group.refresh()
+            except Exception as e:
+                self.errors.append(e)
+            self._tick()
+            if self._changed:
+                self.interval = self.minIntervalInSeconds
+            else:
+                self.interval = min(self.interval * self.backoff, self._max_interval())
+            return self._changed
+
+    # helpers
+    def _run(self):
+        """
+        Loop of the watcher thread
+        """
+        while not self._stop.is_set():
+            self.poll()
+            with self._lock:
+                if self.group.is_done():
+                    self._thread = None
+                    return
+            self._wake.wait(self.interval)
+            self._wake.clear()
+
+    def _dispatch(self, id, previous, state, record):
+        """
+        Fires the callbacks registered for a job whose state changed
+        """
+        self._changed = True
+        self._changedIds.add(id)
+        for on_status_change, on_end, on_fail, widget, on_tick, tickInterval in list(self._callbacks.get(id, [])):
+            try:
+                if widget is not None:
+                    widget.value = state
+                if on_status_change is not None:
+                    on_status_change(id, previous, state, record)
+                if state == 'ENDED' and on_end is not None:
+                    on_end(id, state, record)
+                if state == 'FAILED' and on_fail is not None:
+                    on_fail(id, state, record)
+            except Exception as e:
+                self.errors.append(e)
+
+    def _tick(self):
+        """
+        Fires the tick callbacks of the jobs that have not ended or failed
+        and did not change state, whose status callbacks already ran
+        """
+        for id, callbacks in list(self._callbacks.items()):
+            state = self.group.states.get(id)
+            if state in JobGroup.finalStates or id in self._changedIds:
+                continue
+            for callback in list(callbacks):
+                if callback[4] is None:
+                    continue
+                try:
+                    callback[4](id, state, self.group.records.get(id))
+                except Exception as e:
+                    self.errors.append(e)
+
+    def _max_interval(self):
+        """
+        Returns the longest interval allowed by the jobs that have not ended or failed
+        """
+        limits = [callback[5] for id, callbacks in self._callbacks.items()
+                  if self.group.states.get(id) not in JobGroup.finalStates
+                  for callback in callbacks if callback[5] is not None]
+        return min([self.maxIntervalInSeconds] + limits)
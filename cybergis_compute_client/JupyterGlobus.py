@@ -0,0 +1,69 @@
+"""
+This module exposes JupyterGlobus class which holds the user's Jupyter
+Globus settings and maps paths on the Jupyter Globus endpoint to the
+paths the kernel sees for the same files
+
+Example:
+        jupyterGlobus = JupyterGlobus(client, jupyterhubApiToken)
+        os.path.exists(jupyterGlobus.kernel_path(localPath))
+"""
+import os
+import posixpath
+
+
+class JupyterGlobus:
+    """
+    JupyterGlobus class
+
+    Globus downloads and uploads address files by their path on the
+    Jupyter Globus endpoint, under `root_path`. The kernel sees the same
+    files under `container_home_path`. The settings are fetched once, on
+    first use.
+
+    Args:
+        client (Client): Client used to fetch the settings
+        jupyterhubApiToken (str): API token of the logged in user
+    """
+    def __init__(self, client, jupyterhubApiToken):
+        self.client = client
+        self.jupyterhubApiToken = jupyterhubApiToken
+        self._settings = None
+
+    def settings(self):
+        """
+        Returns:
+            dict: The user's `endpoint`, `root_path` and `container_home_path`
+
+        Raises:
+            Exception: If the server does not return them
+        """
+        if self._settings is None:
+            self._settings = self.client.request(
+                'GET', '/user/jupyter-globus', {"jupyterhubApiToken": self.jupyterhubApiToken})
+        return self._settings
+
+    def kernel_path(self, path):
+        """
+        Maps a path on the Jupyter Globus endpoint to the kernel's filesystem
+
+        Args:
+            path (str): Path under `root_path`
+
+        Returns:
+            str: The same path under `container_home_path`, or `path`
+            unchanged if it is not under `root_path` or the settings
+            cannot be fetched
+        """
+        try:
+            settings = self.settings()
+            root, home = settings['root_path'], settings['container_home_path']
+        except Exception:
+            return path
+        if path is None or root is None or home is None:
+            return path
+        root = posixpath.normpath(root)
+        path = posixpath.normpath(path)
+        if path != root and not path.startswith(root.rstrip('/') + '/'):
+            return path
+        relative = posixpath.relpath(path, root)
+        return home if relative == '.' else os.path.join(home, relative)
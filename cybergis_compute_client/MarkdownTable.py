@@ -1,17 +1,109 @@
+"""
+This module exposes MarkdownTable class which renders rows of cells as a
+Markdown table. Rows are formatted in blocks, joined and escaped a
+block at a time, and can be streamed, so the cost of a table is linear
+in its size and bounded by the row window.
+
+Example:
+        MarkdownTable.render([['1', 'ENDED']], ['id', 'status'])
+        MarkdownTable.write(sys.stdout, logs, ['message', 'time'], maxRows=100, maxWidth=80)
+"""
+import itertools
+
+
 class MarkdownTable:
+    """
+    MarkdownTable class
+
+    Every line starts with "| " and every cell is followed by " | ". Pipes
+    inside cells are escaped so they do not split the cell. When a row
+    window cuts rows off, a last row of "…" cells marks the cut.
+    """
+    pipe = '<code>&#124;</code>'
+    ellipsis = '…'
+    # stands in for the table's own pipes until the cells are escaped
+    separator = '\x1f'
+
     @staticmethod
-    def render(data, headers):
+    def iter_chunks(data, headers, maxWidth=None, maxRows=None, offset=0, chunkRows=1024):
+        """
+        Yields the table in blocks of lines, without a trailing line break
+
+        Args:
+            data (iterable): Rows, each a list of cells; read lazily
+            headers (list): Column names
+            maxWidth (int): Cells longer than this many characters are cut
+                and end with "…", None for no limit
+            maxRows (int): Rows shown at most, None for all
+            offset (int): Rows skipped before the window
+            chunkRows (int): Rows per yielded block
+
+        Yields:
+            str: Header and divider lines, then blocks of up to `chunkRows` rows
+        """
         if len(headers) == 0:
-            return ''
-        output = '| '
-        headerDivider = '| '
-        for header in headers:
-            output += header + ' | '
-            headerDivider += '--- | '
-        output += '\n' + headerDivider
-        for row in data:
-            rowData = '| '
-            for col in row:
-                rowData += str(col).replace('|', '<code>&#124;</code>') + ' | '
-            output += '\n' + rowData
-        return output
+            return
+        yield '| ' + ' | '.join(headers) + ' | \n| ' + '--- | ' * len(headers)
+
+        rows = iter(data)
+        if offset:
+            rows = itertools.islice(rows, offset, None)
+        window = rows if maxRows is None else itertools.islice(rows, maxRows)
+        while True:
+            block = list(itertools.islice(window, chunkRows))
+            if len(block) == 0:
+                break
+            if maxWidth is not None:
+                block = [[MarkdownTable._cut(col, maxWidth) for col in row] for row in block]
+            yield MarkdownTable._render_block(block, len(headers))
+        if maxRows is not None and next(rows, None) is not None:
+            yield '| ' + (MarkdownTable.ellipsis + ' | ') * len(headers)
+
+    @staticmethod
+    def render(data, headers, maxWidth=None, maxRows=None, offset=0):
+        """
+        Returns the table as a string, see :meth:`iter_chunks` for the arguments
+
+        Returns:
+            str: Markdown table, '' without headers
+        """
+        return '\n'.join(MarkdownTable.iter_chunks(data, headers, maxWidth, maxRows, offset))
+
+    @staticmethod
+    def write(stream, data, headers, maxWidth=None, maxRows=None, offset=0):
+        """
+        Writes the table followed by a line break to a text stream block by
+        block, without building the whole table in memory. See
+        :meth:`iter_chunks` for the arguments.
+
+        Args:
+            stream (file): Text stream, e.g. sys.stdout or io.StringIO
+        """
+        for chunk in MarkdownTable.iter_chunks(data, headers, maxWidth, maxRows, offset):
+            stream.write(chunk)
+            stream.write('\n')
+
+    # helpers
+    @staticmethod
+    def _render_block(block, width):
+        """
+        Formats rows of `width` cells with one template, then escapes the
+        whole block with a single replace. Falls back to row by row when a
+        row has another width or a cell contains the separator.
+        """
+        separator = MarkdownTable.separator
+        template = separator + ' ' + ('%s ' + separator + ' ') * width
+        try:
+            text = '\n'.join([template % tuple(row) for row in block])
+        except TypeError:
+            text = None
+        if text is not None and text.count(separator) == (width + 1) * len(block):
+            return text.replace('|', MarkdownTable.pipe).replace(separator, '|')
+        return '\n'.join(['| ' + ''.join([str(col).replace('|', MarkdownTable.pipe) + ' | ' for col in row]) for row in block])
+
+    @staticmethod
+    def _cut(col, maxWidth):
+        col = str(col)
+        if len(col) > maxWidth:
+            return col[:max(maxWidth - 1, 0)] + MarkdownTable.ellipsis
+        return col
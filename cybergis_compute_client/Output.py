@@ -0,0 +1,243 @@
+"""
+This module exposes the output backends used by CyberGISCompute, Job and
+JobGroup to show messages and tables. Only the Jupyter backend imports
+IPython and ipywidgets, so headless pipelines never build widgets or
+format tables they do not show.
+
+Example:
+        cybergis = CyberGISCompute(isJupyter=False, output=JSONOutput())
+"""
+import json
+import sys
+from os import system, name
+from .MarkdownTable import MarkdownTable  # noqa
+from .TableView import TableView  # noqa
+
+
+class OutputBackend:
+    """
+    OutputBackend class
+
+    Interface of every output backend. The base class discards everything.
+    """
+    def message(self, text):
+        """
+        Shows a line of text
+
+        Args:
+            text (str): Message
+        """
+        pass
+
+    def markdown(self, text):
+        """
+        Shows a Markdown snippet
+
+        Args:
+            text (str): Markdown
+        """
+        pass
+
+    def table(self, data, headers, title=None):
+        """
+        Shows a table
+
+        Args:
+            data (list): Rows, each a list of cells
+            headers (list): Column names
+            title (str): Optional title; the Jupyter backend shows titled
+                tables collapsed under it
+        """
+        pass
+
+    def clear(self):
+        """
+        Clears previous output, used by live-refreshing views
+        """
+        pass
+
+    @staticmethod
+    def default(isJupyter):
+        """
+        Returns the backend matching `isJupyter`
+
+        Args:
+            isJupyter (bool): Whether or not this is running in Jupyter
+
+        Returns:
+            OutputBackend: JupyterOutput or TerminalOutput
+        """
+        return JupyterOutput() if isJupyter else TerminalOutput()
+
+
+class SilentOutput(OutputBackend):
+    """
+    SilentOutput class
+
+    Discards all output.
+    """
+    pass
+
+
+class TerminalOutput(OutputBackend):
+    """
+    TerminalOutput class
+
+    Prints plain text and Markdown tables to stdout.
+
+    Args:
+        maxRows (int): Rows shown per table, None for all
+        maxWidth (int): Characters shown per cell, None for all
+    """
+    def __init__(self, maxRows=None, maxWidth=None):
+        self.maxRows = maxRows
+        self.maxWidth = maxWidth
+
+    def message(self, text):
+        print(text)
+
+    def markdown(self, text):
+        print(text)
+
+    def table(self, data, headers, title=None):
+        print(MarkdownTable.render(data, headers, maxWidth=self.maxWidth, maxRows=self.maxRows))
+
+    def clear(self):
+        # for windows
+        if name == 'nt':
+            _ = system('cls')
+        # for mac and linux(here, os.name is 'posix')
+        else:
+            _ = system('clear')
+
+
+class JupyterOutput(OutputBackend):
+    """
+    JupyterOutput class
+
+    Renders Markdown and tables in the notebook, titled tables inside a
+    collapsed accordion widget. Tables longer than `pageSize` rows are
+    shown as a paged :class:`cybergis_compute_client.TableView.TableView`
+    so only one page reaches the browser.
+
+    Args:
+        maxRows (int): Rows shown per Markdown table, None for all
+        maxWidth (int): Characters shown per cell, None for all
+        pageSize (int): Rows per page of long tables, None to always
+            render Markdown
+    """
+    def __init__(self, maxRows=None, maxWidth=None, pageSize=100):
+        self.maxRows = maxRows
+        self.maxWidth = maxWidth
+        self.pageSize = pageSize
+
+    def message(self, text):
+        print(text)
+
+    def markdown(self, text):
+        from IPython.display import Markdown
+        self._display(Markdown(text))
+
+    def table(self, data, headers, title=None):
+        from IPython.display import Markdown
+        if len(data) == 0:
+            self.message('empty')
+            return
+        if self.pageSize is not None and len(data) > self.pageSize:
+            table = TableView(data, headers, self.pageSize, self.maxWidth).widget()
+        else:
+            table = Markdown(MarkdownTable.render(data, headers, maxWidth=self.maxWidth, maxRows=self.maxRows))
+        if title is not None:
+            import ipywidgets as widgets
+            out = widgets.Output()
+            append_display(out, table)
+            table = widgets.Accordion(children=[out], selected_index=None)
+            table.set_title(0, title)
+        self._display(table)
+
+    def clear(self):
+        from IPython.display import clear_output
+        clear_output(wait=True)
+
+    def _display(self, obj):
+        from IPython.display import display
+        display(obj)
+
+
+class WidgetOutput(JupyterOutput):
+    """
+    WidgetOutput class
+
+    Writes into one ipywidgets Output widget through its `outputs` trait
+    instead of capturing with `with out:`, so it can be used from
+    background threads such as the job watcher's.
+
+    Args:
+        widget (ipywidgets.Output): Where to write
+        maxRows (int): Rows shown per Markdown table, None for all
+        maxWidth (int): Characters shown per cell, None for all
+        pageSize (int): Rows per page of long tables, None to always
+            render Markdown
+    """
+    def __init__(self, widget, maxRows=None, maxWidth=None, pageSize=100):
+        super().__init__(maxRows, maxWidth, pageSize)
+        self.widget = widget
+
+    def message(self, text):
+        self.widget.append_stdout(text + '\n')
+
+    def clear(self):
+        self.widget.outputs = ()
+
+    def _display(self, obj):
+        append_display(self.widget, obj)
+
+
+def append_display(out, obj):
+    """
+    Appends a display object or a widget to an ipywidgets Output through
+    its `outputs` trait. Widgets are referenced by model id, which works
+    with ipywidgets 7 and 8.
+
+    Args:
+        out (ipywidgets.Output): Output widget
+        obj (object): e.g. IPython.display.Markdown or a widget
+    """
+    modelId = getattr(obj, 'model_id', None)
+    if modelId is None:
+        out.append_display_data(obj)
+        return
+    out.outputs += ({
+        'output_type': 'display_data',
+        'data': {
+            'text/plain': repr(obj),
+            'application/vnd.jupyter.widget-view+json': {'version_major': 2, 'version_minor': 0, 'model_id': modelId}},
+        'metadata': {}}, )
+
+
+class JSONOutput(OutputBackend):
+    """
+    JSONOutput class
+
+    Writes one JSON object per line, e.g. for log collectors.
+
+    Args:
+        stream (file): Where to write, defaults to stdout
+    """
+    def __init__(self, stream=None):
+        self.stream = stream
+
+    def message(self, text):
+        self._write({'type': 'message', 'text': text})
+
+    def markdown(self, text):
+        self._write({'type': 'markdown', 'text': text})
+
+    def table(self, data, headers, title=None):
+        self._write({'type': 'table', 'title': title, 'headers': list(headers),
+                     'rows': [dict(zip(headers, row)) for row in data]})
+
+    def _write(self, record):
+        stream = self.stream if self.stream is not None else sys.stdout
+        stream.write(json.dumps(record, default=str) + '\n')
+        stream.flush()
@@ -0,0 +1,226 @@
+"""
+This module exposes ParamSpace class which generates parameter sets for
+sweeps from a job template's `param_rules`, and helpers to drop points the
+user already ran
+
+Example:
+        rules = cybergis.list_git(raw=True)['hello_world']['param_rules']
+        space = ParamSpace(rules, seed=0)
+        params = space.latin_hypercube(20)
+"""
+import hashlib
+import itertools
+import json
+import random
+from .JobGroup import JobGroup  # noqa
+
+
+class ParamSpace:
+    """
+    ParamSpace class
+
+    The domain of an `integer` rule is every value from `min` to `max` by
+    `step`, a `string_option` rule ranges over its `options`, and a
+    `string_input` rule is fixed to its `default_value`. Any domain can be
+    replaced by passing explicit candidate values.
+
+    Args:
+        param_rules (dict): `param_rules` of a job template
+        values (dict): Candidate values per parameter overriding the rules
+        seed (int): Seed of the random generators
+
+    Attributes:
+        names (list): Parameter names in sorted order
+        domains (dict): Candidate values per parameter
+    """
+    def __init__(self, param_rules, values=None, seed=None):
+        values = values or {}
+        self.names = sorted(set(param_rules) | set(values))
+        self.domains = {}
+        for name in self.names:
+            if name in values:
+                self.domains[name] = list(values[name])
+            else:
+                self.domains[name] = self._rule_domain(param_rules[name])
+        self.random_state = random.Random(seed)
+
+    def __len__(self):
+        size = 1
+        for name in self.names:
+            size *= len(self.domains[name])
+        return size
+
+    def grid(self):
+        """
+        Returns:
+            list: Every combination of candidate values (Cartesian grid)
+        """
+        return [dict(zip(self.names, combination))
+                for combination in itertools.product(*[self.domains[n] for n in self.names])]
+
+    def random(self, n):
+        """
+        Samples `n` points uniformly, without repeating a point unless the
+        space has fewer than `n` points
+
+        Args:
+            n (int): Number of points
+
+        Returns:
+            list: Param dicts
+        """
+        points = []
+        seen = set()
+        size = len(self)
+        while len(points) < n:
+            point = {name: self.random_state.choice(self.domains[name]) for name in self.names}
+            key = self.canonical(point)
+            if key in seen and len(seen) < size:
+                continue
+            seen.add(key)
+            points.append(point)
+        return points
+
+    def latin_hypercube(self, n):
+        """
+        Samples `n` points so that every parameter's domain is split in `n`
+        equal strata and each stratum is used exactly once
+
+        Args:
+            n (int): Number of points
+
+        Returns:
+            list: Param dicts
+        """
+        columns = {}
+        for name in self.names:
+            domain = self.domains[name]
+            strata = list(range(n))
+            self.random_state.shuffle(strata)
+            columns[name] = [domain[min(int((s + self.random_state.random()) / n * len(domain)), len(domain) - 1)]
+                             for s in strata]
+        return [{name: columns[name][i] for name in self.names} for i in range(n)]
+
+    def refine(self, points, scores, top=5, radius=1, minimize=True):
+        """
+        Adaptive refinement: proposes the unseen neighbours of the best
+        scored points, i.e. points that differ by up to `radius` positions
+        in a parameter's domain
+
+        Args:
+            points (list): Param dicts already evaluated
+            scores (list): Score of each point
+            top (int): Number of best points to refine around
+            radius (int): Neighbourhood size in domain positions
+            minimize (bool): Whether lower scores are better
+
+        Returns:
+            list: New param dicts, not including any of `points`
+        """
+        ranked = sorted(zip(scores, range(len(points))), reverse=not minimize)
+        seen = set(self.canonical(p) for p in points)
+        proposals = []
+        for _, i in ranked[:top]:
+            for name in self.names:
+                domain = self.domains[name]
+                if points[i][name] not in domain:
+                    continue
+                position = domain.index(points[i][name])
+                for offset in range(-radius, radius + 1):
+                    if offset == 0 or not 0 <= position + offset < len(domain):
+                        continue
+                    point = dict(points[i])
+                    point[name] = domain[position + offset]
+                    key = self.canonical(point)
+                    if key not in seen:
+                        seen.add(key)
+                        proposals.append(point)
+        return proposals
+
+    @staticmethod
+    def canonical(value):
+        """
+        Serializes a param/slurm dict the same way regardless of key order
+        or whether numbers were sent as strings
+
+        Args:
+            value (dict): Param or slurm dict
+
+        Returns:
+            str: Canonical JSON
+        """
+        value = value or {}
+        return json.dumps({str(k): value[k] if isinstance(value[k], (list, dict)) else str(value[k]) for k in value},
+                          sort_keys=True, separators=(',', ':'))
+
+    @staticmethod
+    def fingerprint(gitId, hpc, param, slurm):
+        """
+        Returns the canonical hash of a submission
+
+        Args:
+            gitId (str): Executable git id
+            hpc (str): HPC, None to ignore the HPC
+            param (dict): Job parameters
+            slurm (dict): Slurm configuration
+
+        Returns:
+            str: Hex digest
+        """
+        key = json.dumps([gitId, hpc, ParamSpace.canonical(param), ParamSpace.canonical(slurm)])
+        return hashlib.sha256(key.encode('utf-8')).hexdigest()
+
+    @staticmethod
+    def job_fingerprint(job, ignoreHpc=False):
+        """
+        Returns the fingerprint of a job record from `/user/job`
+
+        Args:
+            job (dict): Job record
+            ignoreHpc (bool): Leave the HPC out of the fingerprint
+
+        Returns:
+            str: Hex digest, None if the job has no git executable
+        """
+        executable = job.get('localExecutableFolder')
+        if not isinstance(executable, dict) or 'gitId' not in executable:
+            return None
+        return ParamSpace.fingerprint(executable['gitId'], None if ignoreHpc else job.get('hpc'),
+                                      job.get('param'), job.get('slurm'))
+
+    @staticmethod
+    def dedupe(points, jobs, gitId, hpc=None, slurm=None):
+        """
+        Drops points that were already submitted, among `jobs`, with the same
+        executable, HPC and slurm configuration, and duplicates within `points`.
+        Only jobs that are queued, running or ended count as submitted, so
+        points whose job failed, was cancelled or never left CREATED can be
+        submitted again. A job whose state cannot be told counts as submitted.
+
+        Args:
+            points (list): Param dicts
+            jobs (list): Job records from `/user/job`
+            gitId (str): Executable git id of the new submissions
+            hpc (str): HPC of the new submissions, None matches any HPC
+            slurm (dict): Slurm configuration of the new submissions
+
+        Returns:
+            list: Param dicts never submitted before
+        """
+        seen = set(ParamSpace.job_fingerprint(job, ignoreHpc=hpc is None) for job in jobs
+                   if JobGroup.job_state(job) in [None, 'QUEUED', 'RUNNING', 'ENDED'])
+        fresh = []
+        for point in points:
+            key = ParamSpace.fingerprint(gitId, hpc, point, slurm)
+            if key not in seen:
+                seen.add(key)
+                fresh.append(point)
+        return fresh
+
+    # helpers
+    def _rule_domain(self, rule):
+        if rule['type'] == 'integer':
+            return list(range(rule['min'], rule['max'] + 1, rule.get('step') or 1))
+        if rule['type'] == 'string_option':
+            return list(rule['options'])
+        return [rule['default_value']]
@@ -0,0 +1,223 @@
+"""
+This module exposes ResultCache class which memoizes job submissions:
+a submission identical to one that already succeeded reuses that job and
+its result folder instead of running again on the HPC
+
+Example:
+        cybergis.enable_memoization(maxAgeInSeconds=7 * 24 * 3600)
+"""
+import json
+import os
+import threading
+import time
+from .ParamSpace import ParamSpace  # noqa
+from .JobGroup import JobGroup  # noqa
+from .JupyterGlobus import JupyterGlobus  # noqa
+
+
+class ResultCache:
+    """
+    ResultCache class
+
+    Entries are keyed by the executable git id and commit, the canonical
+    param and slurm dicts, the HPC and a fingerprint of the data folder.
+    A submitted job is stored as pending and only becomes reusable once
+    the server reports that it ended without failing. Entries are kept in
+    a local JSON file. A submission whose data folder cannot be read from
+    the kernel has no key and is never memoized.
+
+    Args:
+        client (Client): Client used to resolve git commits and job states
+        jupyterhubApiToken (str): API token of the logged in user
+        path (str): Location of the cache file
+        maxAgeInSeconds (int): Entries older than this are evicted, None keeps them
+        maxEntries (int): Least recently used entries beyond this are evicted
+
+    Attributes:
+        entries (dict): Cache entries keyed by submission key
+    """
+    def __init__(self, client, jupyterhubApiToken, path='./cybergis_compute_cache.json', maxAgeInSeconds=None, maxEntries=1000):
+        self.client = client
+        self.jupyterhubApiToken = jupyterhubApiToken
+        self.path = path
+        self.maxAgeInSeconds = maxAgeInSeconds
+        self.maxEntries = maxEntries
+        self._commits = None
+        self.jupyterGlobus = JupyterGlobus(client, jupyterhubApiToken)
+        self._lock = threading.RLock()
+        try:
+            with open(os.path.abspath(path)) as f:
+                self.entries = json.load(f)
+        except:
+            self.entries = {}
+
+    def save(self):
+        """
+        Writes the cache file atomically
+        """
+        tmp = os.path.abspath(self.path) + '.tmp'
+        with open(tmp, 'w') as f:
+            json.dump(self.entries, f)
+        os.replace(tmp, os.path.abspath(self.path))
+
+    def key(self, gitId, hpc, param=None, slurm=None, localDataFolder=None):
+        """
+        Returns the cache key of a submission
+
+        Args:
+            gitId (str): Executable git id
+            hpc (str): HPC of the job
+            param (dict): Job parameters
+            slurm (dict): Slurm configuration
+            localDataFolder (dict): Data folder of the job
+
+        Returns:
+            str: Hex digest, None if the data folder cannot be read
+        """
+        data = self.data_fingerprint(localDataFolder, self.jupyterGlobus)
+        if data is None:
+            return None
+        executable = str(gitId) + '@' + str(self._commit(gitId))
+        return ParamSpace.fingerprint(executable, hpc, param, slurm) + ':' + data
+
+    def lookup(self, key):
+        """
+        Returns the entry of a succeeded job for `key`. A pending entry is
+        resolved against the server first.
+
+        Args:
+            key (str): Cache key
+
+        Returns:
+            dict: The entry, None on a miss
+        """
+        with self._lock:
+            self._evict()
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            if entry['status'] == 'PENDING':
+                self._resolve(key, entry)
+            if entry['status'] != 'SUCCEEDED':
+                return None
+            entry['lastUsedAt'] = time.time()
+            entry['hits'] += 1
+            self.save()
+            return dict(entry)
+
+    def add(self, key, jobId, gitId=None, hpc=None):
+        """
+        Stores a newly submitted job as pending for `key`
+
+        Args:
+            key (str): Cache key
+            jobId (str): Id of the submitted job
+            gitId (str): Executable git id, used by :meth:`invalidate`
+            hpc (str): HPC of the job
+        """
+        now = time.time()
+        with self._lock:
+            self.entries[key] = {
+                'jobId': jobId, 'gitId': gitId, 'hpc': hpc, 'status': 'PENDING',
+                'remoteResultFolder': None, 'createdAt': now, 'lastUsedAt': now, 'hits': 0}
+            self._evict()
+            self.save()
+
+    def invalidate(self, key=None, gitId=None, jobId=None):
+        """
+        Removes the entries matching any of the given criteria
+
+        Args:
+            key (str): Cache key
+            gitId (str): Executable git id
+            jobId (str): Job id
+        """
+        with self._lock:
+            self.entries = {k: e for k, e in self.entries.items()
+                            if k != key and (gitId is None or e['gitId'] != gitId) and (jobId is None or e['jobId'] != jobId)}
+            self.save()
+
+    def clear(self):
+        """
+        Removes every entry
+        """
+        with self._lock:
+            self.entries = {}
+            self.save()
+
+    @staticmethod
+    def data_fingerprint(localDataFolder, jupyterGlobus=None):
+        """
+        Fingerprints a data folder. A folder with a path contributes the
+        relative path, size and mtime of its files, so it must be readable
+        from the kernel; the path of a Globus folder is first mapped from
+        the Jupyter Globus endpoint to the kernel's filesystem.
+
+        Args:
+            localDataFolder (dict or str): Data folder of the job
+            jupyterGlobus (JupyterGlobus): Maps Globus paths to kernel
+                paths, None to read them as they are
+
+        Returns:
+            str: Hex digest, None if the folder has a path that cannot be read
+        """
+        if localDataFolder is None:
+            return 'none'
+        if isinstance(localDataFolder, dict):
+            path = localDataFolder.get('path')
+            description = json.dumps(localDataFolder, sort_keys=True)
+            if path is not None and jupyterGlobus is not None and localDataFolder.get('type') == 'globus':
+                path = jupyterGlobus.kernel_path(path)
+        else:
+            path = localDataFolder
+            description = str(localDataFolder)
+        if path is not None:
+            if not os.path.isdir(path):
+                # unknown contents must not match an earlier submission
+                return None
+            files = []
+            for root, dirs, names in os.walk(path):
+                dirs.sort()
+                for name in sorted(names):
+                    stat = os.stat(os.path.join(root, name))
+                    files.append([os.path.relpath(os.path.join(root, name), path), stat.st_size, stat.st_mtime_ns])
+            description += json.dumps(files)
+        return ParamSpace.fingerprint(description, None, None, None)
+
+    # helpers
+    def _commit(self, gitId):
+        """
+        Returns the commit the server runs for `gitId`, fetched once per session
+        """
+        with self._lock:
+            if self._commits is None:
+                git = self.client.request('GET', '/git')['git']
+                self._commits = {i: git[i].get('commit', 'NONE') for i in git}
+        return self._commits.get(gitId, 'NONE')
+
+    def _resolve(self, key, entry):
+        """
+        Updates a pending entry with the state of its job
+        """
+        try:
+            job = self.client.request('GET', '/job/' + entry['jobId'], {'jupyterhubApiToken': self.jupyterhubApiToken})
+        except:
+            return
+        state = JobGroup.job_state(job)
+        if state == 'ENDED':
+            entry['status'] = 'SUCCEEDED'
+            entry['remoteResultFolder'] = job.get('remoteResultFolder')
+        elif state == 'FAILED':
+            del self.entries[key]
+        self.save()
+
+    def _evict(self):
+        """
+        Drops expired entries, then the least recently used ones above `maxEntries`
+        """
+        if self.maxAgeInSeconds is not None:
+            now = time.time()
+            self.entries = {k: e for k, e in self.entries.items() if now - e['createdAt'] <= self.maxAgeInSeconds}
+        if self.maxEntries is not None and len(self.entries) > self.maxEntries:
+            keep = sorted(self.entries, key=lambda k: self.entries[k]['lastUsedAt'], reverse=True)[:self.maxEntries]
+            self.entries = {k: self.entries[k] for k in keep}
@@ -0,0 +1,228 @@
+"""
+This module exposes ResultFolderIndex class which keeps an indexed,
+in-memory view of a job's result folder content so that large folders
+can be queried without refetching or scanning the whole listing
+
+Example:
+        index = ResultFolderIndex(job.result_folder_content())
+        index.glob('/output/*.tif')
+"""
+import bisect
+import fnmatch
+import posixpath
+import time
+
+
+class ResultFolderIndex:
+    """
+    ResultFolderIndex class
+
+    An index over the paths returned by the result-folder-content route.
+    Paths are kept sorted so prefix queries are a binary search, and are
+    additionally indexed by parent directory and file extension. Entries
+    may be plain path strings or dicts carrying `path` (or `name`),
+    `size` and `mtime` when the server provides them.
+
+    Attributes:
+        entries (dict): Mapping from path to its metadata dict
+        updatedAt (float): Time of the last update, or None
+    """
+    def __init__(self, entries=None):
+        self.entries = {}
+        self.updatedAt = None
+        self._paths = []
+        self._children = {}
+        self._extensions = {}
+        if entries is not None:
+            self.update(entries)
+
+    def __len__(self):
+        return len(self._paths)
+
+    def __contains__(self, path):
+        return self._normalize(path) in self.entries
+
+    def __iter__(self):
+        return iter(self._paths)
+
+    def update(self, entries):
+        """
+        Incrementally applies a fresh listing to the index. Only paths that
+        were added or removed since the last update touch the index.
+
+        Args:
+            entries (list): Paths (str) or metadata dicts from the server
+
+        Returns:
+            tuple: (added, removed) lists of paths
+        """
+        incoming = {}
+        for entry in entries:
+            meta = self._parse(entry)
+            incoming[meta['path']] = meta
+
+        removed = [p for p in self.entries if p not in incoming]
+        added = [p for p in incoming if p not in self.entries]
+
+        for p in removed:
+            self._remove(p)
+        for p in added:
+            self._add(incoming[p])
+        # metadata of existing paths may have changed
+        for p, meta in incoming.items():
+            self.entries[p] = meta
+
+        self.updatedAt = time.time()
+        return added, removed
+
+    def is_stale(self, maxAgeInSeconds):
+        """
+        Checks whether the index is older than `maxAgeInSeconds`
+
+        Args:
+            maxAgeInSeconds (int): Maximum age, None means never stale
+
+        Returns:
+            bool: True if the index needs a refresh
+        """
+        if self.updatedAt is None:
+            return True
+        if maxAgeInSeconds is None:
+            return False
+        return time.time() - self.updatedAt > maxAgeInSeconds
+
+    def paths(self):
+        """
+        Returns:
+            list: All indexed paths in sorted order
+        """
+        return list(self._paths)
+
+    def get(self, path):
+        """
+        Returns the metadata (`path`, `size`, `mtime`) of a path
+
+        Args:
+            path (str): Path inside the result folder
+
+        Returns:
+            dict: Metadata of the path, None if it is not indexed
+        """
+        return self.entries.get(self._normalize(path))
+
+    def prefix(self, prefix):
+        """
+        Returns every path starting with `prefix`
+
+        Args:
+            prefix (str): Path prefix, e.g. "/output/run_1"
+
+        Returns:
+            list: Matching paths in sorted order
+        """
+        prefix = self._normalize(prefix) if prefix else ''
+        start = bisect.bisect_left(self._paths, prefix)
+        end = start
+        while end < len(self._paths) and self._paths[end].startswith(prefix):
+            end += 1
+        return self._paths[start:end]
+
+    def glob(self, pattern):
+        """
+        Returns every path matching a shell-style `pattern`. The literal
+        part of the pattern before the first wildcard narrows the search
+        with a prefix lookup before matching.
+
+        Args:
+            pattern (str): Pattern such as "/output/*.csv"
+
+        Returns:
+            list: Matching paths in sorted order
+        """
+        pattern = self._normalize(pattern)
+        literal = pattern
+        for i, c in enumerate(pattern):
+            if c in '*?[':
+                literal = pattern[:i]
+                break
+        return [p for p in self.prefix(literal) if fnmatch.fnmatchcase(p, pattern)]
+
+    def extension(self, ext):
+        """
+        Returns every path with the file extension `ext`
+
+        Args:
+            ext (str): Extension with or without the leading dot
+
+        Returns:
+            list: Matching paths in sorted order
+        """
+        ext = ext.lower()
+        if not ext.startswith('.'):
+            ext = '.' + ext
+        return sorted(self._extensions.get(ext, ()))
+
+    def children(self, path='/'):
+        """
+        Returns the direct children of a directory in the index
+
+        Args:
+            path (str): Directory path
+
+        Returns:
+            list: Child paths in sorted order
+        """
+        return sorted(self._children.get(self._normalize(path), ()))
+
+    def ordered(self, first=None):
+        """
+        Returns all paths with `first` moved to the front if it is indexed,
+        for use as dropdown options
+
+        Args:
+            first (str): Path that should be listed first
+
+        Returns:
+            list: Paths
+        """
+        if first is None or first not in self:
+            return self.paths()
+        first = self._normalize(first)
+        return [first] + [p for p in self._paths if p != first]
+
+    # helpers
+    def _normalize(self, path):
+        if path == '/':
+            return path
+        return path.rstrip('/') if path.endswith('/') else path
+
+    def _parse(self, entry):
+        if isinstance(entry, dict):
+            path = entry.get('path', entry.get('name'))
+            size = entry.get('size')
+            mtime = entry.get('mtime', entry.get('updatedAt'))
+        else:
+            path, size, mtime = entry, None, None
+        return {'path': self._normalize(str(path)), 'size': size, 'mtime': mtime}
+
+    def _add(self, meta):
+        path = meta['path']
+        self.entries[path] = meta
+        bisect.insort(self._paths, path)
+        parent = posixpath.dirname(path)
+        if parent != path:
+            self._children.setdefault(parent, set()).add(path)
+        ext = posixpath.splitext(path)[1].lower()
+        if ext:
+            self._extensions.setdefault(ext, set()).add(path)
+
+    def _remove(self, path):
+        del self.entries[path]
+        i = bisect.bisect_left(self._paths, path)
+        if i < len(self._paths) and self._paths[i] == path:
+            self._paths.pop(i)
+        parent = posixpath.dirname(path)
+        self._children.get(parent, set()).discard(path)
+        ext = posixpath.splitext(path)[1].lower()
+        if ext:
+            self._extensions.get(ext, set()).discard(path)
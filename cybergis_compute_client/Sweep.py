@@ -0,0 +1,130 @@
+"""
+This module exposes ParameterSweep class which creates, configures and
+submits one job per parameter set with a bounded number of concurrent
+requests and without rendering anything per job
+
+Example:
+        sweep = ParameterSweep(cybergis, maxWorkers=8)
+        group = sweep.run([{'a': 1}, {'a': 2}], localExecutableFolder={'type': 'git', 'gitId': 'hello_world'})
+"""
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from .Job import Job  # noqa
+from .JobGroup import JobGroup  # noqa
+
+
+class ParameterSweep:
+    """
+    ParameterSweep class
+
+    Args:
+        compute (CyberGISCompute): Logged in CyberGISCompute instance
+        maxWorkers (int): Jobs being created/submitted at the same time
+        onProgress (callable): Called as `onProgress(done, total, result)`
+            after every parameter set
+        verbose (bool): Print a progress line every `progressEvery` items
+            and a summary at the end
+        progressEvery (int): Items between two progress lines
+
+    Attributes:
+        results (list): One dict per parameter set with keys `index`,
+            `param`, `jobId`, `memoized` and `error`, in input order
+    """
+    def __init__(self, compute, maxWorkers=8, onProgress=None, verbose=True, progressEvery=50):
+        self.compute = compute
+        self.maxWorkers = maxWorkers
+        self.onProgress = onProgress
+        self.verbose = verbose
+        self.progressEvery = progressEvery
+        self.results = []
+
+    def run(self, input_params, maintainer='community_contribution', hpc=None, hpcUsername=None, hpcPassword=None,
+            localExecutableFolder=None, localDataFolder=None, localResultFolder=None, env=None, slurm=None):
+        """
+        Submits one job per item of `input_params`. Login happens once for
+        the whole sweep. Failures are captured per item and do not stop
+        the other submissions.
+
+        Args:
+            input_params (list): Param dicts, one per job
+            maintainer (str): Maintainer of the jobs
+            hpc (str): HPC the jobs are submitted to
+            hpcUsername (str): username for HPC backend
+            hpcPassword (str): password for HPC backend
+            localExecutableFolder (dict): Executable folder of the jobs
+            localDataFolder (dict): Data folder of the jobs
+            localResultFolder (dict): Result folder of the jobs
+            env (dict): Environment variables of the jobs
+            slurm (dict): Slurm configuration of the jobs
+
+        Returns:
+            JobGroup: Handle on the submitted jobs, with failed items in
+            its `errors`. A job created on the server before its item
+            failed is not tracked; its id is kept in the error.
+        """
+        self.compute.login(verbose=False)
+        config = {
+            'maintainer': maintainer, 'hpc': hpc,
+            'hpcUsername': hpcUsername, 'hpcPassword': hpcPassword,
+            'localExecutableFolder': localExecutableFolder, 'localDataFolder': localDataFolder,
+            'localResultFolder': localResultFolder, 'env': env, 'slurm': slurm}
+        input_params = list(input_params)
+        total = len(input_params)
+        self.results = [None] * total
+
+        with ThreadPoolExecutor(max_workers=self.maxWorkers) as executor:
+            futures = [executor.submit(self._submit_one, i, param, config) for i, param in enumerate(input_params)]
+            done = 0
+            for future in as_completed(futures):
+                result = future.result()
+                self.results[result['index']] = result
+                done += 1
+                if self.onProgress is not None:
+                    self.onProgress(done, total, result)
+                if self.verbose and (done % self.progressEvery == 0 or done == total):
+                    self.compute.output.message('⏳ submitted ' + str(done) + '/' + str(total))
+
+        group = JobGroup(self.compute.client, self.compute.jupyterhubApiToken, self.compute.isJupyter,
+                         output=self.compute.output)
+        for result in self.results:
+            if result['error'] is not None:
+                group.errors.append({k: result[k] for k in ['index', 'param', 'jobId', 'error']})
+            else:
+                group.add(result['job'])
+            del result['job']
+
+        if self.verbose:
+            self.compute.output.message('✅ ' + str(total - len(group.errors)) + ' job(s) submitted, ❌ ' + str(len(group.errors)) + ' failed')
+        return group
+
+    # helpers
+    def _submit_one(self, index, param, config):
+        """
+        Creates, sets and submits a single job, capturing any error
+        """
+        result = {'index': index, 'param': param, 'jobId': None, 'job': None, 'memoized': False, 'error': None}
+        try:
+            cache = self.compute.resultCache
+            executable = config['localExecutableFolder'] or {}
+            if cache is not None and config['hpc'] is not None and executable.get('type') == 'git':
+                # a hit needs no request at all, not even creating the job
+                key = cache.key(executable.get('gitId'), config['hpc'], param, config['slurm'], config['localDataFolder'])
+                entry = cache.lookup(key) if key is not None else None
+                if entry is not None:
+                    result['jobId'] = entry['jobId']
+                    result['job'] = entry['jobId']
+                    result['memoized'] = True
+                    return result
+            job = Job(maintainer=config['maintainer'], hpc=config['hpc'], hpcUsername=config['hpcUsername'],
+                      hpcPassword=config['hpcPassword'], client=self.compute.client, isJupyter=self.compute.isJupyter,
+                      jupyterhubApiToken=self.compute.jupyterhubApiToken, printJob=False,
+                      transferLedger=self.compute.transferLedger, resultCache=self.compute.resultCache, output=self.compute.output)
+            result['jobId'] = job.id
+            result['job'] = job
+            job.set(config['localExecutableFolder'], config['localDataFolder'], config['localResultFolder'],
+                    param, config['env'], config['slurm'], printJob=False)
+            job.submit(printJob=False)
+            result['memoized'] = job.id != result['jobId']
+            result['jobId'] = job.id
+        except Exception as e:
+            result['error'] = str(e)
+        return result
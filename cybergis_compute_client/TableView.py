@@ -0,0 +1,220 @@
+"""
+This module exposes TableView class which shows a large table one page at
+a time. Rows stay in the kernel; sorting, filtering and paging run there
+over an in-memory index and only the visible page is sent to the
+frontend as HTML.
+
+Example:
+        view = TableView(logs, ['message', 'time'], pageSize=50)
+        display(view.widget())
+        view.filter('error').sort('time', ascending=False)
+"""
+import html
+import numbers
+
+
+class TableView:
+    """
+    TableView class
+
+    Args:
+        data (list): Rows, each a list of cells
+        headers (list): Column names
+        pageSize (int): Rows per page
+        maxWidth (int): Characters shown per cell, None for all
+
+    Attributes:
+        index (list): Positions in `data` of the rows that pass the
+            filter, in sort order
+        page (int): Current page, starting at 0
+    """
+    def __init__(self, data, headers, pageSize=50, maxWidth=None):
+        self.data = data if isinstance(data, list) else list(data)
+        self.headers = list(headers)
+        self.pageSize = pageSize
+        self.maxWidth = maxWidth
+        self.page = 0
+        self.sortBy = None
+        self.ascending = True
+        self.query = None
+        self._order = list(range(len(self.data)))
+        self._text = None
+        self._callbacks = []
+        self._html = None
+        self.index = self._order
+
+    def sort(self, column=None, ascending=True):
+        """
+        Sorts the rows by a column; None, then text, sort after numbers
+
+        Args:
+            column (str): Column name, None for the original order
+            ascending (bool): Sort direction
+
+        Returns:
+            TableView: this TableView
+        """
+        self.sortBy, self.ascending = column, ascending
+        if column is None:
+            self._order = list(range(len(self.data)))
+            if not ascending:
+                self._order.reverse()
+        else:
+            col = self.headers.index(column)
+            self._order = sorted(range(len(self.data)), key=lambda i: self._key(self.data[i][col]), reverse=not ascending)
+        return self._update(keepPage=False)
+
+    def filter(self, query=None):
+        """
+        Keeps the rows matching `query`
+
+        Args:
+            query (str or callable): Case-insensitive text that any cell
+                must contain, or a callable taking a row and returning
+                whether to keep it; None or '' keeps every row
+
+        Returns:
+            TableView: this TableView
+        """
+        self.query = query or None
+        return self._update(keepPage=False)
+
+    def goto(self, page):
+        """
+        Shows a page, clamped to the existing pages
+
+        Args:
+            page (int): Page number, starting at 0
+
+        Returns:
+            TableView: this TableView
+        """
+        self.page = page
+        return self._update()
+
+    def pages(self):
+        """
+        Returns:
+            int: Number of pages, at least 1
+        """
+        return max(1, -(-len(self.index) // self.pageSize))
+
+    def positions(self):
+        """
+        Returns:
+            list: Positions in `data` of the rows on the current page
+        """
+        start = self.page * self.pageSize
+        return self.index[start:start + self.pageSize]
+
+    def window(self):
+        """
+        Returns:
+            list: Rows on the current page
+        """
+        return [self.data[i] for i in self.positions()]
+
+    def status(self):
+        """
+        Returns:
+            str: e.g. "rows 51-100 of 2000 (page 2/40)"
+        """
+        if len(self.index) == 0:
+            return 'no rows'
+        start = self.page * self.pageSize
+        end = min(start + self.pageSize, len(self.index))
+        return 'rows ' + str(start + 1) + '-' + str(end) + ' of ' + str(len(self.index)) + (
+            ' (page ' + str(self.page + 1) + '/' + str(self.pages()) + ')')
+
+    def html(self):
+        """
+        Returns:
+            str: HTML table of the current page
+        """
+        head = ''.join(['<th>' + html.escape(str(h)) + '</th>' for h in self.headers])
+        body = ''.join(['<tr>' + ''.join(['<td>' + html.escape(self._cut(col)) + '</td>' for col in row]) + '</tr>'
+                        for row in self.window()])
+        return '<table><thead><tr>' + head + '</tr></thead><tbody>' + body + '</tbody></table>'
+
+    def on_change(self, callback):
+        """
+        Registers a callback called as `callback(view)` after every sort,
+        filter or page change, e.g. to render widgets for the visible rows
+
+        Args:
+            callback (callable): Callback
+        """
+        self._callbacks.append(callback)
+
+    def controls(self):
+        """
+        Returns:
+            ipywidgets.HBox: Filter box, sort column and direction, page
+            buttons and status, wired to this view
+        """
+        import ipywidgets as widgets
+        query = widgets.Text(value=self.query if isinstance(self.query, str) else '', placeholder='filter',
+                             layout=widgets.Layout(width='200px'))
+        column = widgets.Dropdown(options=[('sort by', None)] + [(h, h) for h in self.headers], value=self.sortBy,
+                                  layout=widgets.Layout(width='160px'))
+        descending = widgets.ToggleButton(value=not self.ascending, description='descending')
+        previous = widgets.Button(description='Previous Page')
+        following = widgets.Button(description='Next Page')
+        status = widgets.Label(value=self.status())
+
+        query.observe(lambda change: self.filter(change['new']), names='value')
+        column.observe(lambda change: self.sort(change['new'], not descending.value), names='value')
+        descending.observe(lambda change: self.sort(column.value, not change['new']), names='value')
+        previous.on_click(lambda button: self.goto(self.page - 1))
+        following.on_click(lambda button: self.goto(self.page + 1))
+        self.on_change(lambda view: setattr(status, 'value', view.status()))
+        return widgets.HBox([query, column, descending, previous, following, status])
+
+    def widget(self):
+        """
+        Returns:
+            ipywidgets.VBox: Controls above an HTML widget showing the
+            current page, updated in place on every change
+        """
+        import ipywidgets as widgets
+        if self._html is None:
+            self._html = widgets.HTML(value=self.html())
+            self.on_change(lambda view: setattr(view._html, 'value', view.html()))
+        return widgets.VBox([self.controls(), self._html])
+
+    # helpers
+    def _update(self, keepPage=True):
+        """
+        Rebuilds the index from the sort order and the filter, clamps the
+        page and fires the callbacks
+        """
+        if self.query is None:
+            self.index = self._order
+        elif callable(self.query):
+            self.index = [i for i in self._order if self.query(self.data[i])]
+        else:
+            if self._text is None:
+                self._text = ['\x00'.join(map(str, row)).lower() for row in self.data]
+            query = str(self.query).lower()
+            self.index = [i for i in self._order if query in self._text[i]]
+        self.page = min(max(self.page if keepPage else 0, 0), self.pages() - 1)
+        for callback in list(self._callbacks):
+            callback(self)
+        return self
+
+    def _cut(self, col):
+        col = str(col)
+        if self.maxWidth is not None and len(col) > self.maxWidth:
+            return col[:max(self.maxWidth - 1, 0)] + '…'
+        return col
+
+    @staticmethod
+    def _key(value):
+        """
+        Sort key ordering numbers, then text, then None without comparing across types
+        """
+        if value is None:
+            return (2, 0, '')
+        if isinstance(value, numbers.Number) and not isinstance(value, bool):
+            return (0, value, '')
+        return (1, 0, str(value))
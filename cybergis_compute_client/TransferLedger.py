@@ -0,0 +1,152 @@
+"""
+This module exposes TransferLedger class which records Globus downloads
+in a local JSON file so they can be resumed after the kernel restarts
+
+Example:
+        ledger = TransferLedger('./cybergis_compute_transfers.json')
+        ledger.pending()
+"""
+import json
+import os
+import time
+
+
+class TransferLedger:
+    """
+    TransferLedger class
+
+    Every initiated transfer is stored under its job id, remote path and
+    local path together with the result folder id and its last known
+    status. The file is rewritten on every change so a crash never loses
+    more than the transfer being recorded.
+
+    Args:
+        path (str): Location of the ledger file
+
+    Attributes:
+        path (str): Location of the ledger file
+        records (dict): Transfers keyed by "<job id>:<remote path>:<local path>"
+    """
+    finalStatus = ['SUCCEEDED', 'FAILED']
+
+    def __init__(self, path='./cybergis_compute_transfers.json'):
+        self.path = path
+        self.records = {}
+        self.load()
+
+    def load(self):
+        """
+        Reads the ledger file, an unreadable file is treated as empty
+        """
+        try:
+            with open(os.path.abspath(self.path)) as f:
+                self.records = json.load(f)
+        except:
+            self.records = {}
+
+    def save(self):
+        """
+        Writes the ledger file atomically
+        """
+        tmp = os.path.abspath(self.path) + '.tmp'
+        with open(tmp, 'w') as f:
+            json.dump(self.records, f)
+        os.replace(tmp, os.path.abspath(self.path))
+
+    def get(self, jobId, remotePath, localPath):
+        """
+        Returns the record of a transfer
+
+        Args:
+            jobId (str): Job id
+            remotePath (str): Path inside the remote result folder
+            localPath (str): Destination path
+
+        Returns:
+            dict: The record, None if the transfer was never initiated
+        """
+        return self.records.get(self._key(jobId, remotePath, localPath))
+
+    def record(self, jobId, folderId, remotePath, localPath, localEndpoint=None, status='ACTIVE'):
+        """
+        Records an initiated transfer
+
+        Args:
+            jobId (str): Job id
+            folderId (str): Remote result folder id
+            remotePath (str): Path inside the remote result folder
+            localPath (str): Destination path
+            localEndpoint (str): Globus endpoint id of the destination
+            status (str): Current status of the transfer
+
+        Returns:
+            dict: The new record
+        """
+        now = time.time()
+        rec = {
+            'jobId': jobId,
+            'folderId': folderId,
+            'remotePath': remotePath,
+            'localPath': localPath,
+            'localEndpoint': localEndpoint,
+            'status': status,
+            'createdAt': now,
+            'updatedAt': now
+        }
+        self.records[self._key(jobId, remotePath, localPath)] = rec
+        self.save()
+        return rec
+
+    def set_status(self, jobId, remotePath, localPath, status):
+        """
+        Updates the status of a recorded transfer, saving only on change
+
+        Args:
+            jobId (str): Job id
+            remotePath (str): Path inside the remote result folder
+            localPath (str): Destination path
+            status (str): New status
+        """
+        rec = self.get(jobId, remotePath, localPath)
+        if rec is None or rec['status'] == status:
+            return
+        rec['status'] = status
+        rec['updatedAt'] = time.time()
+        self.save()
+
+    def is_completed(self, jobId, remotePath, localPath):
+        """
+        Returns:
+            bool: True if the transfer already succeeded
+        """
+        rec = self.get(jobId, remotePath, localPath)
+        return rec is not None and rec['status'] == 'SUCCEEDED'
+
+    def is_running(self, jobId, remotePath, localPath):
+        """
+        Returns:
+            bool: True if the transfer was initiated and has not finished
+        """
+        rec = self.get(jobId, remotePath, localPath)
+        return rec is not None and rec['status'] not in self.finalStatus
+
+    def pending(self):
+        """
+        Returns:
+            list: Records of transfers that have not finished
+        """
+        return [r for r in self.records.values() if r['status'] not in self.finalStatus]
+
+    def forget(self, jobId=None):
+        """
+        Removes records, all of them or those of one job
+
+        Args:
+            jobId (str): Only forget transfers of this job
+        """
+        self.records = {k: r for k, r in self.records.items() if jobId is not None and r['jobId'] != jobId}
+        self.save()
+
+    # helpers
+    def _key(self, jobId, remotePath, localPath):
+        return str(jobId) + ':' + str(remotePath) + ':' + str(localPath)
@@ -4,6 +4,9 @@ import ipywidgets as widgets
 from ipyfilechooser import FileChooser
 from IPython.display import Markdown, display, clear_output
 from .MarkdownTable import MarkdownTable  # noqa
+from .TableView import TableView  # noqa
+from .Job import Job  # noqa
+from .Output import WidgetOutput  # noqa
 
 
 class UI:
@@ -242,13 +245,17 @@ class UI:
             description='🖥 Computing Resource:',
             style=self.style,
             layout=self.layout)
+        # the recommendation needs the job history, so it is only computed on request
+        self.computingResource['recommend'] = widgets.Button(description='💡 Recommend')
+        self.computingResource['recommendation'] = widgets.Label()
         self.computingResource['accordion'] = widgets.Accordion(
-            children=(self.computingResource['dropdown'], ),
+            children=(widgets.VBox([self.computingResource['dropdown'], widgets.HBox([
+                self.computingResource['recommend'], self.computingResource['recommendation']])]), ),
             selected_index=None)
-        self.computingResource['accordion'].set_title(
-            0, 'Computing Resource')
+        self.computingResource['accordion'].set_title(0, 'Computing Resource')
         self.computingResource['dropdown'].observe(
             self.onComputingResourceDropdownChange(), names=['value'])
+        self.computingResource['recommend'].on_click(self.onRecommendButtonClick())
         with self.computingResource['output']:
             display(self.computingResource['accordion'])
 
@@ -489,15 +496,9 @@ class UI:
             self.download['result_output'] = widgets.Output()
         # create components
         if self.jobFinished:
-            result_folder_content = self.compute.job.result_folder_content()
             # push default value to front
-            try:
-                result_folder_content.insert(
-                    0, result_folder_content.pop(
-                        result_folder_content.index(
-                            self.defaultRemoteResultFolder)))
-            except Exception:
-                result_folder_content
+            result_folder_content = self.compute.job.result_folder_index().ordered(
+                getattr(self, 'defaultRemoteResultFolder', None))
             if len(result_folder_content) == 0:
                 raise Exception('failed to get result folder content')
             self.download['dropdown'] = widgets.Dropdown(
@@ -545,13 +546,11 @@ class UI:
         if self.resultCancel['output'] is None:
             self.resultCancel['output'] = widgets.Output()
         with self.resultCancel['output']:
-            cancelText = """<p>1. Press the stop button in the top bar of your Jupyter notebook <b>twice</b>. Please note that errors will appear on the user interface. While your logs will stop updating, <b>your job is still running</b>.</p>
-
-<p>2. Create a new code block below the UI.</p>
+            cancelText = """<p>1. Create a new code block below the UI. Events and logs keep updating in the background while you do so.</p>
 
-<p>3. Enter this command is your code block and press run:&nbsp;<em>cybergis.cancel_job()</em></p>
+<p>2. Enter this command is your code block and press run:&nbsp;<em>cybergis.cancel_job()</em></p>
 
-<p>4. You should see a message displaying that your job has been canceled. Success!</p>"""
+<p>3. You should see a message displaying that your job has been canceled. Success!</p>"""
             cancelExp = widgets.Accordion(children=(widgets.HTML(value=cancelText), ), selected_index=None)
             cancelExp.set_title(0, "How to cancel a job")
             display(cancelExp)
@@ -560,50 +559,68 @@ class UI:
     def renderResultEvents(self):
         """
         Display any events that occured while the job was being processed.
+        The job watcher rerenders them whenever the job changes state.
         """
         if self.resultEvents['output'] is None:
             self.resultEvents['output'] = widgets.Output()
         if not self.submitted:
             return
-        with self.resultEvents['output']:
-            self.jobFailure = self.compute.job.events()  # run with raw=False by default
+        self.showJobEvents()
         return
 
     def renderResultLogs(self):
         """
-        Display when the job is finished and
-        rerender the download section when it is.
+        Display the logs of the job and, once the job
+        finished, rerender the download section.
         """
         if self.resultLogs['output'] is None:
             self.resultLogs['output'] = widgets.Output()
         if not self.submitted:
             return
-        with self.resultLogs['output']:
-            if not self.jobFailure:
-                self.compute.job.logs()
-                self.tab.set_title(2, '✅ Download Job Result')
-                display(Markdown('***'))
-                display(Markdown('## ✅ your job completed'))
-                self.jobFinished = True
-                self.rerender(['download'])
-            else:
-                display(Markdown('***'))
-                display(Markdown('## ❌ job failed'))
-                print("Failed to run job, check job event messages to troubleshoot")
-                self.jobFinished = False
-                return
-            self.compute.job.logs()
-            self.tab.set_title(2, '✅ Download Job Result')
-            display(Markdown('***'))
-            display(Markdown('## ✅ your job completed'))
-            self.jobFinished = True
-            self.rerender(['download', 'resultStatus'])
-        with self.submitNew['output']:
-            self.rerender(['submitNew'])
-        with self.autoDownload['output']:
-            self.rerender(['autoDownload'])
+        self.showJobLogs()
+        if self.jobFinished:
+            self.renderJobFinished()
         return
 
+    def renderJobFinished(self):
+        """
+        Rerender the sections that depend on a finished job
+        """
+        self.rerender(['download', 'resultStatus', 'submitNew'])
+        if self.autoDownload['output'] is not None:
+            self.autoDownload['output'].clear_output()
+            with self.autoDownload['output']:
+                self.renderAutoDownload()
+
+    def showJobEvents(self):
+        """
+        Replace the shown events with the job's current events. Writes
+        through the output widget's `outputs` trait, so it is safe to
+        call from the job watcher thread.
+        """
+        output = WidgetOutput(self.resultEvents['output'])
+        output.clear()
+        self.compute.job.events(liveOutput=False, output=output)
+
+    def showJobLogs(self):
+        """
+        Replace the shown logs with the job's current logs, followed by
+        a note once it failed or completed. Safe to call from the job
+        watcher thread, see :meth:`showJobEvents`.
+        """
+        output = WidgetOutput(self.resultLogs['output'])
+        output.clear()
+        self.compute.job.logs(liveOutput=False, output=output)
+        if self.jobFailure:
+            output.markdown('***')
+            output.markdown('## ❌ job failed')
+            output.message("Failed to run job, check job event messages to troubleshoot")
+            self.jobFinished = False
+        elif self.jobFinished:
+            self.tab.set_title(2, '✅ Download Job Result')
+            output.markdown('***')
+            output.markdown('## ✅ your job completed')
+
     def renderAutoDownload(self):
         """
         Automatically downloading results
@@ -614,15 +631,9 @@ class UI:
         if self.autoDownload['output'] is None:
             self.autoDownload['output'] = widgets.Output()
         if self.jobFinished:
-            result_folder_content = self.compute.job.result_folder_content()
             # push default value to front
-            try:
-                result_folder_content.insert(
-                    0, result_folder_content.pop(
-                        result_folder_content.index(
-                            self.defaultRemoteResultFolder)))
-            except Exception:
-                result_folder_content
+            result_folder_content = self.compute.job.result_folder_index().ordered(
+                getattr(self, 'defaultRemoteResultFolder', None))
             if len(result_folder_content) == 0:
                 raise Exception('failed to get result folder content')
 
@@ -646,75 +657,89 @@ class UI:
 
     def renderFolders(self):
         """
-        Display a user's folders with ability to download and rename them
+        Display a user's folders with ability to download and rename them.
+        The folder listing is fetched once per call; filtering, sorting and
+        paging run in the kernel and only redraw the visible folders.
         """
         folders = self.compute.client.request('GET', '/folder', {'jupyterhubApiToken': self.compute.jupyterhubApiToken})
         if self.folders['output'] is None:
             self.folders['output'] = widgets.Output()
+            self.folders['page'] = widgets.Output()
+        headers = ['id', 'name', 'hpc', 'userId', 'isWritable', 'createdAt', 'updatedAt', 'deletedAt']
+        self.folders['records'] = list(reversed(folders["folder"]))
+        self.folders['names'] = [*set(i['name'] for i in self.folders['records'] if i['name'] is not None)]
+        previous = self.folders['view']
+        view = TableView([[i[j] for j in headers] for i in self.folders['records']], headers, pageSize=self.foldersPerPage)
+        if previous is not None:
+            # keep the user's place across renames
+            view.sort(previous.sortBy, previous.ascending).filter(previous.query).goto(previous.page)
+        view.on_change(lambda view: self.renderFolderPage())
+        self.folders['view'] = view
         with self.folders['output']:
             display(Markdown("We will do our best to keep this data for 90 days, but cannot guarantee it won’t be deleted sooner."))
             display(Markdown("Please note that the renaming feature only allows for names made up of letters, numbers, and the characters ' . ' and ' _ '. Other characters will be removed from your input."))
-            pageNum = self.folderPage
-            numFolders = self.foldersPerPage
-            firstFolder = pageNum * numFolders
-            lastFolder = firstFolder + numFolders
-            if (lastFolder >= len(folders["folder"])):
-                lastFolder = len(folders["folder"])
-            display(Markdown('<br> **Showing folders ' + str(firstFolder + 1) + ' to ' + str(lastFolder) + ' of ' + str(len(folders["folder"])) + ' for ' + self.compute.username.split('@', 1)[0] + '**'))
-            backButton = widgets.Button(description="Previous Page")
-            nextButton = widgets.Button(description="Next Page")
-            pageButtons = widgets.HBox([backButton, nextButton])
-            backButton.on_click(self.onPrevPageButton())
-            nextButton.on_click(self.onNextPageButton(len(folders["folder"])))
-            display(pageButtons)
-            listNames = []
-            for i in folders["folder"]:
-                if i['name'] is not None:
-                    listNames.append(i['name'])
-            listNames = [*set(listNames)]
-            for i in list(reversed(folders["folder"]))[firstFolder:lastFolder]:
-                headers = ['id', 'name', 'hpc', 'userId', 'isWritable', 'createdAt', 'updatedAt', 'deletedAt']
-                data = [[]]
-                for j in headers:
-                    data[0].append(i[j])
-                display(Markdown(MarkdownTable.render(data, headers)))
+            display(view.controls())
+            display(self.folders['page'])
+        self.renderFolderPage()
+
+    def renderFolderPage(self):
+        """
+        Display the folders on the current page of the folder view
+        """
+        view = self.folders['view']
+        self.folders['page'].clear_output()
+        with self.folders['page']:
+            display(Markdown('<br> **Showing ' + view.status() + ' for ' + self.compute.username.split('@', 1)[0] + '**'))
+            for position in view.positions():
+                i = self.folders['records'][position]
+                display(Markdown(MarkdownTable.render([view.data[position]], view.headers)))
                 self.folders['button'][i['id']] = widgets.Button(description="Download Results")
                 display(self.folders['button'][i['id']])
                 self.folders['button'][i['id']].on_click(self.onFolderDownloadButtonClick(i))
                 """ Renaming UI """
                 renameButton = widgets.Button(description="Rename Job")
-                nameSelect = widgets.Combobox(placeholder='Select new name', options=listNames, description='Enter Name:', ensure_option=False, disabled=False)
+                nameSelect = widgets.Combobox(placeholder='Select new name', options=self.folders['names'], description='Enter Name:', ensure_option=False, disabled=False)
                 renameWidgets = widgets.HBox([renameButton, nameSelect])
                 renameButton.on_click(self.onRenameJobButton(i, nameSelect))
                 nameSelect.on_submit(self.onRenameJobButton(i, nameSelect))
                 display(renameWidgets)
-            display(Markdown('<br> **Showing folders ' + str(firstFolder + 1) + ' to ' + str(lastFolder) + ' of ' + str(len(folders["folder"])) + '**'))
-            display(pageButtons)
 
-    def renderRecentlySubmittedJobs(self):
+    def renderRecentlySubmittedJobs(self, refresh=True):
         """
         Display the jobs most recently submitted by the logged in user, allows user to restore these jobs.
+        The listing is cached: a refresh fetches it with one request, otherwise only the jobs
+        missing after "Load More" are fetched, and re-renders such as the loading state make none.
+
+        Args:
+            refresh (bool): Fetch the listing again, e.g. after a submit
         """
         if self.recently_submitted['output'] is None:
             self.recently_submitted['output'] = widgets.Output()
-            jobs = self.compute.client.request('GET', '/user/job', {'jupyterhubApiToken': self.compute.jupyterhubApiToken})
+        size = self.recently_submitted['job_list_size']
+        jobs = self.recently_submitted['jobs']
+        if refresh or jobs is None:
+            jobs = self.compute._fetch_jobs(limit=size, newestFirst=True)[0]
+            self.recently_submitted['fetched'] = size
+        elif size > self.recently_submitted['fetched']:
+            fetched = self.recently_submitted['fetched']
+            known = set(j['id'] for j in jobs)
+            more = self.compute._fetch_jobs(limit=size - fetched, offset=fetched, newestFirst=True)[0]
+            jobs = jobs + [j for j in more if j['id'] not in known]
+            self.recently_submitted['fetched'] = size
+        self.recently_submitted['jobs'] = jobs
+        self.recently_submitted['submit'] = {}
         with self.recently_submitted['output']:
             display(Markdown('**Recently Submitted Jobs for ' + self.compute.username.split('@', 1)[0] + '**'))
-            jobs = self.compute.client.request('GET', '/user/job', {'jupyterhubApiToken': self.compute.jupyterhubApiToken})
-            if len(jobs['job']) < self.recently_submitted['job_list_size']:
-                self.recently_submitted['job_list_size'] = len(jobs['job'])
-            for i in range(len(jobs['job']) - 1, len(jobs['job']) - self.recently_submitted['job_list_size'] - 1, -1):
-                job = self.compute.get_job_by_id(jobs['job'][i]['id'], verbose=False)
-                jobDetails = jobs['job'][i]
-                job._print_job_formatted(jobDetails)
+            for jobDetails in jobs[:size]:
+                Job._print_job_formatted(jobDetails, self.compute.output)
                 if self.refreshing:
-                    self.recently_submitted['submit'][jobs['job'][i]['id']] = widgets.Button(description="🔁 Loading", disabled=True)
+                    button = widgets.Button(description="🔁 Loading", disabled=True)
                 else:
-                    self.recently_submitted['submit'][jobs['job'][i]['id']] = widgets.Button(description="Restore")
-                display(self.recently_submitted['submit'][jobDetails['id']])
+                    button = widgets.Button(description="Restore")
+                    button.on_click(self.onJobEntryButtonClick(jobDetails['id']))
+                self.recently_submitted['submit'][jobDetails['id']] = button
+                display(button)
                 display(Markdown("<br>"))
-        for i in self.recently_submitted['submit'].keys():
-            self.recently_submitted['submit'][i].on_click(self.onJobEntryButtonClick(i))
 
     def renderLoadMore(self):
         """
@@ -749,7 +774,7 @@ class UI:
                 self.refreshing = True
                 self.recently_submitted['output'].clear_output()
                 self.load_more['output'].clear_output()
-                self.renderRecentlySubmittedJobs()
+                self.renderRecentlySubmittedJobs(refresh=False)
                 self.renderLoadMore()
                 self.download['alert_output'].clear_output(wait=True)
                 self.downloading = True
@@ -843,7 +868,10 @@ class UI:
             self.tab.selected_index = 1
             self.submitted = True
             self.tab.set_title(1, '⏳ Your Job Status')
+            self.jobFailure = False
+            self.jobFinished = False
             self.rerender(['resultStatus', 'resultEvents', 'resultLogs', 'submit'])
+            self.watchJob()
             self.recently_submitted['output'].clear_output()
             self.load_more['output'].clear_output()
             self.submitNew['output'].clear_output()
@@ -852,14 +880,62 @@ class UI:
             """ If the user has indicated the job should be named and provided a name, the produced files are named here """
             if data['name'] is not None and data['name'] != "":
                 nameForFile = self.makeNameSafe(data['name'])
-                jobs = self.compute.client.request('GET', '/user/job', {'jupyterhubApiToken': self.compute.jupyterhubApiToken})
-                job = jobs['job'][len(jobs['job']) - 1]
-                useFolder = job['remoteExecutableFolder']['id']
-                self.compute.client.request('PUT', '/folder/' + useFolder, {'jupyterhubApiToken': self.compute.jupyterhubApiToken, 'name': nameForFile + '_executable'})
-                useFolder = job['remoteResultFolder']['id']
-                self.compute.client.request('PUT', '/folder/' + useFolder, {'jupyterhubApiToken': self.compute.jupyterhubApiToken, 'name': nameForFile + '_result'})
+                # the submitted job is known, never guess it from a (possibly cached) listing
+                job = self.compute.job.status(raw=True)
+                for key, suffix in [('remoteExecutableFolder', '_executable'), ('remoteResultFolder', '_result')]:
+                    if job.get(key) is not None:
+                        useFolder = job[key]['id']
+                        self.compute.client.request('PUT', '/folder/' + useFolder, {'jupyterhubApiToken': self.compute.jupyterhubApiToken, 'name': nameForFile + suffix})
+        return on_click
+
+    def onRecommendButtonClick(self):
+        def on_click(change):
+            """
+            Estimate the fastest computing resource from the user's recent
+            jobs and show it next to the button and in the accordion title.
+            """
+            label = self.computingResource['recommendation']
+            label.value = '⏳ estimating from your recent jobs...'
+            try:
+                recommended = self.recommendHpc()
+            except Exception as e:
+                label.value = '⚠️ no recommendation: ' + str(e)
+                return
+            label.value = 'recommended: ' + str(recommended)
+            self.computingResource['accordion'].set_title(0, 'Computing Resource (💡 recommended: ' + str(recommended) + ')')
         return on_click
 
+    def onJobStatusChange(self):
+        def on_change(id, previous, state, record):
+            """
+            Called from the job watcher thread when the submitted job
+            changes state: update the result events and logs in place,
+            and hand the finished-job sections to the kernel thread.
+            """
+            if not self.submitted or self.compute.job is None or id != self.compute.job.id:
+                return
+            self.jobFailure = state == 'FAILED'
+            self.jobFinished = state == 'ENDED'
+            if self.jobFinished or self.jobFailure:
+                self.tab.set_title(1, ('✅' if self.jobFinished else '❌') + ' Your Job Status')
+            self.showJobEvents()
+            self.showJobLogs()
+            if self.jobFinished:
+                self.onKernelThread(self.renderJobFinished)
+        return on_change
+
+    def onJobTick(self):
+        def on_tick(id, state, record):
+            """
+            Called from the job watcher thread on every tick while the
+            submitted job runs: show the events and logs added since.
+            """
+            if not self.submitted or self.compute.job is None or id != self.compute.job.id:
+                return
+            self.showJobEvents()
+            self.showJobLogs()
+        return on_tick
+
     def onJobDropdownChange(self):
         def on_change(change):
             """
@@ -906,7 +982,7 @@ class UI:
             self.recently_submitted['job_list_size'] += 5
             self.recently_submitted['output'].clear_output()
             self.load_more['output'].clear_output()
-            self.renderRecentlySubmittedJobs()
+            self.renderRecentlySubmittedJobs(refresh=False)
             self.renderLoadMore()
         return on_click
 
@@ -921,10 +997,13 @@ class UI:
             self.globus_filename = 'globus_download_' + self.compute.job.id
             self.tab.selected_index = 1
             self.submitted = True
+            self.jobFailure = False
+            self.jobFinished = False
             self.rerender(['resultStatus', 'resultEvents', 'resultLogs', 'submit', 'submitNew'])
+            self.watchJob()
             self.recently_submitted['output'].clear_output()
             self.load_more['output'].clear_output()
-            self.renderRecentlySubmittedJobs()
+            self.renderRecentlySubmittedJobs(refresh=False)
             self.renderLoadMore()
             self.refreshing = False
         return on_click
@@ -954,22 +1033,6 @@ class UI:
             self.renderFolders()
         return on_click
 
-    def onPrevPageButton(self):
-        def on_click(change):
-            if (self.folderPage - 1 >= 0):
-                self.folderPage -= 1
-            self.folders['output'].clear_output()
-            self.renderFolders()
-        return on_click
-
-    def onNextPageButton(self, totalJobs):
-        def on_click(change):
-            if ((self.folderPage + 1) * self.foldersPerPage < totalJobs):
-                self.folderPage += 1
-            self.folders['output'].clear_output()
-            self.renderFolders()
-        return on_click
-
     # helpers
     def init(self):
         """
@@ -986,8 +1049,11 @@ class UI:
         self.jobFinished = False
         self.downloading = False
         self.refreshing = False
-        self.folderPage = 0
         self.foldersPerPage = 10
+        self.watchedJobId = None
+        self.jobStatusCallback = self.onJobStatusChange()
+        self.jobTickCallback = self.onJobTick()
+        self.jobRefreshRateInSeconds = 10
         # components
         self.jobTemplate = {'output': None}
         self.description = {'output': None}
@@ -1005,9 +1071,9 @@ class UI:
         self.resultLogs = {'output': None}
         self.autoDownload = {'output': None}
         self.download = {'output': None, 'alert_output': None, 'result_output': None}
-        self.recently_submitted = {'output': None, 'submit': {}, 'job_list_size': 5, 'load_more': None}
+        self.recently_submitted = {'output': None, 'submit': {}, 'job_list_size': 5, 'jobs': None, 'fetched': 0, 'load_more': None}
         self.load_more = {'output': None, 'load_more': None}
-        self.folders = {'output': None, 'button': {}}
+        self.folders = {'output': None, 'page': None, 'view': None, 'records': [], 'names': [], 'button': {}}
         # main
         self.tab = None
         # information
@@ -1016,6 +1082,42 @@ class UI:
         self.hpcName = self.job['default_hpc']
         self.hpc = self.hpcs[self.hpcName]
 
+    def recommendHpc(self):
+        """
+        Returns the supported HPC of the selected job template with the
+        lowest expected time-to-result
+
+        Raises:
+            Exception: If the job history cannot be fetched
+        """
+        return self.compute.get_hpc_recommender().recommend(
+            'community_contribution', self.jobName, self.job['supported_hpc'])
+
+    def watchJob(self):
+        """
+        Watch the current job with the UI's single status and tick
+        callbacks, refreshing its events and logs at least every
+        `jobRefreshRateInSeconds` while it runs, and unwatch the job
+        watched before it
+        """
+        if self.watchedJobId is not None:
+            self.compute.watcher.unwatch(self.watchedJobId)
+        self.watchedJobId = self.compute.job.id
+        self.compute.watch_job(self.compute.job, on_status_change=self.jobStatusCallback, on_tick=self.jobTickCallback,
+                               tickIntervalInSeconds=self.jobRefreshRateInSeconds)
+
+    def onKernelThread(self, callback):
+        """
+        Run `callback` on the kernel's event loop, where rendering into
+        output widgets with `with out:` is reliable, or right away outside
+        a kernel
+        """
+        try:
+            from IPython import get_ipython
+            get_ipython().kernel.io_loop.add_callback(callback)
+        except AttributeError:
+            callback()
+
     def rerender(self, components=[]):
         """
         Clears and renders the specified components
@@ -4,26 +4,111 @@ to avoid disk access
 
 Example:
         zip = Zip()
+        with Zip() as zip:
+            zip.append('a.txt', 'a')
+            zip.add_directory('./model', 'model')
+        zip = Zip(policy=CompressionPolicy())
 """
 
+import mmap
+import os
+import posixpath
+import shutil
+import tempfile
+import time
 import zipfile
+import zlib
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from io import BytesIO
 
 
+class CompressionPolicy(object):
+    """
+    CompressionPolicy class
+
+    Picks how each entry is stored. Entries whose extension is in
+    `storedExtensions` are stored as is. Other entries of at least
+    `sampleSize` bytes are sampled: their first `sampleSize` bytes are
+    deflated at level 1, and the entry is stored if that saves less than
+    `minSaving` of the sample. Everything else is deflated at `level`.
+
+    Args:
+        level(int): Deflate level from 1 to 9, None for zlib's default
+        storedExtensions(list): Extensions stored without sampling,
+            `defaultStoredExtensions` if None
+        sampleSize(int): Bytes sampled per entry
+        minSaving(float): Fraction of the sample deflate must save
+    """
+    defaultStoredExtensions = [
+        '.zip', '.gz', '.tgz', '.bz2', '.xz', '.7z', '.zst', '.whl',
+        '.jpg', '.jpeg', '.png', '.gif', '.webp', '.jp2', '.mp4', '.parquet']
+
+    def __init__(self, level=None, storedExtensions=None, sampleSize=64 * 1024, minSaving=0.1):
+        self.level = level
+        self.storedExtensions = set(self.defaultStoredExtensions if storedExtensions is None else storedExtensions)
+        self.sampleSize = sampleSize
+        self.minSaving = minSaving
+
+    def choose(self, filename_in_zip, sample):
+        """
+        Picks the compression of an entry
+
+        Args:
+            filename_in_zip(str): Name of the entry
+            sample(bytes): First `sampleSize` bytes of the entry
+
+        Returns:
+            tuple: (zipfile.ZIP_STORED or zipfile.ZIP_DEFLATED, level)
+        """
+        if os.path.splitext(filename_in_zip)[1].lower() in self.storedExtensions:
+            return zipfile.ZIP_STORED, None
+        if isinstance(sample, str):
+            sample = sample.encode('utf-8')
+        if len(sample) >= self.sampleSize:
+            compressor = zlib.compressobj(1, zlib.DEFLATED, -15)
+            if len(compressor.compress(sample) + compressor.flush()) > (1 - self.minSaving) * len(sample):
+                return zipfile.ZIP_STORED, None
+        return zipfile.ZIP_DEFLATED, self.level
+
+
 class Zip(object):
     """
     Zip class
 
     An interface that creates an in-memory zip object to
-    avoid disk access
+    avoid disk access. Entries are written through a single open
+    archive handle, and the archive is finalized (its central
+    directory written) once, when it is read, written out or
+    when the `with` block ends.
+
+    Args:
+        spillSize(int): Size in bytes above which the archive moves from
+            memory to a temporary file, None to always keep it in memory
+        policy(CompressionPolicy): Picks the compression per entry, None
+            to deflate everything
 
     Attributes:
-        in_memory_zip: A BytesIO in-memory file
+        in_memory_zip: A SpooledTemporaryFile, in memory until it
+            grows beyond `spillSize`
+        report(list): One dict per entry with keys `name`, `method`,
+            `level`, `size`, `compressedSize`, `ratio` (compressed over
+            original size), `seconds` and `reused` (taken from a
+            manifest's cache)
     """
-    def __init__(self):
+    def __init__(self, spillSize=64 * 1024 * 1024, policy=None):
         """Inits Zip with in_memory_zip"""
-        # Create the in-memory file-like object
-        self.in_memory_zip = BytesIO()
+        # Create the in-memory file-like object, spilled to disk once large
+        self.in_memory_zip = tempfile.SpooledTemporaryFile(max_size=spillSize or 0)
+        self.policy = policy
+        self.report = []
+        self._zf = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
 
     def mkdir(self, filedir_in_zip):
         """
@@ -35,19 +120,8 @@ class Zip(object):
         Returns:
             Zip: this Zip
         """
-        # Get a handle to the in-memory zip in append mode
-        zf = zipfile.ZipFile(
-            self.in_memory_zip, "a", zipfile.ZIP_DEFLATED, False)
-
         # Writes a directory to the in-memory zip
-        zf.writestr(
-            filedir_in_zip + '/.placeholder', "b", zipfile.ZIP_DEFLATED)
-
-        # Mark the files as having been created on Windows so that
-        # # Unix permissions are not inferred as 0000
-        for zfile in zf.filelist:
-            zfile.create_system = 0
-
+        self._writestr(filedir_in_zip + '/.placeholder', "b")
         return self
 
     def append(self, filename_in_zip, file_contents):
@@ -63,30 +137,146 @@ class Zip(object):
         Returns:
             Zip: this Zip
         """
-        # Get a handle to the in-memory zip in append mode
-        zf = zipfile.ZipFile(
-            self.in_memory_zip, "a", zipfile.ZIP_DEFLATED, False)
-
         # Write the file to the in-memory zip
-        zf.writestr(filename_in_zip, file_contents, zipfile.ZIP_DEFLATED)
+        self._writestr(filename_in_zip, file_contents)
+        return self
 
-        # Mark the files as having been created on Windows so that
-        # # Unix permissions are not inferred as 0000
-        for zfile in zf.filelist:
-            zfile.create_system = 0
+    def append_file(self, filename_in_zip, path, chunkSize=1024 * 1024):
+        """
+        Appends a file read from disk chunk by chunk
+
+        Args:
+            filename_in_zip(str): Name of the zip_file
+            path(str): File on disk
+            chunkSize(int): Bytes read at a time
 
+        Returns:
+            Zip: this Zip
+        """
+        start = time.perf_counter()
+        with open(path, 'rb') as src:
+            info = self._info(filename_in_zip, path, src.read(self._sampleSize()))
+            src.seek(0)
+            with self._archive().open(info, 'w') as dest:
+                for chunk in iter(lambda: src.read(chunkSize), b''):
+                    dest.write(chunk)
+        self._record(info, time.perf_counter() - start)
         return self
 
+    def add_directory(self, path, arcname='', maxWorkers=None, largeFileSize=64 * 1024 * 1024, manifest=None):
+        """
+        Appends every file below `path`. Files are compressed in parallel
+        on a thread pool (zlib releases the GIL while compressing) and
+        written in sorted path order, so the same directory always yields
+        the same archive. At most two files per worker are held in memory;
+        files of `largeFileSize` bytes or more are streamed instead.
+
+        With a manifest, unchanged files reuse their cached compressed data
+        and changed files are compressed into the cache, from where every
+        entry is copied into the archive.
+
+        Args:
+            path(str): Directory on disk
+            arcname(str): Directory in the zip the files are put under
+            maxWorkers(int): Compression threads, the number of CPUs if None
+            largeFileSize(int): Size from which a file is streamed
+            manifest(ZipManifest): Records packaged files and caches their
+                compressed data, see :class:`cybergis_compute_client.ZipManifest.ZipManifest`
+
+        Returns:
+            Zip: this Zip
+        """
+        maxWorkers = maxWorkers or os.cpu_count() or 1
+        pending = deque()
+        with ThreadPoolExecutor(max_workers=maxWorkers) as executor:
+            for filename_in_zip, filepath in self._walk(path, arcname):
+                if manifest is not None:
+                    pending.append(executor.submit(self._compress_cached, filename_in_zip, filepath, manifest))
+                elif os.path.getsize(filepath) >= largeFileSize:
+                    while pending:
+                        self._write_compressed(*pending.popleft().result())
+                    self.append_file(filename_in_zip, filepath)
+                    continue
+                else:
+                    pending.append(executor.submit(self._compress, filename_in_zip, filepath))
+                if len(pending) >= 2 * maxWorkers:
+                    self._write_compressed(*pending.popleft().result())
+            while pending:
+                self._write_compressed(*pending.popleft().result())
+        if manifest is not None:
+            manifest.save()
+        return self
+
+    def close(self):
+        """
+        Finalizes the archive. Appending afterwards reopens it.
+        """
+        if self._zf is not None:
+            self._zf.close()
+            self._zf = None
+
+    def spilled(self):
+        """
+        Returns:
+            bool: Whether the archive has moved to a temporary file
+        """
+        return not isinstance(self._spool(), BytesIO)
+
     def read(self):
         """
-        Reads the contents of the in-memory zip.
+        Reads the contents of the in-memory zip. This copies the whole
+        archive, prefer :meth:`getbuffer` or :meth:`write_to`.
 
         Returns:
             str: contents of the in-memory zip
         """
+        self.close()
         self.in_memory_zip.seek(0)
         return self.in_memory_zip.read()
 
+    def getbuffer(self):
+        """
+        Returns a read-only view of the archive, backed by the in-memory
+        buffer's value (shared, not copied, by BytesIO) or a memory map of
+        the temporary file. Release the view before appending again.
+
+        Returns:
+            memoryview: contents of the zip
+        """
+        self.close()
+        if not self.spilled():
+            return memoryview(self._spool().getvalue())
+        self.in_memory_zip.flush()
+        if os.fstat(self.in_memory_zip.fileno()).st_size == 0:
+            return memoryview(b'')
+        return memoryview(mmap.mmap(self.in_memory_zip.fileno(), 0, access=mmap.ACCESS_READ))
+
+    def iter_chunks(self, chunkSize=1024 * 1024):
+        """
+        Yields the archive chunk by chunk
+
+        Args:
+            chunkSize(int): Bytes per chunk
+
+        Yields:
+            bytes: next chunk of the zip
+        """
+        self.close()
+        self.in_memory_zip.seek(0)
+        for chunk in iter(lambda: self.in_memory_zip.read(chunkSize), b''):
+            yield chunk
+
+    def write_to(self, fileobj, chunkSize=1024 * 1024):
+        """
+        Copies the archive into a binary file object chunk by chunk
+
+        Args:
+            fileobj: Writable binary file object, e.g. a socket file or an open file
+            chunkSize(int): Bytes copied at a time
+        """
+        for chunk in self.iter_chunks(chunkSize):
+            fileobj.write(chunk)
+
     def write(self, filename):
         """
         Writes the in-memory zip to a file
@@ -94,6 +284,185 @@ class Zip(object):
         Args:
             filename(str): Name of the file that needs to be written
         """
-        f = open(filename, "wb")
-        f.write(self.read())
-        f.close()
+        with open(filename, "wb") as f:
+            self.write_to(f)
+
+    # helpers
+    def _archive(self):
+        """
+        Returns the open archive handle, opening it in append mode if needed
+        """
+        if self._zf is None:
+            self._zf = zipfile.ZipFile(
+                self.in_memory_zip, "a", zipfile.ZIP_DEFLATED, False)
+        return self._zf
+
+    def _spool(self):
+        """
+        Returns the file object behind the SpooledTemporaryFile: a BytesIO
+        until it rolls over, a temporary file after. The standard library
+        has no public accessor for it, so this is the only place relying on
+        the private attribute.
+        """
+        return getattr(self.in_memory_zip, '_file', self.in_memory_zip)
+
+    def _info(self, filename_in_zip, path=None, sample=b''):
+        """
+        Returns the header of a new entry, dated like the file at `path` if
+        given, compressed as the policy picks from `sample`
+        """
+        if path is None:
+            info = zipfile.ZipInfo(filename_in_zip, time.localtime(time.time())[:6])
+            info.external_attr = 0o600 << 16
+        else:
+            # like ZipInfo.from_file(..., strict_timestamps=False) on 3.8+:
+            # dates zip cannot store are clamped instead of raising
+            stat = os.stat(path)
+            dateTime = time.localtime(stat.st_mtime)[:6]
+            if dateTime[0] < 1980:
+                dateTime = (1980, 1, 1, 0, 0, 0)
+            elif dateTime[0] > 2107:
+                dateTime = (2107, 12, 31, 23, 59, 59)
+            info = zipfile.ZipInfo(filename_in_zip, dateTime)
+            info.external_attr = (stat.st_mode & 0xFFFF) << 16
+            info.file_size = stat.st_size
+        if self.policy is None:
+            info.compress_type = zipfile.ZIP_DEFLATED
+        else:
+            info.compress_type, info._compresslevel = self.policy.choose(filename_in_zip, sample)
+        # Mark the files as having been created on Windows so that
+        # Unix permissions are not inferred as 0000
+        info.create_system = 0
+        return info
+
+    def _sampleSize(self):
+        return 0 if self.policy is None else self.policy.sampleSize
+
+    def _writestr(self, filename_in_zip, file_contents):
+        """
+        Writes an entry from memory and records it in the report
+        """
+        start = time.perf_counter()
+        info = self._info(filename_in_zip, sample=file_contents[:self._sampleSize()])
+        self._archive().writestr(info, file_contents)
+        self._record(info, time.perf_counter() - start)
+
+    def _record(self, info, seconds, reused=False):
+        """
+        Appends an entry to the report
+        """
+        self.report.append({
+            'name': info.filename,
+            'method': 'STORE' if info.compress_type == zipfile.ZIP_STORED else 'DEFLATE',
+            'level': info._compresslevel,
+            'size': info.file_size,
+            'compressedSize': info.compress_size,
+            'ratio': info.compress_size / info.file_size if info.file_size else 1.0,
+            'seconds': seconds,
+            'reused': reused})
+
+    def _walk(self, path, arcname):
+        """
+        Yields (name in zip, path on disk) of every file below `path`, sorted
+        """
+        for root, dirs, names in os.walk(path):
+            dirs.sort()
+            for name in sorted(names):
+                filepath = os.path.join(root, name)
+                relative = os.path.relpath(filepath, path).replace(os.sep, '/')
+                yield posixpath.join(arcname, relative) if arcname else relative, filepath
+
+    def _compress(self, filename_in_zip, path):
+        """
+        Compresses a file the way zipfile does, returning its header, data
+        and the time spent
+        """
+        start = time.perf_counter()
+        with open(path, 'rb') as f:
+            data = f.read()
+        info = self._info(filename_in_zip, path, data[:self._sampleSize()])
+        info.file_size = len(data)
+        info.CRC = zlib.crc32(data)
+        if info.compress_type == zipfile.ZIP_DEFLATED:
+            level = zlib.Z_DEFAULT_COMPRESSION if info._compresslevel is None else info._compresslevel
+            compressor = zlib.compressobj(level, zlib.DEFLATED, -15)
+            data = compressor.compress(data) + compressor.flush()
+        info.compress_size = len(data)
+        return info, data, time.perf_counter() - start
+
+    def _compress_cached(self, filename_in_zip, path, manifest):
+        """
+        Returns the header and cached blob path of a file, compressing it
+        into the manifest's cache only if no blob holds its content yet
+        """
+        start = time.perf_counter()
+        stat = os.stat(path)
+        name = manifest.unchanged(path, stat)
+        reused = name is not None
+        if name is None:
+            with open(path, 'rb') as f:
+                info = self._info(filename_in_zip, path, f.read(self._sampleSize()))
+            sha256 = manifest.digest(path)
+            name = manifest.blob_name(sha256, info.compress_type, info._compresslevel)
+            reused = manifest.ensure_blob(name, lambda tmp: self._compress_to(path, info, tmp))[1]
+            manifest.record(path, stat, sha256, name)
+        blob = manifest.blob(name)
+        info = self._info(filename_in_zip, path)
+        info.compress_type, info._compresslevel = blob['method'], blob['level']
+        info.CRC, info.file_size, info.compress_size = blob['crc'], blob['size'], blob['compressedSize']
+        return info, manifest.blob_path(name), time.perf_counter() - start, reused
+
+    def _compress_to(self, path, info, dest, chunkSize=1024 * 1024):
+        """
+        Compresses a file into `dest` chunk by chunk, returning the blob metadata
+        """
+        crc, size, compressedSize = 0, 0, 0
+        compressor = None
+        if info.compress_type == zipfile.ZIP_DEFLATED:
+            level = zlib.Z_DEFAULT_COMPRESSION if info._compresslevel is None else info._compresslevel
+            compressor = zlib.compressobj(level, zlib.DEFLATED, -15)
+        with open(path, 'rb') as src, open(dest, 'wb') as out:
+            for chunk in iter(lambda: src.read(chunkSize), b''):
+                crc = zlib.crc32(chunk, crc)
+                size += len(chunk)
+                if compressor is not None:
+                    chunk = compressor.compress(chunk)
+                out.write(chunk)
+                compressedSize += len(chunk)
+            if compressor is not None:
+                chunk = compressor.flush()
+                out.write(chunk)
+                compressedSize += len(chunk)
+        return {'crc': crc, 'size': size, 'compressedSize': compressedSize,
+                'method': info.compress_type, 'level': info._compresslevel}
+
+    def _write_compressed(self, info, data, seconds, reused=False):
+        """
+        Writes an entry whose data is already compressed, given as bytes or
+        as the path of a file holding them. zipfile has no public API for
+        this, so the local header and the bookkeeping done by
+        ZipFile.open(..., 'w') are replicated here.
+
+        This relies on the private ZipFile attributes `fp`, `start_dir`,
+        `_writing` and `_didModify`, checked against CPython 3.7 and 3.11.
+        Entries needing zip64 sizes or offsets are rejected, like the
+        archive itself does (it is opened with allowZip64=False).
+        """
+        zf = self._archive()
+        if zf._writing:
+            raise ValueError("can't write to the archive while an entry is open for writing")
+        if max(info.file_size, info.compress_size, zf.start_dir) > zipfile.ZIP64_LIMIT:
+            raise zipfile.LargeZipFile(info.filename + ' would require ZIP64 extensions')
+        zf.fp.seek(zf.start_dir)
+        info.header_offset = zf.start_dir
+        zf.fp.write(info.FileHeader())
+        if isinstance(data, str):
+            with open(data, 'rb') as f:
+                shutil.copyfileobj(f, zf.fp, 1024 * 1024)
+        else:
+            zf.fp.write(data)
+        zf.filelist.append(info)
+        zf.NameToInfo[info.filename] = info
+        zf.start_dir = zf.fp.tell()
+        zf._didModify = True
+        self._record(info, seconds, reused)
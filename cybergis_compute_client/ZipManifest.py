@@ -0,0 +1,181 @@
+"""
+This module exposes ZipManifest class which remembers the files packaged
+by :meth:`cybergis_compute_client.Zip.Zip.add_directory` and keeps their
+compressed data, so packaging a mostly unchanged folder again only
+compresses what changed
+
+Example:
+        manifest = ZipManifest('./cybergis_compute_zip_manifest.json')
+        Zip().add_directory('./model', 'model', manifest=manifest)
+"""
+import hashlib
+import json
+import os
+import tempfile
+import threading
+
+
+class ZipManifest:
+    """
+    ZipManifest class
+
+    Every packaged file is recorded with its size, mtime and SHA-256. A
+    file whose size and mtime did not change is trusted without being
+    read; any other file is hashed, and only compressed again when no
+    entry with the same hash and compression is cached. Compressed
+    entries ("blobs") are kept in `cacheDir` and built at most once at a
+    time per name, even by concurrent workers. On :meth:`save`, files
+    that no longer exist are forgotten and blobs no file refers to any
+    more are deleted.
+
+    Args:
+        path (str): Location of the manifest file
+        cacheDir (str): Directory of the cached compressed entries,
+            `path` + ".cache" if None
+
+    Attributes:
+        files (dict): Per absolute file path, its `size`, `mtimeNs`,
+            `sha256` and `blob`
+        blobs (dict): Per blob name, its `crc`, `size`, `compressedSize`,
+            `method` and `level`
+    """
+    def __init__(self, path='./cybergis_compute_zip_manifest.json', cacheDir=None):
+        self.path = path
+        self.cacheDir = cacheDir if cacheDir is not None else os.path.abspath(path) + '.cache'
+        self._lock = threading.Lock()
+        self._blobLocks = {}
+        os.makedirs(self.cacheDir, exist_ok=True)
+        try:
+            with open(os.path.abspath(path)) as f:
+                manifest = json.load(f)
+            self.files, self.blobs = manifest['files'], manifest['blobs']
+        except:
+            self.files, self.blobs = {}, {}
+
+    def save(self):
+        """
+        Forgets files that no longer exist, deletes unreferenced blobs and
+        writes the manifest file atomically
+        """
+        with self._lock:
+            for filepath in [filepath for filepath in self.files if not os.path.exists(filepath)]:
+                del self.files[filepath]
+            referenced = set(entry['blob'] for entry in self.files.values())
+            for name in list(self.blobs):
+                if name not in referenced:
+                    del self.blobs[name]
+                    try:
+                        os.remove(self.blob_path(name))
+                    except OSError:
+                        pass
+            tmp = os.path.abspath(self.path) + '.tmp'
+            with open(tmp, 'w') as f:
+                json.dump({'files': self.files, 'blobs': self.blobs}, f)
+            os.replace(tmp, os.path.abspath(self.path))
+
+    def unchanged(self, filepath, stat):
+        """
+        Fast path: returns the blob of a file whose size and mtime match
+        the manifest
+
+        Args:
+            filepath (str): File on disk
+            stat (os.stat_result): Current stat of the file
+
+        Returns:
+            str: Blob name, None if the file changed or was never packaged
+        """
+        with self._lock:
+            entry = self.files.get(os.path.abspath(filepath))
+            if entry is None or entry['size'] != stat.st_size or entry['mtimeNs'] != stat.st_mtime_ns:
+                return None
+            return entry['blob'] if self.blob(entry['blob']) is not None else None
+
+    def blob(self, name):
+        """
+        Returns the metadata of a cached blob
+
+        Args:
+            name (str): Blob name
+
+        Returns:
+            dict: Metadata, None if the blob is not cached
+        """
+        meta = self.blobs.get(name)
+        if meta is None or not os.path.exists(self.blob_path(name)):
+            return None
+        return meta
+
+    def blob_path(self, name):
+        """
+        Returns:
+            str: Location of a blob's compressed data
+        """
+        return os.path.join(self.cacheDir, name)
+
+    def ensure_blob(self, name, build):
+        """
+        Builds a blob unless it is cached. Concurrent calls for the same
+        name wait for the first one instead of writing the blob again.
+
+        Args:
+            name (str): Blob name
+            build (callable): Called as `build(tmpPath)`, writes the
+                compressed data to `tmpPath` and returns the blob metadata
+                (`crc`, `size`, `compressedSize`, `method` and `level`)
+
+        Returns:
+            tuple: (metadata, whether the blob was already cached)
+        """
+        with self._lock:
+            lock = self._blobLocks.setdefault(name, threading.Lock())
+        with lock:
+            meta = self.blob(name)
+            if meta is not None:
+                return meta, True
+            fd, tmp = tempfile.mkstemp(dir=self.cacheDir, prefix=name + '.', suffix='.tmp')
+            os.close(fd)
+            try:
+                meta = build(tmp)
+                os.replace(tmp, self.blob_path(name))
+            except BaseException:
+                if os.path.exists(tmp):
+                    os.remove(tmp)
+                raise
+            with self._lock:
+                self.blobs[name] = meta
+            return meta, False
+
+    def record(self, filepath, stat, sha256, blob):
+        """
+        Records the current state of a file and the blob holding its data
+
+        Args:
+            filepath (str): File on disk
+            stat (os.stat_result): Stat of the file when it was hashed
+            sha256 (str): Hex digest of its content
+            blob (str): Blob name
+        """
+        with self._lock:
+            self.files[os.path.abspath(filepath)] = {
+                'size': stat.st_size, 'mtimeNs': stat.st_mtime_ns, 'sha256': sha256, 'blob': blob}
+
+    @staticmethod
+    def blob_name(sha256, method, level):
+        """
+        Returns:
+            str: Name of the blob of some content compressed a given way
+        """
+        return sha256 + '-' + str(method) + '-' + str(level)
+
+    @staticmethod
+    def digest(filepath, chunkSize=1024 * 1024):
+        """
+        Returns:
+            str: SHA-256 hex digest of a file, read chunk by chunk
+        """
+        sha256 = hashlib.sha256()
+        with open(filepath, 'rb') as f:
+            for chunk in iter(lambda: f.read(chunkSize), b''):
+                sha256.update(chunk)
+        return sha256.hexdigest()
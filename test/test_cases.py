@@ -1,13 +1,38 @@
 import io
+import json
 import sys
+import time
 import os
 from unittest.mock import patch
 import pytest
 import socket
+import subprocess
+import threading
+import zipfile
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 
+from cybergis_compute_client.Client import *
 from cybergis_compute_client.CyberGISCompute import *
 from cybergis_compute_client.Job import *
 from cybergis_compute_client.Zip import *
+from cybergis_compute_client.ZipManifest import *
+from cybergis_compute_client.ResultFolderIndex import *
+from cybergis_compute_client.GlobusDownloader import *
+from cybergis_compute_client.JupyterGlobus import *
+from cybergis_compute_client.TransferLedger import *
+from cybergis_compute_client.Sweep import *
+from cybergis_compute_client.JobGroup import *
+from cybergis_compute_client.ParamSpace import *
+from cybergis_compute_client.ResultCache import *
+from cybergis_compute_client.JobRegistry import *
+from cybergis_compute_client.Output import *
+from cybergis_compute_client.MarkdownTable import *
+from cybergis_compute_client.TableView import *
+from cybergis_compute_client.JobAnalytics import *
+from cybergis_compute_client.HPCRecommender import *
+from cybergis_compute_client.Cancellation import *
+from cybergis_compute_client.JobWatcher import *
 
 """
 Ensures zipping is working as intended
@@ -60,4 +85,950 @@ def test_CyberGISCompute():
     with pytest.raises(Exception) as exc_info:
         community_Summa_Session.create_job()
     exception_raised = exc_info.value
-    assert isinstance(exception_raised,socket.gaierror) 
+    assert isinstance(exception_raised,socket.gaierror)
+
+
+"""
+Ensures the result folder index answers prefix/glob/extension queries and applies refreshes incrementally
+"""
+def test_ResultFolderIndex():
+    index = ResultFolderIndex(['/', '/out', '/out/a.tif', '/out/b.csv', {'path': '/log.txt', 'size': 12}])
+    assert index.prefix('/out') == ['/out', '/out/a.tif', '/out/b.csv']
+    assert index.glob('/out/*.csv') == ['/out/b.csv']
+    assert index.extension('TIF') == ['/out/a.tif']
+    assert index.children('/out') == ['/out/a.tif', '/out/b.csv']
+    assert index.get('/log.txt')['size'] == 12
+    assert index.ordered('/out')[0] == '/out'
+    added, removed = index.update(['/', '/out', '/out/a.tif', '/out/c.csv'])
+    assert added == ['/out/c.csv']
+    assert sorted(removed) == ['/log.txt', '/out/b.csv']
+    assert index.extension('csv') == ['/out/c.csv']
+    assert len(index) == 4
+
+
+"""
+Ensures Globus downloads of different folders run side by side under the per-endpoint limit
+"""
+def test_GlobusDownloader():
+    class FakeJob:
+        started = []
+        polls = {}
+
+        def __init__(self, id):
+            self.id = id
+
+        def _result_folder_id(self):
+            return 'folder_' + self.id
+
+        def _globus_init(self, folderId, remotePath, localPath, localEndpoint):
+            FakeJob.started.append(folderId)
+
+        def _globus_status(self, folderId):
+            FakeJob.polls[folderId] = FakeJob.polls.get(folderId, 0) + 1
+            return {'status': 'SUCCEEDED' if FakeJob.polls[folderId] >= 2 else 'ACTIVE'}
+
+    downloader = GlobusDownloader(maxConcurrentPerEndpoint=2, refreshRateInSeconds=0, verbose=False)
+    for i in range(3):
+        downloader.add(FakeJob(str(i)), '/', '/tmp/' + str(i), 'endpoint')
+    results = downloader.run()
+    assert [r['status'] for r in results] == ['SUCCEEDED'] * 3
+    assert FakeJob.started == ['folder_0', 'folder_1', 'folder_2']
+    assert FakeJob.polls == {'folder_0': 2, 'folder_1': 2, 'folder_2': 2}
+
+
+"""
+Ensures Job.download_result_folders_by_globus defaults to the Jupyter Globus root and endpoint, and downloads the whole result folder without listing it when no pattern is given
+"""
+def test_download_result_folders_defaults():
+    class FakeClient:
+        uris = []
+
+        def request(self, method, uri, body={}):
+            if uri == '/user/jupyter-globus':
+                FakeClient.uris.append(uri)
+                return {'root_path': '/home/user', 'endpoint': 'jupyter'}
+            return {'id': 'a', 'hpc': 'hpc', 'events': []}
+
+    job = Job(id='a', client=FakeClient(), isJupyter=False, jupyterhubApiToken='token', printJob=False)
+    job._result_folder_id = lambda: 'folder_a'
+    job._globus_init = lambda folderId, remotePath, localPath, localEndpoint: None
+    job._globus_status = lambda folderId: {'status': 'SUCCEEDED'}
+    job.result_folder_index = None
+    results = job.download_result_folders_by_globus(refreshRateInSeconds=0, verbose=False)
+    assert FakeClient.uris == ['/user/jupyter-globus']
+    assert [(r['remotePath'], r['localPath'], r['localEndpoint']) for r in results] == [('/', '/home/user/', 'jupyter')]
+
+
+"""
+Ensures the transfer ledger survives a restart and lets downloads skip or re-attach to earlier transfers
+"""
+def test_TransferLedger(tmp_path):
+    path = str(tmp_path / 'transfers.json')
+    local = {id: str(tmp_path / id) for id in 'abcd'}
+    os.makedirs(local['a'])
+    ledger = TransferLedger(path)
+    ledger.record('a', 'folder_a', '/', local['a'], 'endpoint', status='SUCCEEDED')
+    ledger.record('b', 'folder_b', '/', local['b'], 'endpoint')
+    # succeeded, but the local copy was deleted since
+    ledger.record('d', 'folder_d', '/', local['d'], 'endpoint', status='SUCCEEDED')
+
+    class FakeJob:
+        def __init__(self, id):
+            self.id = id
+            self.inits = 0
+
+        def _result_folder_id(self):
+            return 'folder_' + self.id
+
+        def _globus_init(self, folderId, remotePath, localPath, localEndpoint):
+            self.inits += 1
+
+        def _globus_status(self, folderId):
+            return {'status': 'SUCCEEDED'}
+
+    restarted = TransferLedger(path)
+    assert [r['jobId'] for r in restarted.pending()] == ['b']
+    jobs = [FakeJob('a'), FakeJob('b'), FakeJob('c'), FakeJob('d')]
+    downloader = GlobusDownloader(refreshRateInSeconds=0, verbose=False, ledger=restarted)
+    for job in jobs:
+        downloader.add(job, '/', local[job.id], 'endpoint')
+    results = downloader.run()
+    assert [r['status'] for r in results] == ['SUCCEEDED'] * 4
+    assert [job.inits for job in jobs] == [0, 0, 1, 1]
+    assert [r['skipped'] for r in results] == [True, False, False, False]
+    assert TransferLedger(path).pending() == []
+
+    forced = GlobusDownloader(refreshRateInSeconds=0, verbose=False, ledger=restarted, force=True)
+    results = forced.add(jobs[0], '/', local['a'], 'endpoint').run()
+    assert jobs[0].inits == 1 and not results[0]['skipped']
+
+
+"""
+Ensures a completed download is skipped when its endpoint path exists under the kernel's home, which differs from the Globus root
+"""
+def test_TransferLedger_kernel_path(tmp_path):
+    home = str(tmp_path / 'home')
+    os.makedirs(os.path.join(home, 'globus_download_a'))
+
+    class FakeClient:
+        def request(self, method, uri, body={}):
+            if uri == '/user/jupyter-globus':
+                return {'root_path': '/~/', 'container_home_path': home, 'endpoint': 'jupyter'}
+            return {'id': 'a', 'hpc': 'hpc', 'events': []}
+
+    jupyterGlobus = JupyterGlobus(FakeClient(), 'token')
+    assert jupyterGlobus.kernel_path('/~/globus_download_a') == os.path.join(home, 'globus_download_a')
+    assert jupyterGlobus.kernel_path('/elsewhere/a') == '/elsewhere/a'
+
+    ledger = TransferLedger(str(tmp_path / 'transfers.json'))
+    ledger.record('a', 'folder_a', '/', '/~/globus_download_a', 'jupyter', status='SUCCEEDED')
+    ledger.record('b', 'folder_b', '/', '/~/globus_download_b', 'jupyter', status='SUCCEEDED')
+    job = Job(id='a', client=FakeClient(), isJupyter=False, jupyterhubApiToken='token', printJob=False,
+              transferLedger=ledger, output=SilentOutput())
+    job._result_folder_id = lambda: pytest.fail('a completed download must not start again')
+    job.download_result_folder_by_globus('/~/globus_download_a', 'jupyter', '/')
+
+    inits = []
+    jobs = [job, Job(id='b', client=FakeClient(), isJupyter=False, jupyterhubApiToken='token', printJob=False)]
+    for j in jobs:
+        j._result_folder_id = lambda j=j: 'folder_' + j.id
+        j._globus_init = lambda folderId, remotePath, localPath, localEndpoint: inits.append(folderId)
+        j._globus_status = lambda folderId: {'status': 'SUCCEEDED'}
+    downloader = GlobusDownloader(refreshRateInSeconds=0, verbose=False, ledger=ledger, jupyterGlobus=jupyterGlobus)
+    for j in jobs:
+        downloader.add(j, '/', '/~/globus_download_' + j.id, 'jupyter')
+    assert [r['skipped'] for r in downloader.run()] == [True, False]
+    assert inits == ['folder_b']
+
+
+"""
+Ensures transfers re-attached from the ledger count towards the per-endpoint limit
+"""
+def test_GlobusDownloader_resume_limit(tmp_path):
+    ledger = TransferLedger(str(tmp_path / 'transfers.json'))
+    for i in range(4):
+        ledger.record(str(i), 'folder_' + str(i), '/', '/tmp/' + str(i), 'endpoint')
+
+    class FakeJob:
+        def __init__(self, id):
+            self.id = id
+
+        def _globus_status(self, folderId):
+            return {'status': 'SUCCEEDED'}
+
+    downloader = GlobusDownloader(maxConcurrentPerEndpoint=2, refreshRateInSeconds=0, verbose=False, ledger=ledger)
+    for i in range(4):
+        downloader.add(FakeJob(str(i)), '/', '/tmp/' + str(i), 'endpoint')
+    original = downloader._poll
+    polled = []
+
+    def poll(t):
+        polled.append(len([x for x in downloader.transfers if x['status'] == 'ACTIVE']))
+        original(t)
+    downloader._poll = poll
+    results = downloader.run()
+    assert [r['status'] for r in results] == ['SUCCEEDED'] * 4
+    assert max(polled) == 2
+
+
+"""
+Ensures a parameter sweep submits every item concurrently and captures per-item errors
+"""
+def test_ParameterSweep():
+    class FakeClient:
+        def __init__(self):
+            self.count = 0
+            self.calls = []
+
+        def request(self, method, uri, body={}):
+            self.calls.append((method, uri))
+            if method == 'POST' and uri == '/job':
+                self.count += 1
+                return {'id': 'job' + str(self.count), 'hpc': 'hpc'}
+            if method == 'PUT' and body['param']['x'] == 3:
+                raise Exception('bad param')
+            return {}
+
+    class FakeCompute:
+        client = FakeClient()
+        jupyterhubApiToken = 'token'
+        isJupyter = False
+        transferLedger = None
+        resultCache = None
+        output = SilentOutput()
+
+        def login(self, verbose=True):
+            pass
+
+    progress = []
+    sweep = ParameterSweep(FakeCompute(), maxWorkers=4, verbose=False, onProgress=lambda done, total, r: progress.append(done))
+    group = sweep.run([{'x': i} for i in range(5)], localExecutableFolder={'type': 'git', 'gitId': 'hello_world'})
+    assert len(group) == 4
+    assert [e['param'] for e in group.errors] == [{'x': 3}]
+    assert group.errors[0]['jobId'] is not None and group.errors[0]['jobId'] not in group.jobs
+    assert sorted(progress) == [1, 2, 3, 4, 5]
+    assert len([c for c in FakeCompute.client.calls if c[1].endswith('/submit')]) == 4
+
+
+"""
+Ensures a job group refreshes from one listing per tick and only fetches details of changed jobs
+"""
+def test_JobGroup():
+    class FakeClient:
+        def __init__(self):
+            self.calls = []
+            self.listing = [{'id': 'a', 'createdAt': 1}, {'id': 'b', 'createdAt': 2}, {'id': 'c', 'createdAt': 3}]
+            self.events = {'a': ['JOB_QUEUED'], 'b': ['JOB_QUEUED', 'JOB_INIT']}
+
+        def request(self, method, uri, body={}):
+            self.calls.append(uri)
+            if uri == '/user/job':
+                return {'job': self.listing}
+            id = uri.split('/')[-1]
+            return {'id': id, 'events': [{'type': t} for t in self.events[id]]}
+
+    client = FakeClient()
+    completed = []
+    group = JobGroup(client, 'token', jobs=['a', 'b']).on_complete(lambda id, state, record: completed.append((id, state)))
+    assert group.refresh() == {'CREATED': 0, 'QUEUED': 1, 'RUNNING': 1, 'ENDED': 0, 'FAILED': 0}
+    assert client.calls == ['/user/job', '/job/a', '/job/b']
+
+    client.calls = []
+    client.listing[1] = {'id': 'b', 'createdAt': 2, 'updatedAt': 5}
+    client.events['b'].append('JOB_ENDED')
+    group.refresh()
+    assert client.calls == ['/user/job', '/job/b']
+    assert completed == [('b', 'ENDED')]
+    assert not group.is_done()
+    assert JobGroup.job_state({'isFailed': True, 'finishedAt': 1}) == 'FAILED'
+
+
+"""
+Ensures parameter sets are generated from param rules and deduplicated against past submissions
+"""
+def test_ParamSpace():
+    rules = {
+        'n': {'type': 'integer', 'min': 1, 'max': 5, 'step': 2, 'default_value': 1},
+        'mode': {'type': 'string_option', 'options': ['a', 'b'], 'default_value': 'a'},
+        'name': {'type': 'string_input', 'default_value': 'x'}}
+    space = ParamSpace(rules, seed=1)
+    assert len(space) == 6
+    assert len(space.grid()) == 6
+    assert {'n': 3, 'mode': 'b', 'name': 'x'} in space.grid()
+    lhs = space.latin_hypercube(3)
+    assert sorted(p['n'] for p in lhs) == [1, 3, 5]
+    assert len(set(ParamSpace.canonical(p) for p in space.random(6))) == 6
+    assert {'n': 3, 'mode': 'a', 'name': 'x'} in space.refine([{'n': 1, 'mode': 'a', 'name': 'x'}], [0.5])
+
+    history = [{'hpc': 'h', 'localExecutableFolder': {'gitId': 'g'}, 'param': {'n': '1', 'mode': 'a', 'name': 'x'}, 'slurm': None}]
+    fresh = ParamSpace.dedupe(space.grid(), history, 'g', 'h', {})
+    assert len(fresh) == 5
+    assert {'n': 1, 'mode': 'a', 'name': 'x'} not in fresh
+    assert len(ParamSpace.dedupe(space.grid(), history, 'g', 'other')) == 6
+    # failed or never submitted jobs do not count, queued, running or ended ones do
+    for state, kept in [({'isFailed': True, 'finishedAt': 1}, 6), ({'isFailed': False}, 6),
+                        ({'events': [{'type': 'JOB_QUEUED'}, {'type': 'JOB_FAILED'}]}, 6),
+                        ({'events': [{'type': 'JOB_QUEUED'}, {'type': 'JOB_INIT'}]}, 5),
+                        ({'isFailed': False, 'finishedAt': 1}, 5)]:
+        assert len(ParamSpace.dedupe(space.grid(), [dict(history[0], **state)], 'g', 'h', {})) == kept
+
+
+"""
+Ensures an identical submission reuses a succeeded job instead of being submitted again
+"""
+def test_ResultCache(tmp_path):
+    class FakeClient:
+        def __init__(self):
+            self.count = 0
+            self.submitted = []
+            self.cancelled = []
+            self.events = {}
+
+        def request(self, method, uri, body={}):
+            if uri == '/git':
+                return {'git': {'hello_world': {'commit': 'abc'}}}
+            if uri == '/job':
+                self.count += 1
+                return {'id': 'job' + str(self.count), 'hpc': 'hpc'}
+            if uri.endswith('/submit'):
+                self.submitted.append(uri.split('/')[2])
+                return {}
+            if uri.endswith('/cancel'):
+                self.cancelled.append(uri.split('/')[2])
+                return {}
+            if method == 'GET':
+                return {'id': uri.split('/')[2], 'events': [{'type': t} for t in self.events.get(uri.split('/')[2], [])]}
+            return {}
+
+    client = FakeClient()
+    cache = ResultCache(client, 'token', str(tmp_path / 'cache.json'))
+
+    def run(param):
+        job = Job(maintainer='m', client=client, jupyterhubApiToken='token', printJob=False, resultCache=cache)
+        job.set(localExecutableFolder={'type': 'git', 'gitId': 'hello_world'}, param=param, printJob=False)
+        return job.submit(printJob=False)
+
+    assert run({'a': 1}).id == 'job1'
+    assert run({'a': 1}).id == 'job2'  # job1 has not succeeded yet
+    client.events['job2'] = ['JOB_QUEUED', 'JOB_ENDED']
+    assert run({'a': 1}).id == 'job2'
+    assert run({'a': 2}).id == 'job4'
+    assert client.submitted == ['job1', 'job2', 'job4']
+    assert client.cancelled == ['job3']
+    assert ResultCache(client, 'token', str(tmp_path / 'cache.json')).entries == cache.entries
+    cache.invalidate(gitId='hello_world')
+    assert cache.entries == {}
+
+
+"""
+Ensures a Globus data folder is fingerprinted through the kernel's home path and that an unreadable folder is never memoized
+"""
+def test_ResultCache_data_folder(tmp_path):
+    home = str(tmp_path / 'home')
+    os.makedirs(os.path.join(home, 'data'))
+    with open(os.path.join(home, 'data', 'a.csv'), 'w') as f:
+        f.write('1')
+
+    class FakeClient:
+        def request(self, method, uri, body={}):
+            if uri == '/user/jupyter-globus':
+                return {'root_path': '/~/', 'container_home_path': home, 'endpoint': 'jupyter'}
+            return {'git': {}}
+
+    cache = ResultCache(FakeClient(), 'token', str(tmp_path / 'cache.json'))
+    folder = {'type': 'globus', 'endpoint': 'jupyter', 'path': '/~/data'}
+    before = cache.key('hello_world', 'hpc', {'a': 1}, localDataFolder=folder)
+    assert before is not None
+    with open(os.path.join(home, 'data', 'a.csv'), 'w') as f:
+        f.write('22')
+    assert cache.key('hello_world', 'hpc', {'a': 1}, localDataFolder=folder) != before
+    assert cache.key('hello_world', 'hpc', {'a': 1}, localDataFolder=dict(folder, path='/~/missing')) is None
+    assert cache.key('hello_world', 'hpc', {'a': 1}, localDataFolder={'type': 'git', 'gitId': 'data'}) is not None
+
+
+"""
+Ensures the job registry only rewrites new or unfinished jobs and answers filtered queries
+"""
+def test_JobRegistry():
+    registry = JobRegistry(':memory:')
+    jobs = [
+        {'id': 'a', 'hpc': 'h1', 'maintainer': 'm', 'createdAt': '2023-01-01', 'finishedAt': '2023-01-02', 'isFailed': False,
+         'localExecutableFolder': {'gitId': 'g'}, 'remoteResultFolder': {'id': 'fa'}},
+        {'id': 'b', 'hpc': 'h2', 'maintainer': 'm', 'createdAt': '2023-02-01', 'finishedAt': None, 'isFailed': False},
+    ]
+    assert registry.apply(jobs) == 2
+    assert registry.watermark() == '2023-02-01'
+    jobs[1]['isFailed'] = True
+    jobs.append({'id': 'c', 'hpc': 'h1', 'maintainer': 'n', 'createdAt': '2023-03-01', 'finishedAt': None})
+    assert registry.apply(jobs) == 2
+    assert [j['id'] for j in registry.query()] == ['c', 'b', 'a']
+    assert [j['id'] for j in registry.query(hpc='h1', status='ENDED')] == ['a']
+    assert [j['id'] for j in registry.query(since='2023-02-01', limit=1)] == ['c']
+    assert [j['id'] for j in registry.query(gitId='g')] == ['a']
+    assert registry.folders('a')['remoteResultFolder']['id'] == 'fa'
+
+
+"""
+Ensures list_job filters and pages client-side when the server ignores the query, and trusts a paginating server
+"""
+def test_list_job_pagination():
+    class FakeClient:
+        def __init__(self, paginates):
+            self.paginates = paginates
+            self.uris = []
+            self.jobs = [{'id': str(i), 'hpc': 'h' + str(i % 2), 'maintainer': 'm', 'createdAt': '2023-01-0' + str(i)} for i in range(1, 8)]
+
+        def request(self, method, uri, body={}):
+            if uri == '/user':
+                return {'username': 'user'}
+            self.uris.append(uri)
+            if self.paginates and 'limit=' in uri:
+                return {'job': [self.jobs[-1]], 'total': 7}
+            return {'job': list(self.jobs)}
+
+    cybergis = CyberGISCompute(isJupyter=False)
+    cybergis.jupyterhubApiToken = 'token'
+    cybergis.client = FakeClient(paginates=False)
+    assert [j['id'] for j in cybergis.list_job(raw=True, limit=2, newestFirst=True)['job']] == ['7', '6']
+    assert [j['id'] for j in cybergis.list_job(raw=True, hpc='h1', since='2023-01-03')['job']] == ['3', '5', '7']
+    assert [[j['id'] for j in page] for page in cybergis.iter_jobs(pageSize=3, newestFirst=False)] == [['1', '2', '3'], ['4', '5', '6'], ['7']]
+    assert cybergis.client.uris[0] == '/user/job?limit=2&order=desc'
+
+    cybergis.client = FakeClient(paginates=True)
+    assert [j['id'] for j in cybergis.list_job(raw=True, limit=1, newestFirst=True)['job']] == ['7']
+
+
+"""
+Ensures login validates the token once per session and again only after an auth error
+"""
+def test_login_cache():
+    class FakeClient:
+        calls = 0
+
+        def request(self, method, uri, body={}):
+            FakeClient.calls += 1
+            return {'username': 'user'}
+
+    cybergis = CyberGISCompute(isJupyter=False)
+    cybergis.client = FakeClient()
+    cybergis.jupyterhubApiToken = 'token'
+    cybergis.login(verbose=False)
+    cybergis.login(verbose=False)
+    assert FakeClient.calls == 1
+    cybergis.invalidate_login()
+    cybergis.login(verbose=False)
+    assert FakeClient.calls == 2
+    assert cybergis.username == 'user'
+
+
+"""
+Ensures the headless import path stays within its time budget and never loads the widget/display stacks
+"""
+def test_headless_import():
+    code = (
+        'import sys\n'
+        'import cybergis_compute_client\n'
+        'cybergis_compute_client.CyberGISCompute(isJupyter=False)\n'
+        'print(sorted(m for m in ("IPython", "ipywidgets", "ipyfilechooser") if m in sys.modules))\n')
+    out = subprocess.run([sys.executable, '-X', 'importtime', '-c', code], capture_output=True, text=True, check=True)
+    assert out.stdout.strip() == '[]'
+    # self time of the package's own modules in microseconds, so slow disks
+    # or heavy dependencies on a CI runner do not count against the budget
+    own = [line.split('|') for line in out.stderr.splitlines()
+           if line.startswith('import time:') and line.split('|')[-1].strip().startswith('cybergis_compute_client')]
+    assert len(own) > 0
+    assert sum(int(line[0].split(':')[1]) for line in own) < 500000
+
+
+"""
+Ensures a headless backend receives structured messages and tables instead of printed or rendered markdown
+"""
+def test_JSONOutput():
+    class FakeClient:
+        def request(self, method, uri, body={}):
+            return {'id': 'a', 'hpc': 'hpc', 'slurmId': 7, 'events': [
+                {'type': 'JOB_QUEUED', 'message': 'queued', 'createdAt': 1},
+                {'type': 'JOB_ENDED', 'message': 'done', 'createdAt': 2}]}
+
+    stream = io.StringIO()
+    job = Job(id='a', client=FakeClient(), isJupyter=True, jupyterhubApiToken='token', printJob=False,
+              output=JSONOutput(stream))
+    assert job.events(refreshRateInSeconds=0) is False
+    records = [json.loads(line) for line in stream.getvalue().splitlines()]
+    assert [r['type'] for r in records] == ['message', 'message', 'table']
+    assert records[1]['text'] == '🤖 Slurm ID: 7'
+    assert records[2]['title'] == 'See events'
+    assert records[2]['rows'][1] == {'types': 'JOB_ENDED', 'message': 'done', 'time': 2}
+    assert isinstance(OutputBackend.default(False), TerminalOutput)
+    assert isinstance(CyberGISCompute(isJupyter=False, output=SilentOutput()).output, SilentOutput)
+
+
+"""
+Ensures WidgetOutput writes into its widget's outputs from another thread and that job events can be written to it
+"""
+def test_WidgetOutput():
+    import ipywidgets as widgets
+    from IPython.core.interactiveshell import InteractiveShell
+    from cybergis_compute_client.Output import WidgetOutput
+    # in a notebook the kernel's shell exists before the watcher thread uses it
+    InteractiveShell.instance()
+
+    class FakeClient:
+        def request(self, method, uri, body={}):
+            return {'id': 'a', 'hpc': 'hpc', 'slurmId': 7, 'events': [
+                {'type': 'JOB_ENDED', 'message': 'done', 'createdAt': 2}]}
+
+    out = widgets.Output()
+    output = WidgetOutput(out)
+    job = Job(id='a', client=FakeClient(), isJupyter=True, jupyterhubApiToken='token', printJob=False)
+    thread = threading.Thread(target=lambda: job.events(liveOutput=False, output=output))
+    thread.start()
+    thread.join()
+    assert out.outputs[0] == {'output_type': 'stream', 'name': 'stdout', 'text': '📮 Job ID: a\n'}
+    assert out.outputs[-1]['data']['application/vnd.jupyter.widget-view+json']['version_major'] == 2
+    table = widgets.Output()
+    WidgetOutput(table).table([['JOB_ENDED', 'done', 2]], ['types', 'message', 'time'])
+    assert table.outputs[0]['data']['text/markdown'].startswith('| types |')
+    output.clear()
+    assert out.outputs == ()
+
+
+"""
+Ensures lifecycle durations and per-HPC aggregates are derived from event timestamps, fetching details only for jobs listed without events
+"""
+def test_JobAnalytics():
+    def events(*pairs):
+        return [{'type': t, 'createdAt': '2022-01-01T00:00:%02dZ' % s} for t, s in pairs]
+
+    class FakeClient:
+        calls = []
+
+        def request(self, method, uri, body={}):
+            FakeClient.calls.append(uri)
+            if uri == '/user/job':
+                return {'job': [
+                    {'id': 'a', 'hpc': 'x', 'events': events(('JOB_QUEUED', 0), ('JOB_REGISTERED', 2), ('JOB_INIT', 3), ('JOB_ENDED', 13))},
+                    {'id': 'b', 'hpc': 'x', 'events': events(('JOB_QUEUED', 0), ('JOB_REGISTERED', 4), ('JOB_INIT', 6), ('JOB_FAILED', 9))},
+                    {'id': 'c', 'hpc': 'y'}]}
+            return {'id': 'c', 'hpc': 'y', 'events': events(('JOB_QUEUED', 1), ('JOB_REGISTERED', 7))}
+
+    analytics = JobAnalytics.fetch(FakeClient(), 'token')
+    assert FakeClient.calls == ['/user/job', '/job/c']
+    assert len(analytics) == 3
+    FakeClient.calls = []
+    assert len(JobAnalytics.fetch(FakeClient(), 'token', limit=2)) == 2 and FakeClient.calls == ['/user/job']
+    assert list(analytics.columns['queueTime']) == [2, 4, 6]
+    assert list(analytics.columns['runTime'])[:2] == [10, 3]
+    summary = analytics.summary(by='hpc', metric='queueTime', percentiles=(50, ))
+    assert summary['x']['failureRate'] == 0.5
+    assert summary['x']['p50'] == 3
+    assert summary['x']['throughput'] == 2 * 3600 / 13
+    assert summary['y']['jobs'] == 1 and summary['y']['finished'] == 0
+    assert JobAnalytics.timestamp(1640995200000) == JobAnalytics.timestamp('2022-01-01T00:00:00Z')
+
+
+"""
+Ensures the recommender picks the HPC with the lowest expected time-to-result and falls back to the default HPC without history
+"""
+def test_HPCRecommender():
+    def job(id, hpc, wait, run, gitId='hello_world'):
+        events = [{'type': 'JOB_QUEUED', 'createdAt': 0}, {'type': 'JOB_INIT', 'createdAt': wait}]
+        if run is not None:
+            events.append({'type': 'JOB_ENDED', 'createdAt': wait + run})
+        return {'id': id, 'hpc': hpc, 'maintainer': 'm', 'localExecutableFolder': {'gitId': gitId}, 'events': events}
+
+    maintainers = {'m': {'hpc': ['busy', 'idle', 'new', 'private'], 'default_hpc': 'busy', 'job_pool_capacity': 1}}
+    hpcs = {'busy': {'is_community_account': True}, 'idle': {'is_community_account': True},
+            'new': {'is_community_account': True}, 'private': {'is_community_account': False}}
+    analytics = JobAnalytics([job('a', 'busy', 100, 10), job('b', 'busy', 120, 10),
+                              job('c', 'idle', 5, 20), job('d', 'idle', 5, None)])
+    recommender = HPCRecommender(maintainers, hpcs, analytics)
+    ranking = recommender.rank('m')
+    assert [r['hpc'] for r in ranking] == ['idle', 'new', 'busy']
+    assert ranking[0]['pending'] == 1 and ranking[0]['expectedTime'] == 5 + 20 * 2
+    assert recommender.recommend('m', candidates=['busy', 'private']) == 'busy'
+    assert 'private' in recommender.candidates('m', communityOnly=False)
+    assert HPCRecommender(maintainers, hpcs, JobAnalytics([])).recommend('m') == 'busy'
+
+
+"""
+Ensures bulk cancellation selects unfinished jobs by filter, reports results per job and respects the rate limit
+"""
+def test_cancel_jobs():
+    class FakeClient:
+        calls = []
+
+        def request(self, method, uri, body={}):
+            FakeClient.calls.append((method, uri))
+            if uri == '/user':
+                return {'username': 'user'}
+            if uri.startswith('/user/job'):
+                return {'job': [
+                    {'id': 'a', 'hpc': 'x', 'createdAt': 1, 'events': [{'type': 'JOB_QUEUED'}]},
+                    {'id': 'b', 'hpc': 'x', 'createdAt': 2, 'events': [{'type': 'JOB_INIT'}]},
+                    {'id': 'c', 'hpc': 'x', 'createdAt': 3, 'events': [{'type': 'JOB_ENDED'}]},
+                    {'id': 'd', 'hpc': 'y', 'createdAt': 4, 'events': [{'type': 'JOB_QUEUED'}]},
+                    {'id': 'e', 'hpc': 'x', 'createdAt': 5}]}
+            if uri == '/job/b/cancel':
+                raise Exception('already cancelled')
+            return {'messages': 'job cancelled'}
+
+    cybergis = CyberGISCompute(isJupyter=False, output=SilentOutput())
+    cybergis.client = FakeClient()
+    cybergis.jupyterhubApiToken = 'token'
+    results = cybergis.cancel_jobs(hpc='x', ratePerSecond=None)
+    assert [(r['jobId'], r['cancelled']) for r in results] == [('b', False), ('a', True)]
+    assert results[0]['error'] == 'already cancelled'
+    assert ('PUT', '/job/c/cancel') not in FakeClient.calls and ('PUT', '/job/e/cancel') not in FakeClient.calls
+    with pytest.raises(Exception):
+        cybergis.cancel_jobs()
+    assert [r['jobId'] for r in cybergis.cancel_jobs(all=True, includeUnknown=True, ratePerSecond=None)] == ['e', 'd', 'b', 'a']
+
+    start = time.monotonic()
+    results = cybergis.cancel_jobs(['a', 'd', 'a'], ratePerSecond=20)
+    assert [r['jobId'] for r in results] == ['a', 'd']
+    assert time.monotonic() - start >= 0.05
+
+
+"""
+Ensures the watcher polls watched jobs in the background, backs off while nothing changes and fires per-job callbacks
+"""
+def test_JobWatcher():
+    class FakeClient:
+        def __init__(self):
+            self.calls = 0
+            self.events = {'a': ['JOB_QUEUED'], 'b': ['JOB_QUEUED']}
+
+        def request(self, method, uri, body={}):
+            self.calls += 1
+            return {'job': [{'id': id, 'events': [{'type': t} for t in types]} for id, types in self.events.items()]}
+
+    class Label:
+        value = None
+
+    client = FakeClient()
+    client.events['b'].append('JOB_FAILED')
+    watcher = JobWatcher(client, 'token', minIntervalInSeconds=0.01, maxIntervalInSeconds=0.04, backoff=2)
+    changes, ended, failed, label = [], [], [], Label()
+    watcher.watch('a', on_status_change=lambda id, previous, state, record: changes.append((previous, state)),
+                  on_end=lambda id, state, record: ended.append(id), widget=label)
+    watcher.watch('b', on_fail=lambda id, state, record: failed.append(id))
+    time.sleep(0.2)
+    assert watcher.is_running() and watcher.interval == 0.04
+    assert failed == ['b'] and label.value == 'QUEUED'
+    thread = watcher._thread
+    client.events['a'] = ['JOB_QUEUED', 'JOB_INIT', 'JOB_ENDED']
+    thread.join(1)
+    assert not watcher.is_running()
+    assert changes == [('CREATED', 'QUEUED'), ('QUEUED', 'ENDED')] and ended == ['a']
+    assert watcher.errors == []
+
+
+"""
+Ensures tick callbacks fire on every tick while a job runs, cap the interval, and stop once it ended
+"""
+def test_JobWatcher_tick():
+    class FakeClient:
+        events = ['JOB_QUEUED']
+
+        def request(self, method, uri, body={}):
+            return {'job': [{'id': 'a', 'events': [{'type': t} for t in FakeClient.events]}]}
+
+    watcher = JobWatcher(FakeClient(), 'token', minIntervalInSeconds=0.01, maxIntervalInSeconds=10, backoff=2)
+    ticks = []
+    watcher.watch('a', on_tick=lambda id, state, record: ticks.append(state), tickIntervalInSeconds=0.02)
+    time.sleep(0.2)
+    assert len(ticks) >= 5 and set(ticks) == {'QUEUED'}
+    assert watcher.interval == 0.02
+    thread = watcher._thread
+    FakeClient.events = ['JOB_QUEUED', 'JOB_ENDED']
+    thread.join(1)
+    count = len(ticks)
+    for i in range(3):
+        watcher.poll()
+    assert len(ticks) == count and watcher.interval == 0.08
+    assert watcher.errors == []
+
+
+"""
+Ensures the streaming builder writes every entry through one archive handle and finalizes a valid archive once
+"""
+def test_Zip_streaming(tmp_path):
+    (tmp_path / 'data.bin').write_bytes(b'x' * 3000000)
+    with Zip() as zip:
+        zip.mkdir('src')
+        for i in range(2000):
+            zip.append('src/f' + str(i) + '.py', 'print(' + str(i) + ')')
+        zip.append_file('data.bin', str(tmp_path / 'data.bin'))
+    archive = zipfile.ZipFile(io.BytesIO(zip.read()))
+    assert len(archive.namelist()) == 2002
+    assert archive.read('src/f1999.py') == b'print(1999)'
+    assert len(archive.read('data.bin')) == 3000000
+    assert set(info.create_system for info in archive.infolist()) == {0}
+
+
+"""
+Ensures parallel directory packaging is deterministic and byte-identical to appending the files one by one
+"""
+def test_Zip_add_directory(tmp_path):
+    for i in range(40):
+        (tmp_path / ('d' + str(i % 4))).mkdir(exist_ok=True)
+        (tmp_path / ('d' + str(i % 4)) / ('f' + str(i))).write_bytes(os.urandom(1000) + b'a' * 20000 * i)
+    parallel = Zip().add_directory(str(tmp_path), 'model', maxWorkers=4, largeFileSize=500000).read()
+    sequential = Zip()
+    for name in sorted(os.listdir(str(tmp_path))):
+        for f in sorted(os.listdir(str(tmp_path / name))):
+            sequential.append_file('model/' + name + '/' + f, str(tmp_path / name / f))
+    assert parallel == sequential.read()
+    archive = zipfile.ZipFile(io.BytesIO(parallel))
+    assert archive.testzip() is None and len(archive.namelist()) == 40
+
+
+"""
+Ensures files dated before 1980 are packaged with the earliest zip date instead of failing
+"""
+def test_Zip_old_timestamps(tmp_path):
+    (tmp_path / 'model').mkdir()
+    for name in ['a.txt', 'b.txt']:
+        (tmp_path / 'model' / name).write_bytes(b'x' * 1000)
+        os.utime(str(tmp_path / 'model' / name), (0, 0))
+    manifest = ZipManifest(str(tmp_path / 'manifest.json'))
+    for z in [Zip().add_directory(str(tmp_path / 'model'), 'model'),
+              Zip().add_directory(str(tmp_path / 'model'), 'model', manifest=manifest),
+              Zip().append_file('model/a.txt', str(tmp_path / 'model' / 'a.txt'))]:
+        archive = zipfile.ZipFile(io.BytesIO(z.read()))
+        assert archive.testzip() is None
+        assert [info.date_time for info in archive.infolist()] == [(1980, 1, 1, 0, 0, 0)] * len(archive.infolist())
+
+
+"""
+Ensures precompressed entries are refused while another entry is open for writing or when they would need zip64
+"""
+def test_Zip_write_compressed_guards():
+    z = Zip()
+    info = z._info('a.txt')
+    info.compress_type = zipfile.ZIP_STORED
+    info.file_size = info.compress_size = 1
+    info.CRC = zlib.crc32(b'a')
+    handle = z._archive().open('b.txt', 'w')
+    with pytest.raises(ValueError):
+        z._write_compressed(info, b'a', 0)
+    handle.close()
+    info.file_size = zipfile.ZIP64_LIMIT + 1
+    with pytest.raises(zipfile.LargeZipFile):
+        z._write_compressed(info, b'a', 0)
+    info.file_size = 1
+    z._write_compressed(info, b'a', 0)
+    assert zipfile.ZipFile(io.BytesIO(z.read())).read('a.txt') == b'a'
+
+
+"""
+Ensures a large archive spills to disk and can be streamed or viewed without copies in both modes
+"""
+def test_Zip_spill():
+    small, large = Zip(), Zip(spillSize=100000)
+    for zip in [small, large]:
+        with zip:
+            zip.append('random.bin', os.urandom(200000))
+        view = zip.getbuffer()
+        assert view.readonly and bytes(view) == zip.read()
+        del view
+        out = io.BytesIO()
+        zip.write_to(out, chunkSize=4096)
+        assert out.getvalue() == b''.join(zip.iter_chunks(1000)) == zip.read()
+    assert not small.spilled() and large.spilled()
+    assert zipfile.ZipFile(io.BytesIO(large.read())).testzip() is None
+
+
+"""
+Ensures the compression policy stores already compressed entries, deflates compressible ones and reports each entry
+"""
+def test_CompressionPolicy(tmp_path):
+    (tmp_path / 'dem.tif').write_bytes(os.urandom(100000))
+    (tmp_path / 'table.csv').write_bytes(b'x,y\n' * 50000)
+    (tmp_path / 'bundle.zip').write_bytes(b'a' * 1000)
+    zip = Zip(policy=CompressionPolicy(level=9)).add_directory(str(tmp_path))
+    zip.append('notes.txt', 'short')
+    report = {r['name']: r for r in zip.report}
+    assert [report[n]['method'] for n in ['bundle.zip', 'dem.tif', 'table.csv', 'notes.txt']] == ['STORE', 'STORE', 'DEFLATE', 'DEFLATE']
+    assert report['dem.tif']['ratio'] == 1.0 and report['table.csv']['ratio'] < 0.01
+    assert report['table.csv']['level'] == 9 and report['table.csv']['seconds'] >= 0
+    archive = zipfile.ZipFile(io.BytesIO(zip.read()))
+    assert archive.testzip() is None and archive.getinfo('dem.tif').compress_type == zipfile.ZIP_STORED
+
+
+"""
+Ensures a manifest reuses the cached entries of unchanged files and still yields the same archive
+"""
+def test_ZipManifest(tmp_path):
+    src = tmp_path / 'src'
+    (src / 'data').mkdir(parents=True)
+    (src / 'main.py').write_bytes(b'print(1)\n' * 1000)
+    (src / 'data' / 'dem.tif').write_bytes(os.urandom(50000))
+    (src / 'data' / 'table.csv').write_bytes(b'x,y\n' * 20000)
+    path = str(tmp_path / 'manifest.json')
+    first = Zip().add_directory(str(src), 'model', maxWorkers=2, manifest=ZipManifest(path)).read()
+    assert first == Zip().add_directory(str(src), 'model', maxWorkers=2).read()
+
+    (src / 'main.py').write_bytes(b'print(2)\n' * 1000)
+    zip = Zip().add_directory(str(src), 'model', maxWorkers=2, manifest=ZipManifest(path))
+    assert {r['name']: r['reused'] for r in zip.report} == {
+        'model/data/dem.tif': True, 'model/data/table.csv': True, 'model/main.py': False}
+    assert zip.read() == Zip().add_directory(str(src), 'model', maxWorkers=2).read()
+    assert zipfile.ZipFile(io.BytesIO(zip.read())).read('model/main.py') == b'print(2)\n' * 1000
+    manifest = ZipManifest(path)
+    assert len(os.listdir(manifest.cacheDir)) == len(manifest.blobs) == 3
+
+
+"""
+Ensures files with the same content share one blob built once by concurrent workers, and deleted files are forgotten
+"""
+def test_ZipManifest_duplicates(tmp_path):
+    src = tmp_path / 'src'
+    src.mkdir()
+    content = os.urandom(1024) * 512
+    for i in range(20):
+        (src / ('copy%d.bin' % i)).write_bytes(content)
+    path = str(tmp_path / 'manifest.json')
+    zip = Zip().add_directory(str(src), maxWorkers=16, manifest=ZipManifest(path))
+    assert len([r for r in zip.report if not r['reused']]) == 1
+    archive = zipfile.ZipFile(io.BytesIO(zip.read()))
+    assert archive.testzip() is None and archive.read('copy7.bin') == content
+    manifest = ZipManifest(path)
+    assert os.listdir(manifest.cacheDir) == list(manifest.blobs) and len(manifest.files) == 20
+
+    for i in range(1, 20):
+        os.remove(str(src / ('copy%d.bin' % i)))
+    manifest.save()
+    assert list(ZipManifest(path).files) == [str(src / 'copy0.bin')]
+
+
+"""
+Ensures a chunked upload streams files and iterators, reports progress and resumes from the offset of a rejected chunk
+"""
+def test_Client_upload(tmp_path):
+    received = bytearray()
+    ranges = []
+    failAt = [3]
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def do_PUT(self):
+            chunk = self.rfile.read(int(self.headers['Content-Length']))
+            ranges.append(self.headers['Content-Range'])
+            start = int(self.headers['Content-Range'].split(' ')[1].split('-')[0])
+            status, body = 200, json.dumps({'received': start + len(chunk)}).encode()
+            if len(ranges) == failAt[0] or start != len(received):
+                status, body = 500, b'{"error": "unavailable"}'
+            else:
+                received.extend(chunk)
+            self.send_response(status)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        client = Client(url='127.0.0.1', port=server.server_address[1], protocol='HTTP')
+        payload = os.urandom(10000)
+        (tmp_path / 'data.zip').write_bytes(payload)
+        progress = []
+        with pytest.raises(UploadError) as error:
+            client.upload('/upload', str(tmp_path / 'data.zip'), chunkSize=3000, onProgress=lambda *p: progress.append(p))
+        assert error.value.offset == 6000 and bytes(received) == payload[:6000]
+        result = client.upload('/upload', str(tmp_path / 'data.zip'), offset=error.value.offset, chunkSize=3000,
+                               onProgress=lambda *p: progress.append(p))
+        assert bytes(received) == payload and result['bytes'] == 4000 and result['response'] == {'received': 10000}
+        assert ranges[-2:] == ['bytes 6000-8999/10000', 'bytes 9000-9999/10000']
+        assert [p[0] for p in progress] == [3000, 6000, 9000, 10000] and progress[-1][2] > 0
+
+        received.clear()
+        del ranges[:]
+        failAt[0] = None
+        pieces = [payload[i:i + 700] for i in range(0, len(payload), 700)]
+        client.upload('/upload', iter(pieces), chunkSize=4096)
+        assert bytes(received) == payload and ranges == ['bytes 0-4095/*', 'bytes 4096-8191/*', 'bytes 8192-9999/*']
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+"""
+Ensures tables keep their format, escape pipes and are cut to a row window and cell width
+"""
+def test_MarkdownTable():
+    assert MarkdownTable.render([['a|b', None], [1, 2.5]], ['x', 'y']) == (
+        '| x | y | \n| --- | --- | \n| a<code>&#124;</code>b | None | \n| 1 | 2.5 | ')
+    assert MarkdownTable.render([], []) == ''
+    logs = ([str(i) * 20, i] for i in range(50000))
+    assert MarkdownTable.render(logs, ['message', 'time'], maxWidth=5, maxRows=2, offset=3) == (
+        '| message | time | \n| --- | --- | \n| 3333… | 3 | \n| 4444… | 4 | \n| … | … | ')
+    rows = [['%d|%d' % (i, i), i] for i in range(3000)] + [['\x1f', 'short row']]
+    stream = io.StringIO()
+    MarkdownTable.write(stream, rows, ['a', 'b'])
+    assert stream.getvalue() == MarkdownTable.render(rows, ['a', 'b']) + '\n'
+    assert stream.getvalue().split('\n')[2] == '| 0<code>&#124;</code>0 | 0 | '
+
+
+"""
+Ensures a table view sorts, filters and pages rows in the kernel and renders only the current page
+"""
+def test_TableView():
+    rows = [['job%d' % i, ['ENDED', 'FAILED', None][i % 3], i] for i in range(250)]
+    view = TableView(rows, ['id', 'status', 'n'], pageSize=20)
+    changes = []
+    view.on_change(lambda v: changes.append(v.page))
+    assert view.pages() == 13 and view.status() == 'rows 1-20 of 250 (page 1/13)'
+    assert view.goto(99).page == 12 and len(view.window()) == 10
+    view.filter('FAILED')
+    assert len(view.index) == 83 and view.page == 0 and all(r[1] == 'FAILED' for r in view.window())
+    view.sort('n', ascending=False)
+    assert [r[2] for r in view.window()[:3]] == [247, 244, 241]
+    view.filter(None).sort('status')
+    assert [view.data[i][1] for i in view.index[::90]] == ['ENDED', 'FAILED', None]
+    view.filter(lambda r: r[2] < 2)
+    assert view.html() == ('<table><thead><tr><th>id</th><th>status</th><th>n</th></tr></thead><tbody>'
+                           '<tr><td>job0</td><td>ENDED</td><td>0</td></tr><tr><td>job1</td><td>FAILED</td><td>1</td></tr></tbody></table>')
+    assert changes == [12, 0, 0, 0, 0, 0]
+    assert TableView([['<b>', 'x' * 10]], ['a', 'b'], maxWidth=4).html().count('&lt;b&gt;</td><td>xxx…') == 1
+
+
+"""
+Ensures the recently submitted jobs panel makes at most one listing request per refresh and never fetches jobs one by one
+"""
+def test_recently_submitted_jobs():
+    from cybergis_compute_client.UI import UI
+
+    class FakeClient:
+        uris = []
+        jobs = [{'id': str(i), 'slurmId': None, 'hpc': 'h', 'remoteExecutableFolder': None, 'remoteDataFolder': None,
+                 'remoteResultFolder': None, 'param': {}, 'slurm': {}, 'userId': 'user', 'maintainer': 'm',
+                 'createdAt': '2023-01-%02d' % i, 'localExecutableFolder': None} for i in range(1, 13)]
+
+        def request(self, method, uri, body={}):
+            FakeClient.uris.append(uri)
+            return {'job': list(FakeClient.jobs)}
+
+    cybergis = CyberGISCompute(isJupyter=False, output=SilentOutput())
+    cybergis.client = FakeClient()
+    cybergis.jupyterhubApiToken = 'token'
+    cybergis.username = 'user@host'
+    ui = UI.__new__(UI)
+    ui.compute = cybergis
+    ui.refreshing = False
+    ui.recently_submitted = {'output': None, 'submit': {}, 'job_list_size': 5, 'jobs': None, 'fetched': 0, 'load_more': None}
+    ui.renderRecentlySubmittedJobs()
+    assert FakeClient.uris == ['/user/job?limit=5&order=desc'] and list(ui.recently_submitted['submit']) == ['12', '11', '10', '9', '8']
+    ui.refreshing = True
+    ui.renderRecentlySubmittedJobs(refresh=False)
+    assert len(FakeClient.uris) == 1
+    ui.recently_submitted['job_list_size'] += 5
+    ui.renderRecentlySubmittedJobs(refresh=False)
+    assert FakeClient.uris[1:] == ['/user/job?limit=5&offset=5&order=desc'] and len(ui.recently_submitted['submit']) == 10
+    ui.renderRecentlySubmittedJobs()
+    assert FakeClient.uris[2:] == ['/user/job?limit=10&order=desc']